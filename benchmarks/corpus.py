@@ -0,0 +1,121 @@
+# coding: utf-8
+"""
+Deterministic generator of synthetic deb822 corpora for benchmarks.
+
+The same `seed` and arguments always give the same text, so results of
+different runs and revisions are comparable.
+"""
+
+import random
+
+
+ARCHITECTURES = ('amd64', 'arm64', 'i386', 'armhf', 'all')
+SECTIONS = ('admin', 'devel', 'libs', 'net', 'python', 'utils', 'web')
+PRIORITIES = ('required', 'important', 'optional', 'extra')
+RELATIONS = ('<<', '<=', '=', '>=', '>>')
+WORDS = (
+    'fast', 'small', 'library', 'server', 'client', 'tool', 'parser',
+    'network', 'archive', 'package', 'debian', 'index', 'data', 'module',
+    'support', 'runtime', 'development', 'files', 'documentation', 'web',
+)
+
+
+def generate_corpus(paragraphs, seed=0, max_depends=12, description_lines=4,
+                    comments=False):
+    """
+    Text of Packages-like index with `paragraphs` paragraphs. Depends lists
+    have up to `max_depends` relations with alternatives, version and
+    architecture restrictions, descriptions have up to `description_lines`
+    continuation lines. With `comments` comment lines are added, like in
+    debian/control files.
+    """
+    rnd = random.Random(seed)
+    return '\n'.join(
+        generate_paragraph(rnd, index, max_depends, description_lines,
+                           comments)
+        for index in range(paragraphs)
+    )
+
+
+def generate_paragraph(rnd, index, max_depends=12, description_lines=4,
+                       comments=False):
+    name = generate_name(rnd, index)
+    lines = [
+        'Package: %s' % name,
+        'Source: %s-src (%s)' % (name, generate_version(rnd)),
+        'Version: %s' % generate_version(rnd),
+        'Architecture: %s' % rnd.choice(ARCHITECTURES),
+        'Maintainer: Maintainer %d <maintainer%d@example.com>' % (
+            index % 500, index % 500),
+        'Installed-Size: %d' % rnd.randint(1, 100000),
+    ]
+    if comments and rnd.random() < 0.3:
+        lines.append('# %s' % generate_sentence(rnd))
+    lines.append('Depends: %s' % generate_relations(rnd, max_depends))
+    if rnd.random() < 0.3:
+        lines.append('Recommends: %s' % generate_relations(rnd, 3))
+    if rnd.random() < 0.1:
+        lines.append('Breaks: %s (<< %s)' % (
+            generate_name(rnd, index + 1), generate_version(rnd)))
+    if rnd.random() < 0.1:
+        lines.append('Provides: %s-virtual' % name)
+    lines.extend([
+        'Section: %s' % rnd.choice(SECTIONS),
+        'Priority: %s' % rnd.choice(PRIORITIES),
+        'Homepage: https://example.com/%s' % name,
+        'Description: %s' % generate_sentence(rnd),
+    ])
+    for _ in range(rnd.randint(0, description_lines)):
+        if rnd.random() < 0.2:
+            lines.append(' .')
+        else:
+            lines.append(' %s' % generate_sentence(rnd))
+    return '\n'.join(lines) + '\n'
+
+
+def generate_relations(rnd, max_count):
+    relations = []
+    for _ in range(rnd.randint(1, max_count)):
+        alternatives = [
+            generate_relation(rnd)
+            for _ in range(1 if rnd.random() < 0.85 else rnd.randint(2, 3))
+        ]
+        relations.append(' | '.join(alternatives))
+    # long lists are wrapped to continuation lines
+    if len(relations) > 4:
+        return ',\n '.join([
+            ', '.join(relations[start:start + 4])
+            for start in range(0, len(relations), 4)
+        ])
+    return ', '.join(relations)
+
+
+def generate_relation(rnd):
+    relation = 'lib%s%d' % (
+        rnd.choice('abcdefghijklmnop'), rnd.randint(0, 2000))
+    if rnd.random() < 0.05:
+        relation += ':any'
+    if rnd.random() < 0.5:
+        relation += ' (%s %s)' % (
+            rnd.choice(RELATIONS), generate_version(rnd))
+    if rnd.random() < 0.05:
+        relation += ' [%s]' % rnd.choice(ARCHITECTURES[:-1])
+    return relation
+
+
+def generate_name(rnd, index):
+    return '%s-%s%d' % (rnd.choice(WORDS), rnd.choice(WORDS), index)
+
+
+def generate_version(rnd):
+    version = '%d.%d.%d' % (
+        rnd.randint(0, 9), rnd.randint(0, 30), rnd.randint(0, 99))
+    if rnd.random() < 0.1:
+        version = '%d:%s' % (rnd.randint(1, 3), version)
+    if rnd.random() < 0.1:
+        version += '~rc%d' % rnd.randint(1, 5)
+    return '%s-%d' % (version, rnd.randint(1, 5))
+
+
+def generate_sentence(rnd):
+    return ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(3, 10)))
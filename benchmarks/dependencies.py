@@ -0,0 +1,77 @@
+# coding: utf-8
+"""
+Throughput of dependency parsing and its time on adversarial inputs,
+time must grow linearly with input size.
+
+    python -m benchmarks.dependencies [relations]
+"""
+
+import sys
+import time
+import random
+
+from debparse.deb_control import fields
+
+
+ADVERSARIAL_INPUTS = {
+    'unclosed restrictions': lambda size: 'a (' + '(' * size,
+    'long version': lambda size: 'a (>= ' + '1' * size + ')',
+    'unclosed architectures': lambda size: 'a [' + ' [' * size,
+    'many profiles': lambda size: 'a' + ' <x>' * size,
+    'long whitespace': lambda size: 'a' + ' ' * size + 'b',
+    'many alternatives': lambda size: ' | '.join(['a (= 1)'] * size),
+}
+
+
+def generate_relations(count, seed=0):
+    rnd = random.Random(seed)
+    relations = []
+    for index in range(count):
+        kind = rnd.random()
+        if kind < 0.5:
+            relations.append('lib%d' % index)
+        elif kind < 0.8:
+            relations.append('lib%d (>= %d.%d-%d)' % (
+                index, rnd.randint(0, 9), rnd.randint(0, 9),
+                rnd.randint(0, 9)))
+        elif kind < 0.9:
+            relations.append('foo%d:any (>= 1) | bar%d [amd64] <!nocheck>' % (
+                index, index))
+        else:
+            relations.append('${misc:Depends}')
+    return relations
+
+
+def measure_throughput(relations, meta):
+    start = time.perf_counter()
+    for relation in relations:
+        fields.parse_field_type_dependency(relation, meta)
+    return len(relations) / (time.perf_counter() - start)
+
+
+def measure_adversarial(meta, sizes=(1000, 10000, 100000)):
+    results = {}
+    for name, make_input in sorted(ADVERSARIAL_INPUTS.items()):
+        timings = []
+        for size in sizes:
+            value = make_input(size)
+            start = time.perf_counter()
+            fields.parse_field_type_dependency(value, meta)
+            timings.append((size, time.perf_counter() - start))
+        results[name] = timings
+    return results
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 100000
+    meta = fields.get_field_meta('Depends')
+    relations = generate_relations(count)
+    print('throughput: %.0f relations/s' % measure_throughput(
+        relations, meta))
+    for name, timings in sorted(measure_adversarial(meta).items()):
+        print('%s: %s' % (name, ', '.join(
+            '%d: %.4fs' % (size, elapsed) for size, elapsed in timings)))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,39 @@
+# coding: utf-8
+"""
+Memory used by parsed packages.
+
+    python -m benchmarks.memory [paragraphs]
+"""
+
+import gc
+import sys
+import tracemalloc
+
+from debparse import deb_control
+
+from .corpus import generate_corpus
+
+
+def measure(data, **kwargs):
+    gc.collect()
+    tracemalloc.start()
+    control_data = deb_control.parse(data=data, **kwargs)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return control_data, current, peak
+
+
+def main(argv):
+    paragraphs = int(argv[1]) if len(argv) > 1 else 10000
+    data = generate_corpus(paragraphs)
+    # data string itself is not counted, it is allocated before tracing
+    control_data, current, peak = measure(data)
+    count = len(control_data.packages)
+    print('paragraphs: %d, input: %d bytes' % (count, len(data)))
+    print('retained: %d bytes per package' % (current // count))
+    print('peak: %d bytes per package' % (peak // count))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,37 @@
+# coding: utf-8
+"""
+Serial parsing compared to parsing in a process pool.
+
+    python -m benchmarks.parallel [paragraphs] [workers...]
+"""
+
+import sys
+import time
+
+from debparse import deb_control
+
+from .corpus import generate_corpus
+
+
+def measure(data, workers):
+    start = time.perf_counter()
+    control_data = deb_control.parse(data=data, workers=workers)
+    return control_data, time.perf_counter() - start
+
+
+def main(argv):
+    paragraphs = int(argv[1]) if len(argv) > 1 else 50000
+    workers_list = [int(arg) for arg in argv[2:]] or [2, 4]
+    data = generate_corpus(paragraphs)
+    print('paragraphs: %d, input: %d bytes' % (paragraphs, len(data)))
+
+    control_data, serial = measure(data, workers=None)
+    print('serial: %.2fs' % serial)
+    for workers in workers_list:
+        control_data, elapsed = measure(data, workers=workers)
+        print('workers=%d: %.2fs (x%.2f)' % (
+            workers, elapsed, serial / elapsed))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
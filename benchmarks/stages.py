@@ -0,0 +1,200 @@
+# coding: utf-8
+"""
+Throughput and peak memory of parsing stages on synthetic corpora.
+
+    python -m benchmarks.stages [--sizes 10,1000,100000] [--output new.json]
+                                [--compare old.json] [--threshold 0.1]
+
+Every stage gets input prepared by the previous ones, so its time is
+its own. Time is the best of `--repeat` runs without tracing, peak
+memory is measured in a separate traced run. Results are saved as json,
+`--compare` prints changes against results of previous run and exits
+with status 1 when some stage became slower than `--threshold`.
+"""
+
+import gc
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+
+from debparse import utils, deb_control
+from debparse.deb_control import paragraphs, fields
+
+from .corpus import generate_corpus
+
+
+DEFAULT_SIZES = (10, 1000, 100000)
+
+
+def stage_raw_paragraphs(data):
+    return paragraphs.get_raw_paragraphs(data)
+
+
+def stage_raw_fields(raw_paragraphs):
+    return [paragraphs.get_raw_fields(raw) for raw in raw_paragraphs]
+
+
+def stage_parse_field(raw_fields):
+    return [list(map(fields.parse_field, raw)) for raw in raw_fields]
+
+
+def stage_dependencies(relations):
+    parse = fields.parse_field_type_dependency
+    return [parse(relation, meta) for relation, meta in relations]
+
+
+def stage_parse(data):
+    return deb_control.parse(data=data)
+
+
+def get_relations(raw_fields):
+    """
+    (relation, meta) pairs of all dependency fields, input of
+    `parse_field_type_dependency`.
+    """
+    relations = []
+    for raw in raw_fields:
+        for raw_field in raw:
+            key, value = fields.get_raw_key_value(raw_field)
+            meta = fields.get_field_meta(key)
+            if meta.type != 'dependency':
+                continue
+            relations.extend(
+                (relation.strip(), meta)
+                for relation in utils.split_string_by_comma(value)
+            )
+    return relations
+
+
+def get_stages(data):
+    raw_paragraphs = stage_raw_paragraphs(data)
+    raw_fields = stage_raw_fields(raw_paragraphs)
+    return [
+        ('get_raw_paragraphs', stage_raw_paragraphs, data),
+        ('get_raw_fields', stage_raw_fields, raw_paragraphs),
+        ('parse_field', stage_parse_field, raw_fields),
+        ('parse_field_type_dependency', stage_dependencies,
+         get_relations(raw_fields)),
+        ('parse', stage_parse, data),
+    ]
+
+
+def measure_time(stage, stage_input, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        stage(stage_input)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def measure_peak(stage, stage_input):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        stage(stage_input)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - start
+
+
+def run(sizes=DEFAULT_SIZES, repeat=3, seed=0):
+    results = {}
+    for size in sizes:
+        data = generate_corpus(size, seed=seed)
+        megabytes = len(data.encode('utf-8')) / 1024.0 / 1024.0
+        size_results = results[str(size)] = {}
+        for name, stage, stage_input in get_stages(data):
+            elapsed = measure_time(stage, stage_input, repeat)
+            size_results[name] = {
+                'seconds': elapsed,
+                'paragraphs_per_second': size / elapsed,
+                'mb_per_second': megabytes / elapsed,
+                'peak_bytes': measure_peak(stage, stage_input),
+            }
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'seed': seed,
+        'results': results,
+    }
+
+
+def compare(old, new, threshold):
+    """
+    Prints time and memory ratios of stages found in both results.
+    Returns names of stages which became slower than `threshold`.
+    """
+    regressions = []
+    for size, stages in sorted(new['results'].items(), key=_size_key):
+        old_stages = old['results'].get(size, {})
+        for name, result in stages.items():
+            old_result = old_stages.get(name)
+            if old_result is None:
+                continue
+            time_ratio = result['seconds'] / old_result['seconds']
+            memory_ratio = (
+                result['peak_bytes'] / float(old_result['peak_bytes'])
+                if old_result['peak_bytes'] else 1.0
+            )
+            print('%8s %-28s time x%.2f  peak x%.2f' % (
+                size, name, time_ratio, memory_ratio))
+            if time_ratio > 1 + threshold:
+                regressions.append('%s/%s' % (size, name))
+    return regressions
+
+
+def print_results(report):
+    for size, stages in sorted(report['results'].items(), key=_size_key):
+        for name, result in stages.items():
+            print('%8s %-28s %10.0f paragraphs/s %8.2f MB/s %12d peak' % (
+                size, name, result['paragraphs_per_second'],
+                result['mb_per_second'], result['peak_bytes']))
+
+
+def _size_key(item):
+    return int(item[0])
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.stages')
+    parser.add_argument(
+        '--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+        help='comma separated numbers of paragraphs')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='json file to save results to')
+    parser.add_argument('--compare', help='json file of previous results')
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='allowed relative slowdown for --compare')
+    args = parser.parse_args(argv[1:])
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    report = run(sizes, repeat=args.repeat, seed=args.seed)
+    print_results(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        regressions = compare(old, report, args.threshold)
+        if regressions:
+            print('slower: %s' % ', '.join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
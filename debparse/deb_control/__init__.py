@@ -1,24 +1,313 @@
 # coding: utf-8
 
 
+import os
+import gc
+import mmap
+import bisect
+
+from functools import partial
+from itertools import repeat
+from concurrent import futures
+
 from debparse import utils
 
-from . import paragraphs, classes
+from . import paragraphs, classes, profiling
+from .writer import dump, dumps  # noqa: F401
+from .diagnostics import ParseError  # noqa: F401
+
 
+# chunks per worker for parallel parsing, more chunks balance load better
+CHUNKS_PER_WORKER = 4
 
-def parse(path=None, data=None):
+
+def parse(path=None, data=None, lazy=False, workers=None, cache=None,
+          stats=None, fields=None, where=None, pool=None,
+          diagnostics=None):
     """
     Main deb_control package api method.
-    Takes path to debian control file or its contents.
+    Takes path to debian control file (maybe compressed) or its contents.
+    With `lazy` field values are parsed on first access.
+    With `workers` greater than 1 paragraphs are parsed in a pool of
+    that many processes, order of packages is kept.
+    With `cache.ParseCache` given as `cache` file at `path` is parsed
+    only if it is not cached yet.
+    With `profiling.ParseStats` given as `stats` time of parsing stages
+    and counts of parsed items are added to it, parallel parsing can't
+    be profiled.
+    With `fields` packages have only these fields (case-insensitive),
+    other ones are not parsed. With `where` only paragraphs for which
+    where(`classes.RawParagraph`) is true are parsed, e.g.
+    where=lambda paragraph: paragraph.get('Architecture') == 'amd64'.
+    With `workers` `where` should be picklable. Results of `fields` and
+    `where` can't be cached.
+    With `pool.ParsePool` given as `pool` paragraphs and values already
+    parsed with that pool are shared instead of parsed again, packages
+    are immutable `classes.FrozenPackage` and comments are not kept.
+    With `diagnostics.Diagnostics` given as `diagnostics` malformed
+    fields and values are reported to it, see `diagnostics` module.
+    Values of `lazy` parsing are parsed on access after parse is over,
+    so they are parsed as without `diagnostics` then.
     """
     assert path or data, 'path or data should be given'
+    if fields is not None:
+        fields = frozenset(name.lower() for name in fields)
+    if cache is not None and (fields is not None or where is not None):
+        raise ValueError('Parsing with fields or where can\'t be cached')
+    if pool is not None and (
+            cache is not None or stats is not None or
+            (workers and workers > 1)):
+        raise ValueError(
+            'pool can\'t be used with cache, stats or parallel parsing')
+    if diagnostics is not None and (
+            cache is not None or (workers and workers > 1)):
+        raise ValueError(
+            'diagnostics can\'t be collected with cache or parallel parsing')
+    if path and cache is not None:
+        control_data = cache.get(path, lazy)
+        if control_data is None:
+            control_data = parse(
+                path, lazy=lazy, workers=workers, stats=stats)
+            cache.put(path, control_data, lazy)
+        return control_data
+
+    if stats is not None:
+        if workers and workers > 1:
+            raise ValueError('stats can\'t be collected by parallel parsing')
+        return profiling.parse(
+            path, data, lazy, stats, fields, where, diagnostics)
+
     if path:
         data = utils.get_file_contents(path)
+    return _parse_data(
+        data, path, lazy, workers, fields, where, pool, diagnostics)
 
-    raw_paragraphs = paragraphs.get_raw_paragraphs(data)
-    parsed_paragraphs = list(map(paragraphs.parse_paragraph, raw_paragraphs))
+
+def _parse_data(data, path=None, lazy=False, workers=None, fields=None,
+                where=None, pool=None, diagnostics=None):
+    # `parse` of already read `data`, shared by all ways of loading
+    if workers and workers > 1:
+        parsed_paragraphs = _parse_parallel(
+            data, lazy, workers, fields, where)
+    elif diagnostics is not None:
+        parsed_paragraphs = _parse_diagnosed(
+            data, lazy, diagnostics, fields, where, pool)
+    else:
+        parsed_paragraphs = _parse_chunk(data, lazy, fields, where, pool)
+    if pool is None:
+        paragraphs.keep_comments(data, parsed_paragraphs)
     return classes.ControlData(
         _raw=data,
         _path=path,
+        # packages of pool don't keep comments for `writer`
+        _edges=paragraphs.get_edges(data) if pool is None else None,
         packages=parsed_paragraphs,
     )
+
+
+def iter_parse(path_or_fileobj, lazy=False, where=None):
+    """
+    Streaming counterpart of `parse`.
+    Takes path to debian control file or file object (text or binary),
+    compressed files are decompressed on the fly.
+    Yields `classes.Package` for every paragraph as soon as it is read,
+    so memory usage is bounded by the largest paragraph.
+    `lazy` and `where` have the same meaning as for `parse`, e.g.
+    `where` can be `query.Query`.
+    """
+    with utils.open_text_file(path_or_fileobj) as fileobj:
+        lines = utils.iter_lines(fileobj)
+        for raw_paragraph in paragraphs.iter_raw_paragraphs(lines):
+            if where is not None and \
+                    not where(classes.RawParagraph(raw_paragraph)):
+                continue
+            yield paragraphs.parse_paragraph(raw_paragraph, lazy=lazy)
+
+
+def parse_mmap(path):
+    """
+    Memory maps debian control file at `path`. Paragraphs are found and
+    parsed lazily while `packages` are read: only names of fields are
+    decoded, values are decoded and parsed on access, so pages of file
+    which are never read are never loaded.
+    Returned `classes.MappedControlData` should be closed after use.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # empty file can't be mapped
+            buffer = b''
+    if utils.detect_compression(buffer[:utils.COMPRESSION_MAGIC_SIZE]):
+        buffer.close()
+        raise ValueError('Compressed file %s can\'t be memory mapped' % path)
+
+    packages = classes.MappedPackages(
+        buffer,
+        paragraphs.iter_paragraph_spans(buffer),
+        paragraphs.parse_paragraph_span,
+    )
+    return classes.MappedControlData(
+        _raw=None,
+        _path=path,
+        _mmap=buffer,
+        packages=packages,
+    )
+
+
+def reparse(previous, start, end, replacement, lazy=False):
+    """
+    Parses contents of `previous` `classes.ControlData` with
+    data[start:end] replaced with `replacement`, result is the same as
+    full parse of edited data gives.
+    Only paragraphs touched by edit are split and parsed again, other
+    packages of `previous` are reused as they are.
+    """
+    return _reparse_edits(previous, [(start, end, replacement)], lazy)
+
+
+def _reparse_edits(previous, edits, lazy=False):
+    # `reparse` for several (start, end, replacement) edits of data of
+    # `previous` at once, edits are sorted and don't overlap
+    data = previous._raw
+    if not isinstance(data, str):
+        raise ValueError('Only data parsed from text can be reparsed')
+    position = 0
+    for start, end, _ in edits:
+        if not position <= start <= end <= len(data):
+            raise ValueError('Invalid edit range %d-%d' % (start, end))
+        position = end
+    spans = _get_spans(previous)
+    if len(spans) != len(previous.packages):
+        raise ValueError('Packages of previous data were changed')
+
+    chunks = []
+    position = 0
+    for start, end, replacement in edits:
+        chunks.append(data[position:start])
+        chunks.append(replacement)
+        position = end
+    chunks.append(data[position:])
+    new_data = ''.join(chunks)
+    # comment blocks around edit belong to neighbour paragraphs
+    widen = paragraphs.has_comment_line(data) or \
+        paragraphs.has_comment_line(new_data)
+
+    # [first, last, shift] of runs of paragraphs touched by edits
+    regions = []
+    span_starts = [span[0] for span in spans]
+    span_ends = [span[1] for span in spans]
+    for start, end, replacement in edits:
+        # paragraphs which contain edit or are separated from it by only
+        # one newline, so they can merge with text of edit
+        first = bisect.bisect_left(span_ends, start - 1)
+        last = bisect.bisect_right(span_starts, end + 1) - 1
+        if widen:
+            first = max(first - 1, 0)
+            last = min(last + 1, len(spans) - 1)
+        shift = len(replacement) - (end - start)
+        if regions and first <= regions[-1][1] + 1:
+            regions[-1][1] = max(regions[-1][1], last)
+            regions[-1][2] += shift
+        else:
+            regions.append([first, last, shift])
+
+    packages = []
+    new_spans = []
+    # packages before current region are reused
+    reused = 0
+    total_shift = 0
+    for first, last, shift in regions:
+        packages.extend(previous.packages[reused:first])
+        new_spans.extend(
+            (span_start + total_shift, span_end + total_shift)
+            for span_start, span_end in spans[reused:first])
+        # borders of region are empty lines kept by edits
+        region_start = spans[first - 1][1] + 1 if first > 0 else 0
+        region_end = spans[last + 1][0] if last + 1 < len(spans) \
+            else len(data)
+        region_start += total_shift
+        total_shift += shift
+        region = new_data[region_start:region_end + total_shift]
+        region_packages = _parse_chunk(region, lazy)
+        paragraphs.keep_comments(
+            region, region_packages, trailing=region_end == len(data))
+        region_spans = paragraphs.get_paragraph_spans(region)
+        assert len(region_spans) == len(region_packages)
+        packages.extend(region_packages)
+        new_spans.extend(
+            (span_start + region_start, span_end + region_start)
+            for span_start, span_end in region_spans)
+        reused = last + 1
+    packages.extend(previous.packages[reused:])
+    new_spans.extend(
+        (span_start + total_shift, span_end + total_shift)
+        for span_start, span_end in spans[reused:])
+
+    control_data = classes.ControlData(
+        _raw=new_data,
+        _path=previous._path,
+        _edges=paragraphs.get_edges(new_data),
+        packages=packages,
+    )
+    control_data._spans = new_spans
+    return control_data
+
+
+def _get_spans(control_data):
+    # spans are kept by `reparse`, so they are found once for
+    # a sequence of edits
+    spans = control_data.__dict__.get('_spans')
+    if spans is None:
+        spans = control_data._spans = paragraphs.get_paragraph_spans(
+            control_data._raw)
+    return spans
+
+
+def _parse_chunk(data, lazy, fields=None, where=None, pool=None):
+    raw_paragraphs = paragraphs.get_raw_paragraphs(data)
+    if where is not None:
+        raw_paragraphs = [
+            raw for raw in raw_paragraphs
+            if where(classes.RawParagraph(raw))
+        ]
+    parse_paragraph = _get_paragraph_parser(lazy, fields, pool)
+    return list(map(parse_paragraph, raw_paragraphs))
+
+
+def _parse_diagnosed(data, lazy, diagnostics, fields=None, where=None,
+                     pool=None):
+    # paragraphs are parsed one by one, so problems know their paragraph
+    parse_paragraph = _get_paragraph_parser(lazy, fields, pool)
+    parsed_paragraphs = []
+    with diagnostics.collecting(data):
+        raw_paragraphs = paragraphs.get_raw_paragraphs(data)
+        for index, raw in enumerate(raw_paragraphs):
+            if where is not None and not where(classes.RawParagraph(raw)):
+                continue
+            diagnostics.paragraph = index
+            parsed_paragraphs.append(parse_paragraph(raw))
+    return parsed_paragraphs
+
+
+def _get_paragraph_parser(lazy, fields=None, pool=None):
+    return partial(
+        pool.parse_paragraph if pool is not None
+        else paragraphs.parse_paragraph,
+        lazy=lazy, field_names=fields)
+
+
+def _parse_parallel(data, lazy, workers, fields=None, where=None):
+    chunks = paragraphs.split_raw_data(data, workers * CHUNKS_PER_WORKER)
+    parsed_paragraphs = []
+    # results are unpickled in a thread of executor, collector runs
+    # would take more time than unpickling itself
+    with utils.gc_disabled():
+        with futures.ProcessPoolExecutor(
+                max_workers=workers, initializer=gc.disable) as executor:
+            parsed_chunks = executor.map(
+                _parse_chunk, chunks, repeat(lazy), repeat(fields),
+                repeat(where))
+            for parsed_chunk in parsed_chunks:
+                parsed_paragraphs.extend(parsed_chunk)
+    return parsed_paragraphs
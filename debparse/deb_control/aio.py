@@ -0,0 +1,68 @@
+# coding: utf-8
+"""
+asyncio api of deb_control: files are read in threads and paragraphs
+are parsed in executor, so event loop is never blocked.
+
+    control_data = await aio.aparse(path)
+
+    async for path, control_data in aio.aparse_many(paths, concurrency=8):
+        ...
+"""
+
+import asyncio
+
+from debparse import utils
+
+from . import _parse_data
+
+
+async def aparse(path, lazy=False, executor=None):
+    """
+    Async counterpart of `deb_control.parse` for `path`.
+    File is read in default executor of loop, paragraphs are parsed in
+    `executor`, which can be process pool for CPU heavy parsing of large
+    files. `lazy` has the same meaning as for `deb_control.parse`.
+    """
+    loop = asyncio.get_running_loop()
+    data = await loop.run_in_executor(None, utils.get_file_contents, path)
+    return await loop.run_in_executor(
+        executor, _parse_data, data, path, lazy)
+
+
+async def aparse_many(paths, concurrency=4, lazy=False, executor=None):
+    """
+    Parses files of `paths` iterable concurrently and yields
+    (path, control_data) as soon as each of them is parsed.
+    At most `concurrency` files are in work, new ones are started only
+    when consumer takes results, so slow consumer limits reading of files.
+    The first error is raised after all started files are cancelled.
+    """
+    if concurrency < 1:
+        raise ValueError('concurrency should be positive')
+    paths = iter(paths)
+    pending = {}
+
+    def start_next():
+        while len(pending) < concurrency:
+            path = next(paths, None)
+            if path is None:
+                return
+            task = asyncio.ensure_future(
+                aparse(path, lazy=lazy, executor=executor))
+            pending[task] = path
+
+    try:
+        start_next()
+        while pending:
+            done, _ = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                path = pending.pop(task)
+                yield path, task.result()
+            start_next()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            # cancelled tasks are finished before the error is raised
+            await asyncio.gather(*pending, return_exceptions=True)
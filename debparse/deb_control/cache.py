@@ -0,0 +1,265 @@
+# coding: utf-8
+"""
+Persistent on-disk cache of parsed control files.
+
+    cache = ParseCache('/var/cache/debparse')
+    control_data = deb_control.parse(path, cache=cache)
+
+Entries are pickled `classes.ControlData` keyed by path, mtime and size of
+file or by digest of its contents and by laziness of parsing. Text of
+every paragraph is stored once, text of file and raw values of fields
+are rebuilt from it on load, see `_Pickler`. Entries are written to
+temporary files and atomically renamed, so concurrent writers and
+readers never see partially written entries. When total size of
+entries exceeds `max_size`, least recently used ones are removed.
+"""
+
+import os
+import re
+import copy
+import pickle
+import hashlib
+import tempfile
+import collections
+
+from debparse import utils
+
+from . import paragraphs, classes
+
+
+# changes when format of entries changes, old entries are never read then
+CACHE_FORMAT = 2
+ENTRY_SUFFIX = '.pickle'
+# newline before name of field, continuation lines start with blank
+FIELD_START_RX = re.compile(r'\n(?![ \t])')
+
+
+def get_default_directory():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'debparse')
+
+
+class ParseCache(object):
+    """
+    `key` is 'stat' to key entries by absolute path, mtime and size of
+    file (no file reading on hit) or 'digest' to key them by sha256 of
+    file contents (file is read, but not parsed, on hit).
+    """
+
+    def __init__(self, directory=None, max_size=256 * 1024 * 1024,
+                 key='stat'):
+        if key not in ('stat', 'digest'):
+            raise ValueError('key should be stat or digest, not %r' % key)
+        self.directory = directory or get_default_directory()
+        self.max_size = max_size
+        self.key = key
+
+    def get(self, path, lazy=False):
+        """
+        Returns cached `classes.ControlData` or None.
+        """
+        entry_path = self._get_entry_path(path, lazy)
+        try:
+            with open(entry_path, 'rb') as f:
+                with utils.gc_disabled():
+                    control_data = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # broken or written by incompatible version of library
+            self._remove(entry_path)
+            return None
+        # mtime of entry is its last use time for eviction
+        self._touch(entry_path)
+        control_data._path = path
+        return control_data
+
+    def put(self, path, control_data, lazy=False):
+        entry_path = self._get_entry_path(path, lazy)
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temporary_path = tempfile.mkstemp(
+            dir=self.directory, prefix='.tmp-', suffix=ENTRY_SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                _Pickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump(
+                    control_data)
+            os.replace(temporary_path, entry_path)
+        except BaseException:
+            self._remove(temporary_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Removes least recently used entries until their total size
+        fits `max_size`.
+        """
+        entries = []
+        total_size = 0
+        for entry in self._scan_entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+        entries.sort()
+        for _, size, entry_path in entries:
+            if total_size <= self.max_size:
+                break
+            self._remove(entry_path)
+            total_size -= size
+
+    def clear(self):
+        for entry in self._scan_entries():
+            self._remove(entry.path)
+
+    def _scan_entries(self):
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return []
+        return [
+            entry for entry in entries
+            if entry.name.endswith(ENTRY_SUFFIX) and
+            not entry.name.startswith('.tmp-')
+        ]
+
+    def _get_entry_path(self, path, lazy=False):
+        digest = hashlib.sha256()
+        digest.update(('%s:%s:%s:' % (
+            CACHE_FORMAT, self.key, 'lazy' if lazy else 'eager',
+        )).encode('utf-8'))
+        if self.key == 'stat':
+            stat = os.stat(path)
+            digest.update(('%s:%d:%d' % (
+                os.path.abspath(path), stat.st_mtime_ns, stat.st_size,
+            )).encode('utf-8'))
+        else:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+        return os.path.join(self.directory, digest.hexdigest() + ENTRY_SUFFIX)
+
+    def _touch(self, entry_path):
+        try:
+            os.utime(entry_path)
+        except OSError:
+            # evicted by another process
+            pass
+
+    def _remove(self, entry_path):
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Pickles text of every paragraph once: `_raw` of `classes.ControlData`
+    is rebuilt from texts of packages and gaps between them, raw values
+    of fields are split from text of package again on load. Data which
+    can't be rebuilt exactly, e.g. paragraph with malformed field, is
+    pickled as it is.
+    """
+
+    def reducer_override(self, obj):
+        if type(obj) is classes.Package:
+            return _reduce_package(obj)
+        if type(obj) is classes.ControlData:
+            return _reduce_control_data(obj)
+        return NotImplemented
+
+
+def _reduce_package(package):
+    fields = list(collections.OrderedDict.items(package))
+    raw_values = _get_raw_values(package)
+    if raw_values is None or len(raw_values) != len(fields):
+        return NotImplemented
+    stripped_fields = []
+    for (key, value), raw in zip(fields, raw_values):
+        if not isinstance(
+                value, (classes.FieldValue, classes.LazyFieldValue)) or \
+                value._raw != raw:
+            return NotImplemented
+        value = copy.copy(value)
+        if type(value) is classes.SimpleField:
+            if value.text != raw:
+                return NotImplemented
+            value.text = None
+        value._raw = None
+        stripped_fields.append((key, value))
+    return _restore_package, (
+        package.__class__, stripped_fields, package.__dict__)
+
+
+def _reduce_control_data(control_data):
+    gaps = _get_gaps(control_data)
+    if gaps is None:
+        return NotImplemented
+    state = control_data.__getstate__()
+    del state['_raw']
+    return _restore_control_data, (control_data.__class__, state, gaps)
+
+
+def _get_raw_values(package):
+    # the same raw values as `paragraphs.get_raw_fields` and
+    # `paragraphs.split_raw_fields` give, but faster, as they are split on
+    # every load, values are checked against parsed ones before pickling
+    raw = package.__dict__.get('_raw')
+    if not isinstance(raw, str):
+        return None
+    return [
+        field.replace('\n', ' ').partition(':')[2].strip()
+        for field in FIELD_START_RX.split(raw)
+    ]
+
+
+def _get_gaps(control_data):
+    # texts of `_raw` of control data between texts of its packages
+    data = control_data.__dict__.get('_raw')
+    if not isinstance(data, str):
+        return None
+    spans = paragraphs.get_paragraph_spans(data)
+    if len(spans) != len(control_data.packages):
+        return None
+    gaps = []
+    # the same gaps are pickled once
+    known_gaps = {}
+    position = 0
+    for (start, end), package in zip(spans, control_data.packages):
+        if data[start:end] != _get_paragraph_text(package):
+            return None
+        gap = data[position:start]
+        gaps.append(known_gaps.setdefault(gap, gap))
+        position = end
+    gaps.append(data[position:])
+    return gaps
+
+
+def _get_paragraph_text(package):
+    # paragraphs with comments keep them in text of `_source`
+    source = package.__dict__.get('_source')
+    return source[1] if source is not None else package._raw
+
+
+def _restore_package(cls, fields, state):
+    package = classes._restore_package(cls, fields, state)
+    for (_, value), raw in zip(fields, _get_raw_values(package)):
+        value._raw = raw
+        if type(value) is classes.SimpleField:
+            value.text = raw
+    return package
+
+
+def _restore_control_data(cls, state, gaps):
+    control_data = cls.__new__(cls)
+    control_data.__dict__.update(state)
+    chunks = [gaps[0]]
+    for package, gap in zip(control_data.packages, gaps[1:]):
+        chunks.append(_get_paragraph_text(package))
+        chunks.append(gap)
+    control_data._raw = ''.join(chunks)
+    return control_data
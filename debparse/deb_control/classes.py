@@ -1,7 +1,16 @@
 # coding: utf-8
 
 
+import re
+import sys
+import mmap
+import weakref
+import functools
 import collections
+from collections import abc as collections_abc
+
+from debparse import utils
+from . import versions
 
 ANY = object()
 
@@ -31,6 +40,17 @@ class Stub(object):
 
 
 class ControlData(Stub):
+    """
+    Parsed control file, `packages` are in order of paragraphs.
+
+    Indexes for queries are built on first use of each of them,
+    in O(P) for P packages or O(P + D) for D dependencies in
+    `DEPENDENCY_FIELDS`, and then cached. Queries are O(1) dict lookups
+    returning already built results. If `packages` are changed after that,
+    `invalidate_indexes` must be called.
+    """
+    DEPENDENCY_FIELDS = ('Depends', 'Pre-Depends', 'Build-Depends')
+
     def _repr_data(self):
         return str([
             package.id
@@ -40,18 +60,142 @@ class ControlData(Stub):
 
     @property
     def source_package(self):
-        for package in self.packages:
-            if package.type == 'source':
-                return package
+        """
+        First source package, O(1) after index is built.
+        """
+        sources = self._get_index('sources', self._build_sources_index)
+        return sources[0] if sources else None
 
     @property
     def binary_packages(self):
+        """
+        Ordered mapping of binary package name to package, the last one of
+        packages with the same name wins. O(1) after index is built,
+        the same mapping is returned every time, so it must not be changed.
+        """
+        return self._get_index('binary', self._build_binary_index)
+
+    def get_packages(self, name):
+        """
+        List of all packages (source, binary, every version) with name
+        `name`, in order of paragraphs. O(1).
+        """
+        names = self._get_index('names', self._build_names_index)
+        return names.get(name, [])
+
+    def get_providers(self, name):
+        """
+        List of packages having `name` in Provides, in order of paragraphs.
+        O(1).
+        """
+        providers = self._get_index(
+            'providers', self._build_providers_index)
+        return providers.get(name, [])
+
+    def get_reverse_dependencies(self, name):
+        """
+        List of packages depending on `name` through any of
+        `DEPENDENCY_FIELDS`, alternatives included. Every package is listed
+        once, in order of paragraphs. O(1).
+        """
+        reverse_dependencies = self._get_index(
+            'reverse_dependencies', self._build_reverse_dependencies_index)
+        return reverse_dependencies.get(name, [])
+
+    def to_columns(self, fields):
+        """
+        Column oriented `columns.ColumnTable` of `fields` of packages,
+        row i is i-th package. O(P + V) for V values of fields.
+        """
+        from . import columns
+        return columns.to_columns(self.packages, fields)
+
+    def invalidate_indexes(self):
+        self._indexes = {}
+
+    def __getstate__(self):
+        # indexes are cheap to rebuild and would double pickled size
+        state = dict(self.__dict__)
+        state.pop('_indexes', None)
+        return state
+
+    def _get_index(self, name, build):
+        indexes = self.__dict__.setdefault('_indexes', {})
+        index = indexes.get(name)
+        if index is None:
+            index = indexes[name] = build()
+        return index
+
+    def _build_sources_index(self):
+        return [
+            package
+            for package in self.packages
+            if package.type == 'source'
+        ]
+
+    def _build_binary_index(self):
+        # stanzas of Packages indices and dpkg status may have Source
+        # field too, so binary packages are the ones with Package field
         return collections.OrderedDict([
-            (package.id, package)
+            (package['Package'].text, package)
             for package in self.packages
-            if package.type == 'binary'
+            if 'Package' in package
         ])
 
+    def _build_names_index(self):
+        index = {}
+        for package in self.packages:
+            name = _get_name(package)
+            if name is not None:
+                index.setdefault(name, []).append(package)
+        return index
+
+    def _build_providers_index(self):
+        index = {}
+        for package in self.packages:
+            provides = package.get('Provides')
+            for dependency in iter_dependencies(provides):
+                _append_once(index.setdefault(dependency.name, []), package)
+        return index
+
+    def _build_reverse_dependencies_index(self):
+        index = {}
+        for package in self.packages:
+            for field in self.DEPENDENCY_FIELDS:
+                for dependency in iter_dependencies(package.get(field)):
+                    _append_once(
+                        index.setdefault(dependency.name, []), package)
+        return index
+
+
+def _get_name(package):
+    # name of binary package or of source package of paragraph
+    name = package.get('Package') or package.get('Source')
+    if name is not None:
+        return name.text
+
+
+def _append_once(packages, package):
+    # packages are added in order, so duplicate can be only the last one
+    if not packages or packages[-1] is not package:
+        packages.append(package)
+
+
+class MappedControlData(ControlData):
+    """
+    ControlData of memory mapped file, see `deb_control.parse_mmap`.
+    """
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 
 class Package(Stub, collections.OrderedDict):
     """
@@ -62,13 +206,107 @@ class Package(Stub, collections.OrderedDict):
         '_raw',
     )
 
+    def __init__(self, fields=(), **kwargs):
+        # lowercased field name -> field name as it is in paragraph
+        self._keys = {}
+        super(Package, self).__init__(**kwargs)
+        if hasattr(fields, 'items'):
+            fields = fields.items()
+        for key, value in fields:
+            self._add_field(key, value)
+
     def __getitem__(self, item):
         if not isinstance(item, str):
             raise TypeError(item)
-        for key in self:
-            if item.lower() == key.lower():
-                return super(Package, self).__getitem__(key)
-        raise KeyError(item)
+        try:
+            key = self._keys[item.lower()]
+        except KeyError:
+            raise KeyError(item)
+        return self._get_value(key)
+
+    def __setitem__(self, key, value):
+        self._add_field(key, value)
+        self.mark_modified(key)
+
+    def __delitem__(self, item):
+        key = self._keys.pop(item.lower(), item)
+        super(Package, self).__delitem__(key)
+        self.mark_modified(item)
+
+    # methods of OrderedDict changing fields bypass index of keys
+    def pop(self, item, *default):
+        if item not in self:
+            if default:
+                return default[0]
+            raise KeyError(item)
+        value = self[item]
+        del self[item]
+        return value
+
+    def popitem(self, last=True):
+        if not self:
+            raise KeyError('Package is empty')
+        key = next(reversed(self) if last else iter(self))
+        return key, self.pop(key)
+
+    def setdefault(self, item, default=None):
+        if item not in self:
+            self[item] = default
+        return self[item]
+
+    def update(self, *args, **kwargs):
+        collections_abc.MutableMapping.update(self, *args, **kwargs)
+
+    def clear(self):
+        for key in list(self.keys()):
+            del self[key]
+
+    def _add_field(self, key, value):
+        key = self._keys.setdefault(sys.intern(key.lower()), key)
+        collections.OrderedDict.__setitem__(self, key, value)
+
+    def mark_modified(self, key):
+        """
+        Marks field `key` to be rendered again by `writer.dump`,
+        setting and deleting of fields mark them, but changes of values
+        in place must be marked with this method.
+        """
+        self.__dict__.setdefault('_modified', set()).add(key.lower())
+
+    @property
+    def modified(self):
+        """
+        Lowercased names of fields changed after parsing.
+        """
+        return frozenset(self.__dict__.get('_modified', ()))
+
+    def __contains__(self, item):
+        return isinstance(item, str) and item.lower() in self._keys
+
+    def __reduce__(self):
+        # pickle stored values as is, without parsing lazy ones
+        fields = list(super(Package, self).items())
+        return _restore_package, (self.__class__, fields, self.__dict__)
+
+    def get(self, item, default=None):
+        try:
+            return self[item]
+        except KeyError:
+            return default
+
+    def _get_value(self, key):
+        value = super(Package, self).__getitem__(key)
+        if isinstance(value, LazyFieldValue):
+            value = value.parse()
+            super(Package, self).__setitem__(key, value)
+        return value
+
+    # views go through __getitem__ to parse lazy values
+    def values(self):
+        return collections_abc.ValuesView(self)
+
+    def items(self):
+        return collections_abc.ItemsView(self)
 
     def _repr_data(self):
         return str(list(self.keys()))
@@ -91,6 +329,95 @@ class Package(Stub, collections.OrderedDict):
     def __hash__(self):
         return hash(self.type) ^ hash(self.id)
 
+
+def _restore_package(cls, fields, state):
+    # unpickling is hot when many packages are loaded,
+    # index of keys is restored as is instead of rebuilding it
+    package = cls.__new__(cls)
+    package.__dict__.update(state)
+    set_item = collections.OrderedDict.__setitem__
+    for key, value in fields:
+        set_item(package, key, value)
+    return package
+
+
+class MappedPackage(Package):
+    """
+    Package of paragraph (start, end) span of memory mapped file,
+    paragraph text is decoded on access.
+    """
+    valid_attribures = (
+        '_buffer',
+        '_span',
+    )
+
+    @property
+    def _raw(self):
+        return utils.get_span_text(self._buffer, *self._span)
+
+
+class FrozenPackage(Package):
+    """
+    Immutable package, which can be shared by several `ControlData`,
+    see `pool.ParsePool`.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('%s is immutable' % self.__class__.__name__)
+
+    __setitem__ = __delitem__ = mark_modified = _immutable
+    pop = popitem = clear = update = setdefault = _immutable
+
+
+class MappedPackages(collections_abc.Sequence):
+    """
+    Sequence of packages of memory mapped file.
+    Paragraphs are found while sequence is read, packages are built on
+    access and reused while they are referenced.
+    """
+
+    def __init__(self, buffer, spans, build_package):
+        self._buffer = buffer
+        self._spans = []
+        self._spans_iterator = spans
+        self._build_package = build_package
+        self._packages = weakref.WeakValueDictionary()
+
+    def _find_spans(self, count=None):
+        for span in self._spans_iterator:
+            self._spans.append(span)
+            if count is not None and len(self._spans) >= count:
+                break
+
+    def __len__(self):
+        self._find_spans()
+        return len(self._spans)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        elif index >= len(self._spans):
+            self._find_spans(index + 1)
+        if not 0 <= index < len(self._spans):
+            raise IndexError(index)
+        package = self._packages.get(index)
+        if package is None:
+            package = self._build_package(self._buffer, *self._spans[index])
+            self._packages[index] = package
+        return package
+
+    def __iter__(self):
+        index = 0
+        while True:
+            try:
+                yield self[index]
+            except IndexError:
+                return
+            index += 1
+
+
 # TODO:
 #   * Every field value must be FieldValue inheritor, it
 #   should have type, format or is_list at least. So we need to make
@@ -103,39 +430,364 @@ class Package(Stub, collections.OrderedDict):
 #   it by design
 
 
-class FieldMeta(Stub):
-    pass
+class RawParagraph(object):
+    """
+    Not yet parsed paragraph given to `where` predicate of
+    `deb_control.parse`. Values are found in paragraph text with regular
+    expressions, so checking a couple of fields is much cheaper than
+    splitting paragraph to fields.
+    """
+    __slots__ = ('_raw',)
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def get(self, key, default=None):
+        """
+        Raw value of field `key` (case-insensitive) with continuation
+        lines joined with spaces, like `fields.get_raw_key_value` gives.
+        """
+        match = _get_field_regex(key).search(self._raw)
+        if match is None:
+            return default
+        return ' '.join(match.group(1).split('\n')).strip()
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return _get_field_regex(key).search(self._raw) is not None
+
+    def __repr__(self):
+        return '<%s: %s>' % (
+            self.__class__.__name__, self._raw.partition('\n')[0])
+
 
+# compiled regexes of field names, names used in predicates are few
+FIELD_REGEX_CACHE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=FIELD_REGEX_CACHE_SIZE)
+def _get_field_regex(key):
+    return re.compile(
+        r'^%s[ \t]*:(.*(?:\n[ \t].*)*)' % re.escape(key),
+        re.IGNORECASE | re.MULTILINE,
+    )
+
+
+class LazyFieldValue(object):
+    """
+    Not yet parsed field value of `Package`, see `fields.parse_field_lazy`.
+    """
+    __slots__ = ('key', '_raw', 'parser')
+
+    def __init__(self, key, raw, parser):
+        self.key = key
+        self._raw = raw
+        self.parser = parser
+
+    def parse(self):
+        return self.parser(self.key, self._raw)
+
+    def __repr__(self):
+        return '<%s: %s>' % (self.__class__.__name__, self._raw)
+
+
+class MappedFieldValue(LazyFieldValue):
+    """
+    Not yet decoded field value of `MappedPackage`,
+    (start, end) span of the whole field in memory mapped file.
+    """
+    __slots__ = ('_buffer', 'start', 'end')
+
+    def __init__(self, key, buffer, start, end, parser):
+        super(MappedFieldValue, self).__init__(key, None, parser)
+        self._buffer = buffer
+        self.start = start
+        self.end = end
+
+    def parse(self):
+        return self.parser(self.key, self._buffer, self.start, self.end)
+
+    def __repr__(self):
+        return '<%s: %d-%d>' % (
+            self.__class__.__name__, self.start, self.end)
+
+
+class FieldMeta(object):
+    """
+    Immutable description of field: format ('single' or 'list'), type,
+    canonical name and parser of the type.
+    Registered fields share one instance, see `fields.get_field_meta`.
+    """
+    __slots__ = ('format', 'type', 'canonical_name', 'parser')
+
+    def __init__(self, format='single', type='simple', canonical_name=None,
+                 parser=None):
+        set_attribute = super(FieldMeta, self).__setattr__
+        set_attribute('format', format)
+        set_attribute('type', type)
+        set_attribute('canonical_name', canonical_name)
+        set_attribute('parser', parser)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is immutable' % self.__class__.__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError('%s is immutable' % self.__class__.__name__)
+
+    def __reduce__(self):
+        return self.__class__, (
+            self.format, self.type, self.canonical_name, self.parser)
+
+    def __repr__(self):
+        return '<%s: %s %s/%s>' % (
+            self.__class__.__name__,
+            self.canonical_name,
+            self.format,
+            self.type,
+        )
+
+
+class FieldValue(object):
+    """
+    Base of parsed field values.
+    Values are created for every field of every paragraph, so they use
+    __slots__ instead of `Stub` attributes dict.
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        return '<%s: %s>' % (
+            self.__class__.__name__,
+            self._repr_data(),
+        )
 
-class FieldValue(Stub):
     def _repr_data(self):
         return self._raw
 
 
 class SimpleField(FieldValue):
-    pass
+    __slots__ = ('_raw', 'meta', 'text')
+
+    def __init__(self, _raw=None, meta=None, text=None):
+        self._raw = _raw
+        self.meta = meta
+        self.text = text
+
+    def __reduce__(self):
+        return self.__class__, (self._raw, self.meta, self.text)
 
 
 class ListField(FieldValue, list):
+    __slots__ = ('_raw', 'meta')
+
+    def __init__(self, items=(), _raw=None, meta=None):
+        super(ListField, self).__init__(items)
+        self._raw = _raw
+        self.meta = meta
+
+    def __reduce__(self):
+        return self.__class__, (list(self), self._raw, self.meta)
+
     def __repr__(self):
         return list.__repr__(self)
 
 
+class FrozenListField(ListField):
+    """
+    Immutable `ListField` of `FrozenPackage`.
+    """
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('%s is immutable' % self.__class__.__name__)
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = extend = insert = pop = remove = clear = _immutable
+    sort = reverse = _immutable
+
+
 class ContactField(FieldValue):
-    pass
+    __slots__ = ('_raw', 'meta', 'name', 'email')
+
+    def __init__(self, _raw=None, meta=None, name=None, email=None):
+        self._raw = _raw
+        self.meta = meta
+        self.name = name
+        self.email = email
+
+    def __reduce__(self):
+        return self.__class__, (self._raw, self.meta, self.name, self.email)
 
 
 class DependencySimple(FieldValue):
+    __slots__ = (
+        '_raw', 'meta', 'name', 'restriction', 'architecture',
+        'arch_qualifier', 'profiles',
+    )
     type = 'simple'
 
+    def __init__(self, _raw=None, meta=None, name=None, restriction=None,
+                 architecture=None, arch_qualifier=None, profiles=None):
+        self._raw = _raw
+        self.meta = meta
+        self.name = name
+        self.restriction = restriction
+        self.architecture = architecture
+        # e.g. 'any' or 'native' of 'python3:any'
+        self.arch_qualifier = arch_qualifier
+        # tuple of build profiles restriction formulas, e.g. ('!nocheck',)
+        self.profiles = profiles
+
+    def __reduce__(self):
+        return self.__class__, (
+            self._raw, self.meta, self.name, self.restriction,
+            self.architecture, self.arch_qualifier, self.profiles)
+
 
 class DependencyAlternative(DependencySimple):
+    __slots__ = ('alternatives',)
     type = 'alternative'
 
+    def __init__(self, _raw=None, meta=None, alternatives=None, **kwargs):
+        super(DependencyAlternative, self).__init__(
+            _raw=_raw, meta=meta, **kwargs)
+        self.alternatives = alternatives
+
+    def __reduce__(self):
+        return self.__class__, (self._raw, self.meta, self.alternatives)
+
 
 class DependencyPlaceholder(DependencySimple):
+    __slots__ = ()
     type = 'placeholder'
 
 
-class Restriction(Stub):
-    pass
+def iter_dependencies(value):
+    """
+    Yields `DependencySimple` of dependency field value, alternatives
+    are flattened, placeholders and unparsed items are skipped.
+    """
+    if value is None:
+        return
+    if not isinstance(value, list):
+        value = [value]
+    for dependency in value:
+        if not isinstance(dependency, DependencySimple) or \
+                dependency.type == 'placeholder':
+            continue
+        if dependency.type == 'alternative':
+            for alternative in dependency.alternatives:
+                if alternative.type == 'simple':
+                    yield alternative
+        else:
+            yield dependency
+
+
+class Restriction(object):
+    __slots__ = ('relation', 'version')
+
+    def __init__(self, relation=None, version=None):
+        self.relation = relation
+        self.version = version
+
+    def __reduce__(self):
+        return self.__class__, (self.relation, self.version)
+
+    def satisfied_by(self, version):
+        """
+        Checks version string or `versions.Version` against restriction.
+        """
+        return versions.check_relation(version, self.relation, self.version)
+
+    def __repr__(self):
+        return '<%s: %s %s>' % (
+            self.__class__.__name__,
+            self.relation,
+            self.version,
+        )
+
+
+class FrozenValue(object):
+    """
+    Mixin of immutable values of `FrozenPackage`, which are shared by
+    several packages, see `freeze_value`.
+    """
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is immutable' % self.__class__.__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError('%s is immutable' % self.__class__.__name__)
+
+    def __reduce__(self):
+        # values are created mutable and frozen then
+        _, args = super(FrozenValue, self).__reduce__()
+        return _restore_frozen_value, (_mutable_classes[type(self)], args)
+
+
+class FrozenSimpleField(FrozenValue, SimpleField):
+    __slots__ = ()
+
+
+class FrozenContactField(FrozenValue, ContactField):
+    __slots__ = ()
+
+
+class FrozenDependencySimple(FrozenValue, DependencySimple):
+    __slots__ = ()
+
+
+class FrozenDependencyAlternative(FrozenValue, DependencyAlternative):
+    __slots__ = ()
+
+
+class FrozenDependencyPlaceholder(FrozenValue, DependencyPlaceholder):
+    __slots__ = ()
+
+
+class FrozenRestriction(FrozenValue, Restriction):
+    __slots__ = ()
+
+
+# mutable class -> its frozen subclass
+_frozen_classes = dict(
+    (frozen_class.__bases__[1], frozen_class)
+    for frozen_class in (
+        FrozenSimpleField, FrozenContactField, FrozenDependencySimple,
+        FrozenDependencyAlternative, FrozenDependencyPlaceholder,
+        FrozenRestriction,
+    )
+)
+_mutable_classes = dict(
+    (frozen_class, mutable_class)
+    for mutable_class, frozen_class in _frozen_classes.items()
+)
+
+
+def freeze_value(value):
+    """
+    Makes `value` with its restriction and alternatives immutable in
+    place, values of other classes (e.g. `ListField`) are returned as
+    they are.
+    """
+    frozen_class = _frozen_classes.get(type(value))
+    if frozen_class is None:
+        return value
+    if isinstance(value, DependencySimple):
+        freeze_value(value.restriction)
+        if value.type == 'alternative':
+            value.alternatives = tuple(
+                freeze_value(alternative)
+                for alternative in value.alternatives)
+    value.__class__ = frozen_class
+    return value
+
+
+def _restore_frozen_value(cls, args):
+    return freeze_value(cls(*args))
@@ -0,0 +1,240 @@
+# coding: utf-8
+"""
+Column oriented export of `classes.ControlData` for bulk analytics.
+
+    table = control_data.to_columns(['Package', 'Section', 'Depends'])
+    table['Section'].codes, table['Section'].values
+    table['Depends'].offsets, table['Depends'].items
+    table.edges['Depends'].package, table.edges['Depends'].name
+
+Strings are dictionary encoded: every column keeps list of distinct
+strings and array of their indexes, -1 for missing values. Integer
+arrays are numpy arrays when numpy is installed and `array.array`
+otherwise.
+"""
+
+import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from . import fields
+
+
+MISSING = -1
+
+
+def make_int_array(values, wide=False):
+    if numpy is not None:
+        return numpy.array(values, dtype=numpy.int64 if wide else numpy.int32)
+    return array.array('q' if wide else 'i', values)
+
+
+class StringEncoder(object):
+    """
+    Builds `StringColumn`, equal strings get the same code.
+    """
+
+    def __init__(self):
+        self.codes = []
+        self.values = []
+        self._value_codes = {}
+
+    def append(self, value):
+        if value is None:
+            self.codes.append(MISSING)
+            return
+        code = self._value_codes.get(value)
+        if code is None:
+            code = self._value_codes[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def build(self):
+        return StringColumn(make_int_array(self.codes), self.values)
+
+
+class StringColumn(object):
+    __slots__ = ('codes', 'values')
+
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.values = values
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        code = self.codes[index]
+        return self.values[code] if code != MISSING else None
+
+    def to_list(self):
+        values = self.values
+        return [
+            values[code] if code != MISSING else None
+            for code in self.codes
+        ]
+
+    def __repr__(self):
+        return '<%s: %d rows, %d values>' % (
+            self.__class__.__name__, len(self.codes), len(self.values))
+
+
+class ListColumn(object):
+    """
+    Items of i-th row are items[offsets[i]:offsets[i + 1]].
+    """
+    __slots__ = ('offsets', 'items')
+
+    def __init__(self, offsets, items):
+        self.offsets = offsets
+        self.items = items
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        items = self.items
+        return [
+            items[position]
+            for position in range(
+                self.offsets[index], self.offsets[index + 1])
+        ]
+
+    def __repr__(self):
+        return '<%s: %d rows, %d items>' % (
+            self.__class__.__name__, len(self), len(self.items))
+
+
+class EdgeTable(object):
+    """
+    One row for every dependency: index of package, index of relation in
+    the field (alternatives share it), name of dependency, relation and
+    version of its restriction. Placeholders and unparsed items are not
+    included.
+    """
+    __slots__ = ('package', 'group', 'name', 'relation', 'version')
+
+    def __init__(self, package, group, name, relation, version):
+        self.package = package
+        self.group = group
+        self.name = name
+        self.relation = relation
+        self.version = version
+
+    def __len__(self):
+        return len(self.package)
+
+    def __repr__(self):
+        return '<%s: %d edges>' % (self.__class__.__name__, len(self))
+
+
+class ColumnTable(object):
+    """
+    `columns` maps field name to `StringColumn` of single fields or
+    `ListColumn` of list fields, `edges` maps names of dependency fields
+    to `EdgeTable`.
+    """
+
+    def __init__(self, length, columns, edges):
+        self.length = length
+        self.columns = columns
+        self.edges = edges
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __repr__(self):
+        return '<%s: %d rows, %s>' % (
+            self.__class__.__name__, self.length, list(self.columns))
+
+
+def to_columns(packages, field_names):
+    """
+    Builds `ColumnTable` of `field_names` of `packages`, column of
+    single field keeps raw values, column of list field keeps raw items.
+    """
+    packages = list(packages)
+    columns = {}
+    edges = {}
+    for name in field_names:
+        meta = fields.get_field_meta(name)
+        if meta.format == 'list':
+            columns[name] = _build_list_column(packages, name)
+        else:
+            columns[name] = _build_string_column(packages, name)
+        if meta.type == 'dependency':
+            edges[name] = _build_edge_table(packages, name)
+    return ColumnTable(len(packages), columns, edges)
+
+
+def _build_string_column(packages, name):
+    encoder = StringEncoder()
+    for package in packages:
+        value = package.get(name)
+        encoder.append(value._raw if value is not None else None)
+    return encoder.build()
+
+
+def _build_list_column(packages, name):
+    offsets = [0]
+    encoder = StringEncoder()
+    for package in packages:
+        value = package.get(name)
+        if value is not None:
+            if not isinstance(value, list):
+                value = [value]
+            for item in value:
+                encoder.append(item._raw if item is not None else None)
+        offsets.append(len(encoder.codes))
+    return ListColumn(make_int_array(offsets, wide=True), encoder.build())
+
+
+def _build_edge_table(packages, name):
+    package_indexes = []
+    groups = []
+    names = StringEncoder()
+    relations = StringEncoder()
+    versions = StringEncoder()
+
+    for package_index, package in enumerate(packages):
+        value = package.get(name)
+        if value is None:
+            continue
+        if not isinstance(value, list):
+            value = [value]
+        for group, item in enumerate(value):
+            for dependency in _iter_item_dependencies(item):
+                package_indexes.append(package_index)
+                groups.append(group)
+                names.append(dependency.name)
+                restriction = dependency.restriction
+                if restriction is None:
+                    relations.append(None)
+                    versions.append(None)
+                else:
+                    relations.append(restriction.relation)
+                    versions.append(restriction.version)
+
+    return EdgeTable(
+        package=make_int_array(package_indexes),
+        group=make_int_array(groups),
+        name=names.build(),
+        relation=relations.build(),
+        version=versions.build(),
+    )
+
+
+def _iter_item_dependencies(item):
+    dependency_type = getattr(item, 'type', None)
+    if dependency_type == 'simple':
+        yield item
+    elif dependency_type == 'alternative':
+        for alternative in item.alternatives:
+            if alternative.type == 'simple':
+                yield alternative
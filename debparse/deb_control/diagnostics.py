@@ -0,0 +1,185 @@
+# coding: utf-8
+"""
+Collecting of problems found while parsing instead of failing or
+logging every one of them.
+
+    diagnostics = Diagnostics(max_examples=5)
+    control_data = deb_control.parse(path, diagnostics=diagnostics)
+    diagnostics.counts    # category -> count
+    diagnostics.examples  # category -> first `Diagnostic`s with location
+
+Categories are 'field' (line without colon, the field is skipped),
+'contact' (value kept as name without email) and 'dependency'
+(alternative or dependency is dropped). Only counts are updated for
+problems after the first `max_examples` ones, so messy files cost
+almost nothing more. With `strict` the first problem raises
+`ParseError` instead.
+Without collector malformed fields and contacts raise ValueError and
+malformed dependencies are dropped silently.
+Values of lazy parsing are parsed on access, after collector is gone,
+so they are parsed as without collector then.
+"""
+
+import contextlib
+import collections
+import contextvars
+
+from . import paragraphs
+
+
+# collector of parsing going on, problems are reported from parsers of
+# field values, which know nothing about parsing of the whole file
+_current = contextvars.ContextVar('diagnostics', default=None)
+
+
+class ParseError(ValueError):
+
+    def __init__(self, diagnostic):
+        super(ParseError, self).__init__(diagnostic)
+        self.diagnostic = diagnostic
+
+    def __str__(self):
+        # location is found after the error is raised
+        return str(self.diagnostic)
+
+
+class Diagnostic(object):
+    """
+    Problem of `text` in paragraph with index `paragraph` (counted from
+    0, filtered out paragraphs too), `line` is number of line (counted
+    from 1) of text in parsed data if it is found.
+    """
+    __slots__ = ('category', 'message', 'text', 'paragraph', 'line')
+
+    def __init__(self, category, message, text, paragraph=None, line=None):
+        self.category = category
+        self.message = message
+        self.text = text
+        self.paragraph = paragraph
+        self.line = line
+
+    def locate(self, data, spans):
+        """
+        Finds `line` of diagnostic in `data` with `spans` of its
+        paragraphs, see `paragraphs.get_paragraph_spans`.
+        """
+        if self.paragraph is None or self.paragraph >= len(spans):
+            return
+        start, end = spans[self.paragraph]
+        position = data.find(self.text, start, end)
+        if position == -1:
+            # continuation lines of fields are joined in text
+            position = data.find(self.text.split(' ', 1)[0], start, end)
+        if position == -1:
+            position = start
+        self.line = data.count('\n', 0, position) + 1
+
+    def __reduce__(self):
+        return self.__class__, (
+            self.category, self.message, self.text, self.paragraph,
+            self.line)
+
+    def __str__(self):
+        location = []
+        if self.paragraph is not None:
+            location.append('paragraph %d' % self.paragraph)
+        if self.line is not None:
+            location.append('line %d' % self.line)
+        result = '%s: %s in %r' % (self.category, self.message, self.text)
+        if location:
+            result += ' (%s)' % ', '.join(location)
+        return result
+
+    def __repr__(self):
+        return '<%s: %s>' % (self.__class__.__name__, self)
+
+
+class Diagnostics(object):
+
+    def __init__(self, max_examples=10, strict=False):
+        self.max_examples = max_examples
+        self.strict = strict
+        self.counts = collections.Counter()
+        # category -> first diagnostics
+        self.examples = collections.OrderedDict()
+        # index of paragraph being parsed
+        self.paragraph = None
+
+    def add(self, category, message, text):
+        self.counts[category] += 1
+        if self.strict:
+            raise ParseError(
+                Diagnostic(category, message, text, self.paragraph))
+        examples = self.examples.setdefault(category, [])
+        if len(examples) < self.max_examples:
+            examples.append(
+                Diagnostic(category, message, text, self.paragraph))
+
+    @contextlib.contextmanager
+    def collecting(self, data=None):
+        """
+        Context manager reporting problems of parsing inside of it to
+        this collector. With parsed `data` lines of problems are found
+        when parsing is over.
+        """
+        token = _current.set(self)
+        try:
+            yield self
+        except ParseError as e:
+            if data is not None:
+                e.diagnostic.locate(data, paragraphs.get_paragraph_spans(data))
+            raise
+        finally:
+            _current.reset(token)
+            self.paragraph = None
+        if data is not None:
+            self.locate(data)
+
+    def locate(self, data, spans=None):
+        """
+        Finds lines of examples in parsed `data`.
+        """
+        if not self.examples:
+            return
+        if spans is None:
+            spans = paragraphs.get_paragraph_spans(data)
+        for examples in self.examples.values():
+            for diagnostic in examples:
+                diagnostic.locate(data, spans)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def __bool__(self):
+        return bool(self.counts)
+
+    def __iter__(self):
+        for examples in self.examples.values():
+            for diagnostic in examples:
+                yield diagnostic
+
+    def as_dict(self):
+        return {
+            'counts': dict(self.counts),
+            'examples': dict(
+                (category, [str(diagnostic) for diagnostic in examples])
+                for category, examples in self.examples.items()
+            ),
+        }
+
+    def __repr__(self):
+        return '<%s: %s>' % (self.__class__.__name__, dict(self.counts))
+
+
+def report(category, message, text):
+    """
+    Reports problem to collector of parsing going on. Returns False if
+    there is no collector, so caller should fail or skip as it did
+    without diagnostics, True if parsing can go on.
+    """
+    diagnostics = _current.get()
+    if diagnostics is None:
+        return False
+    diagnostics.add(category, message, text)
+    return True
@@ -0,0 +1,325 @@
+# coding: utf-8
+"""
+Differences between snapshots of index and application of PDiff
+patches (Packages.diff/) to parsed snapshot.
+
+    changes = diff.diff(old_control_data, new_control_data)
+    changes = diff.diff_files(old_path, new_path)
+    changes.added, changes.removed, changes.changed
+
+    control_data = diff.apply_pdiff_index(
+        control_data, 'dists/sid/main/binary-amd64/Packages.diff/Index')
+
+Paragraphs with the same text are skipped without parsing, so diff
+costs hashing of paragraphs and parsing of changed ones. Packages are
+matched by name (Package or Source field), architecture and order
+of packages with the same name and architecture. Patches are applied
+with `deb_control.reparse`, only touched paragraphs are parsed again.
+"""
+
+import os
+import re
+import hashlib
+import collections
+
+from debparse import utils
+
+from . import paragraphs, fields, classes, _reparse_edits
+
+
+_ed_command_regex = re.compile(r'^(\d+)(?:,(\d+))?([acd])$')
+
+
+class PDiffError(ValueError):
+    pass
+
+
+class ChangedPackage(object):
+    """
+    Package of both snapshots, `fields` are names of fields which were
+    added, removed or changed.
+    """
+    __slots__ = ('old', 'new', 'fields')
+
+    def __init__(self, old, new, fields):
+        self.old = old
+        self.new = new
+        self.fields = fields
+
+    def __repr__(self):
+        return '<%s: %s %s>' % (
+            self.__class__.__name__, self.new.id, self.fields)
+
+
+class ControlDataDiff(object):
+
+    def __init__(self, added=(), removed=(), changed=(), unchanged=0):
+        self.added = list(added)
+        self.removed = list(removed)
+        self.changed = list(changed)
+        # count of packages with the same text in both snapshots
+        self.unchanged = unchanged
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return '<%s: %d added, %d removed, %d changed, %d unchanged>' % (
+            self.__class__.__name__, len(self.added), len(self.removed),
+            len(self.changed), self.unchanged)
+
+
+def diff(old, new):
+    """
+    `ControlDataDiff` of `classes.ControlData` or lists of
+    `classes.Package`. Packages are compared by text they were parsed
+    from, changes made after parsing are not seen.
+    """
+    old_packages = list(getattr(old, 'packages', old))
+    new_packages = list(getattr(new, 'packages', new))
+    return _diff(
+        [package._raw for package in old_packages],
+        [package._raw for package in new_packages],
+        old_packages.__getitem__,
+        new_packages.__getitem__,
+    )
+
+
+def diff_data(old_data, new_data, lazy=False):
+    """
+    `ControlDataDiff` of contents of two control files, only changed
+    paragraphs are parsed.
+    """
+    old_raws = paragraphs.get_raw_paragraphs(old_data)
+    new_raws = paragraphs.get_raw_paragraphs(new_data)
+
+    def get_package(raws):
+        return lambda index: paragraphs.parse_paragraph(raws[index], lazy)
+
+    return _diff(
+        old_raws, new_raws, get_package(old_raws), get_package(new_raws))
+
+
+def diff_files(old_path, new_path, lazy=False):
+    return diff_data(
+        utils.get_file_contents(old_path),
+        utils.get_file_contents(new_path),
+        lazy=lazy,
+    )
+
+
+def _diff(old_raws, new_raws, get_old_package, get_new_package):
+    common = collections.Counter(old_raws) & collections.Counter(new_raws)
+    unchanged = sum(common.values())
+    old_indexes = _get_changed_indexes(old_raws, common.copy())
+    new_indexes = _get_changed_indexes(new_raws, common)
+
+    # key -> indexes of old paragraphs in order
+    old_keys = collections.OrderedDict()
+    for index in old_indexes:
+        old_keys.setdefault(
+            _get_key(old_raws[index]), collections.deque()).append(index)
+
+    result = ControlDataDiff(unchanged=unchanged)
+    for index in new_indexes:
+        old_matches = old_keys.get(_get_key(new_raws[index]))
+        if not old_matches:
+            result.added.append(get_new_package(index))
+            continue
+        old_index = old_matches.popleft()
+        result.changed.append(ChangedPackage(
+            get_old_package(old_index),
+            get_new_package(index),
+            _get_changed_fields(old_raws[old_index], new_raws[index]),
+        ))
+    result.removed.extend(
+        get_old_package(index)
+        for indexes in old_keys.values()
+        for index in indexes
+    )
+    return result
+
+
+def _get_changed_indexes(raws, common):
+    indexes = []
+    for index, raw in enumerate(raws):
+        if common.get(raw):
+            common[raw] -= 1
+        else:
+            indexes.append(index)
+    return indexes
+
+
+def _get_key(raw):
+    paragraph = classes.RawParagraph(raw)
+    name = paragraph.get('Package')
+    if name is None:
+        return 'source', paragraph.get('Source'), None
+    return 'binary', name, paragraph.get('Architecture')
+
+
+def _get_fields(raw):
+    # lowercased name -> (name, raw value)
+    result = collections.OrderedDict()
+    for raw_field in paragraphs.get_raw_fields(raw):
+        key, value = fields.get_raw_key_value(raw_field)
+        result[key.lower()] = (key, value)
+    return result
+
+
+def _get_changed_fields(old_raw, new_raw):
+    old_fields = _get_fields(old_raw)
+    new_fields = _get_fields(new_raw)
+    changed = [
+        key for folded_key, (key, value) in old_fields.items()
+        if new_fields.get(folded_key, (None, None))[1] != value
+    ]
+    changed.extend(
+        key for folded_key, (key, _) in new_fields.items()
+        if folded_key not in old_fields)
+    return changed
+
+
+def parse_ed_script(script):
+    """
+    Gives (first line, last line, lines) edits of ed script of PDiff
+    (output of diff --ed). Lines are numbered from 1, lines from first
+    to last are replaced with `lines`, appending after line N is edit
+    (N + 1, N, lines). Edits are in order of script, from the end of
+    file to its beginning.
+    """
+    edits = []
+    lines = utils.split_string_by_newline(script)
+    if lines and not lines[-1]:
+        lines.pop()
+    position = 0
+    while position < len(lines):
+        match = _ed_command_regex.match(lines[position])
+        if match is None:
+            raise PDiffError('Unsupported ed command %r' % lines[position])
+        position += 1
+        first = int(match.group(1))
+        last = int(match.group(2) or first)
+        command = match.group(3)
+        text = []
+        if command in 'ac':
+            while True:
+                if position == len(lines):
+                    raise PDiffError('Unterminated text of ed command')
+                line = lines[position]
+                position += 1
+                if line == '.':
+                    break
+                text.append(line)
+        if command == 'a':
+            first, last = first + 1, first
+        edits.append((first, last, text))
+    return edits
+
+
+def apply_pdiff(control_data, script, lazy=False):
+    """
+    Applies ed script of PDiff to `classes.ControlData` parsed from
+    text, gives new one, see `deb_control.reparse`.
+    """
+    edits = parse_ed_script(script)
+    # every command is applied to lines before ones of previous command,
+    # so all of them are in line numbers of original data
+    for (first, _, _), (_, last, _) in zip(edits, edits[1:]):
+        if last >= first:
+            raise PDiffError('ed commands are not in descending order')
+    edits.reverse()
+
+    data = control_data._raw
+    offsets = _get_line_offsets(
+        data, [line for first, last, _ in edits for line in (first, last)])
+    text_edits = []
+    for first, last, lines in edits:
+        if not 1 <= first <= last + 1 or last + 1 not in offsets:
+            raise PDiffError('ed command is out of data lines')
+        text_edits.append((
+            offsets[first], offsets[last + 1],
+            ''.join(line + '\n' for line in lines),
+        ))
+    return _reparse_edits(control_data, text_edits, lazy)
+
+
+def _get_line_offsets(data, line_numbers):
+    # line number -> offset of its start for every line number and
+    # line after it, line after the last one starts at end of data
+    offsets = {}
+    line = 1
+    offset = 0
+    for target in sorted(set(line_numbers)):
+        for number in (target, target + 1):
+            if number in offsets:
+                continue
+            while line < number and offset < len(data):
+                newline = data.find('\n', offset)
+                offset = len(data) if newline == -1 else newline + 1
+                line += 1
+            if line == number:
+                offsets[number] = offset
+    return offsets
+
+
+def read_pdiff_index(path):
+    """
+    Gives (sha256 of current file, [(sha256 of history file, name of
+    patch)], merged) of Packages.diff/Index, `merged` patches update
+    their history files to the current one at once, other ones update
+    them to the next history file.
+    """
+    paragraph = classes.RawParagraph(utils.get_file_contents(path))
+    current = paragraph.get('SHA256-Current')
+    history = paragraph.get('SHA256-History')
+    if current is None or history is None:
+        raise PDiffError('%s has no SHA256 history' % path)
+    history = history.split()
+    return (
+        current.split()[0],
+        [
+            (history[index], history[index + 2])
+            for index in range(0, len(history), 3)
+        ],
+        paragraph.get('X-Patch-Precedence') == 'merged',
+    )
+
+
+def apply_pdiff_index(control_data, index_path, lazy=False):
+    """
+    Updates `classes.ControlData` parsed from text to the current
+    version of Packages.diff/Index by applying patches next to index.
+    """
+    current, history, merged = read_pdiff_index(index_path)
+    digest = _get_digest(control_data._raw)
+    if digest == current:
+        return control_data
+    names = [name for history_digest, name in history]
+    for position, (history_digest, _) in enumerate(history):
+        if history_digest == digest:
+            break
+    else:
+        raise PDiffError('Data is not in history of %s' % index_path)
+
+    directory = os.path.dirname(index_path)
+    patch_names = names[position:position + 1] if merged \
+        else names[position:]
+    for name in patch_names:
+        control_data = apply_pdiff(
+            control_data, _read_patch(directory, name), lazy)
+    if _get_digest(control_data._raw) != current:
+        raise PDiffError('Patched data does not match %s' % index_path)
+    return control_data
+
+
+def _read_patch(directory, name):
+    path = os.path.join(directory, name)
+    for patch_path in (path + '.gz', path):
+        if os.path.exists(patch_path):
+            return utils.get_file_contents(patch_path)
+    raise PDiffError('Patch %s is not found' % path)
+
+
+def _get_digest(data):
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
@@ -2,31 +2,37 @@
 
 
 import re
-import logging
+import sys
 
 from debparse import utils
-from . import classes
-
-
-log = logging.getLogger(__name__)
+from . import classes, diagnostics
 
 
 FIELDS = {
     'Architecture': 'enum',
     'Breaks': 'list/dependency',
+    'Build-Conflicts': 'list/dependency',
+    'Build-Conflicts-Arch': 'list/dependency',
+    'Build-Conflicts-Indep': 'list/dependency',
     'Build-Depends': 'list/dependency',
+    'Build-Depends-Arch': 'list/dependency',
+    'Build-Depends-Indep': 'list/dependency',
     'Conflicts': 'list/dependency',
     'Depends': 'list/dependency',
     'Description': 'text',
+    'Enhances': 'list/dependency',
     'Homepage': 'uri',
     'Maintainer': 'contact',
     'Package': 'simple',
+    'Pre-Depends': 'list/dependency',
     'Priority': 'optional',
     'Provides': 'list/dependency',
+    'Recommends': 'list/dependency',
     'Replaces': 'list/dependency',
     'Section': 'enum',
     'Source': 'simple',
     'Standards-Version': 'version',
+    'Suggests': 'list/dependency',
     'Uploaders': 'list/contact',
 }
 
@@ -44,27 +50,93 @@ def parse_field(data):
     comment character, #, nor with the hyphen character, -.
     """
     key, value = get_raw_key_value(data)
+    return key, parse_raw_field_value(key, value)
+
+
+def parse_field_lazy(data):
+    """
+    Same as `parse_field`, but only splits key and value.
+    Typed value is parsed on first access through `classes.Package`.
+    """
+    key, value = get_raw_key_value(data)
+    return key, get_lazy_value(key, value)
+
+
+def get_lazy_value(key, value):
+    return classes.LazyFieldValue(key, value, parse_raw_field_value)
+
+
+def parse_raw_field_value(key, value):
     field_meta = get_field_meta(key)
-    parsed_value = parse_field_value(value, meta=field_meta)
-    return key, parsed_value
+    return parse_field_value(value, meta=field_meta)
+
+
+class FieldSyntaxError(ValueError):
+    pass
 
 
 def get_raw_key_value(data):
-    key, value = data.split(':', 1)
-    key = key.strip()
+    try:
+        key, value = data.split(':', 1)
+    except ValueError:
+        raise FieldSyntaxError('Field without colon: %r' % data)
+    # field names repeat in every paragraph
+    key = sys.intern(key.strip())
     value = value.strip()
     return key, value
 
 
-def lookup_field_spec(key):
-    for canonical_name, spec in list(FIELDS.items()):
-        if key.lower() == canonical_name.lower():
-            return canonical_name, spec
-    return 'Unknown', 'single/simple'
+# lowercased field name -> shared classes.FieldMeta
+_field_metas = {}
+# (lowercased prefix, canonical prefix, spec) for names like 'Vcs-*'
+_field_patterns = []
+# field type -> parser(raw_value, meta)
+_type_parsers = {}
+# memoized lookups of pattern matched and unknown field names
+_lookup_cache = {}
+LOOKUP_CACHE_SIZE = 4096
 
+UNKNOWN_FIELD_META = classes.FieldMeta(
+    format='single',
+    type='simple',
+    canonical_name='Unknown',
+)
 
-def get_field_meta(key):
-    canonical_name, spec = lookup_field_spec(key)
+
+def register_field(name, spec):
+    """
+    Registers field with `spec` written as in `FIELDS`,
+    e.g. 'list/dependency' or 'simple'.
+    `name` ending with '*' matches every field with such prefix,
+    e.g. 'Vcs-*' or 'Checksums-*'.
+    Exact names have priority over patterns, longer patterns over shorter.
+    """
+    _lookup_cache.clear()
+    if name.endswith('*'):
+        prefix = name[:-1]
+        _field_patterns[:] = [
+            pattern for pattern in _field_patterns
+            if pattern[0] != prefix.lower()
+        ]
+        _field_patterns.append((prefix.lower(), prefix, spec))
+        _field_patterns.sort(key=lambda pattern: -len(pattern[0]))
+    else:
+        _field_metas[name.lower()] = make_field_meta(name, spec)
+
+
+def register_field_type(type, parser):
+    """
+    Registers `parser(raw_value, meta)` for fields of `type`.
+    """
+    _type_parsers[type] = parser
+    _lookup_cache.clear()
+    for folded_name, meta in list(_field_metas.items()):
+        if meta.type == type:
+            _field_metas[folded_name] = make_field_meta(
+                meta.canonical_name, get_field_spec(meta))
+
+
+def make_field_meta(canonical_name, spec):
     if '/' in spec:
         format, type = spec.split('/')
     else:
@@ -74,9 +146,43 @@ def get_field_meta(key):
         format=format,
         type=type,
         canonical_name=canonical_name,
+        parser=_type_parsers.get(type, parse_field_type_simple),
     )
 
 
+def get_field_spec(meta):
+    if meta.format == 'single':
+        return meta.type
+    return '%s/%s' % (meta.format, meta.type)
+
+
+def lookup_field_spec(key):
+    meta = get_field_meta(key)
+    return meta.canonical_name, get_field_spec(meta)
+
+
+def get_field_meta(key):
+    """
+    Returns shared immutable `classes.FieldMeta` for field name `key`.
+    """
+    folded_key = key.lower()
+    meta = _field_metas.get(folded_key)
+    if meta is None:
+        meta = _lookup_cache.get(folded_key)
+    if meta is None:
+        meta = _match_field_pattern(key, folded_key)
+        if len(_lookup_cache) < LOOKUP_CACHE_SIZE:
+            _lookup_cache[folded_key] = meta
+    return meta
+
+
+def _match_field_pattern(key, folded_key):
+    for folded_prefix, prefix, spec in _field_patterns:
+        if folded_key.startswith(folded_prefix):
+            return make_field_meta(prefix + key[len(prefix):], spec)
+    return UNKNOWN_FIELD_META
+
+
 def parse_field_value(raw_value, meta=None):
     if meta and meta.format == 'list':
         if ',' in raw_value:
@@ -94,8 +200,8 @@ def parse_field_value(raw_value, meta=None):
 
 
 def parse_typed_field_value(raw_value, meta=None):
-    type_parser_name = 'parse_field_type_' + meta.type
-    type_parser = globals().get(type_parser_name, parse_field_type_simple)
+    type_parser = meta.parser or _type_parsers.get(
+        meta.type, parse_field_type_simple)
     return type_parser(raw_value, meta)
 
 
@@ -106,9 +212,15 @@ def parse_field_type_simple(raw_value, meta=None):
         text=raw_value
     )
 
-personRx = re.compile(r"^\s*(.+)\s*(?:<\s*([^>]+?)\s*>)?\s*$")
+personRx = re.compile(r"^\s*(.+?)\s*(?:<\s*([^>]+?)\s*>)?\s*$")
 def parse_field_type_contact(raw_value, meta=None):
-    name, email = personRx.match(raw_value).groups()
+    match = personRx.match(raw_value)
+    if match is not None:
+        name, email = match.groups()
+    elif diagnostics.report('contact', 'Contact expected', raw_value):
+        name, email = raw_value.strip() or None, None
+    else:
+        raise ValueError('Contact expected: %r' % raw_value)
     return classes.ContactField(
         _raw=raw_value,
         meta=meta,
@@ -121,112 +233,168 @@ def parse_field_type_contact(raw_value, meta=None):
 # https://www.debian.org/doc/debian-policy/ch-relationships.html
 # https://www.debian.org/doc/debian-policy/ch-controlfields.html#s-f-Version
 # https://www.debian.org/doc/manuals/maint-guide/dreq.en.html#control
-DEPENDENCY_PATTERN = re.compile(r"""
-    (
-        # Package names must consist only of lower case letters (a-z),
-        # digits (0-9), plus (+) and minus (-) signs, and periods (.).
-        # They must be at least two characters long and must start with an
-        # alphanumeric character.
-        (?P<name>[a-z0-9][a-z0-9+\-\.]+)
-        # Whitespace may appear at any point in the version specification
-        # subject to the rules in Syntax of control files
-        [ ]*
-        # optional version restriction
-        (
-            \(
-                # The relations allowed are <<, <=, =, >= and >> for strictly
-                # earlier, earlier or equal, exactly equal, later or equal and
-                # strictly later, respectively. The deprecated forms < and >
-                # were confusingly used to mean earlier/later or equal, rather
-                # than strictly earlier/later, and must not appear in new
-                # packages (though dpkg still supports them with a warning).
-                (?P<relation>(<<|>>|<=|>=|=))
-                # some optional whitespaces
-                [ ]*
-                # The format is: [epoch:]upstream_version[-debian_revision]
-                # For now let's be forgiving about version, because validation
-                # is not the case in this library.
-                (?P<version>.+)
-            \)
-        )?
-        # optional whitespaces
-        [ ]*
-        # Relationships may be restricted to a certain set of
-        # architectures. This is indicated in brackets after each
-        # individual package name and the optional version specification.
-        # The brackets enclose a non-empty list of Debian architecture
-        # names in the format described in Architecture specification
-        # strings, separated by whitespace.
-        (
-            \[(?P<architecture>.+)\]
-        )?
-    # OR
-    |
-        # dh_gencontrol(1) generates DEBIAN/control for each binary package
-        # while substituting
-        # ${shlibs:Depends}, ${perl:Depends}, ${misc:Depends}, etc.
-        (?P<placeholder>\$\{.+\})
-    )
-""", re.VERBOSE)
+#
+# Dependencies are tokenized by hand: every alternative is scanned left to
+# right with `str.find`, which never goes back, so time is linear
+# in length of the value whatever it contains.
+
+# The relations allowed are <<, <=, =, >= and >> for strictly
+# earlier, earlier or equal, exactly equal, later or equal and
+# strictly later, respectively. The deprecated forms < and >
+# were confusingly used to mean earlier/later or equal, rather
+# than strictly earlier/later, and must not appear in new
+# packages (though dpkg still supports them with a warning).
+RELATIONS = ('<<', '<=', '=', '>=', '>>', '<', '>')
+
+# symbols ending package name
+NAME_TERMINATORS = ('(', '[', '<', ' ', '\t', '\n')
+WHITESPACE = ' \t\n'
+
+
+class DependencySyntaxError(ValueError):
+    pass
 
 
 def parse_field_type_dependency(raw_value, meta=None):
     if '|' in raw_value:
-        raw_value = utils.split_string(raw_value, separator='|', strip=True)
         alternatives = []
-        for dependency in raw_value:
-            match = re.match(DEPENDENCY_PATTERN, dependency)
-            if match:
-                parsed = match.groupdict()
-                alternatives.append(_build_dependency_class(
-                    parsed=parsed,
-                    raw_value=raw_value,
-                    meta=meta
-                ))
-            else:
-                log.warning('Dependency parse error on %s', dependency)
+        for dependency in utils.split_string_by_bar(raw_value):
+            try:
+                alternatives.append(parse_dependency(dependency, meta))
+            except DependencySyntaxError as e:
                 # TODO: add some UnparsedVersion object
+                diagnostics.report('dependency', str(e), dependency)
         return classes.DependencyAlternative(
             _raw=raw_value,
-            alternatives=alternatives
+            meta=meta,
+            alternatives=alternatives,
         )
     else:
-        match = re.match(DEPENDENCY_PATTERN, raw_value)
-        if match is None:
+        try:
+            return parse_dependency(raw_value, meta)
+        except DependencySyntaxError as e:
+            diagnostics.report('dependency', str(e), raw_value)
             return
-        else:
-            parsed = match.groupdict()
-            return _build_dependency_class(
-                parsed=parsed,
-                raw_value=raw_value,
-                meta=meta,
-            )
-
 
-def _build_dependency_class(parsed, raw_value, meta):
-    name = parsed['name']
 
-    relation = parsed['relation']
-    version = parsed['version']
-    architecture = parsed['architecture']
-    placeholder = parsed['placeholder']
+def parse_dependency(raw_value, meta=None):
+    """
+    Parses single dependency without alternatives, kind of
+    'libc6:any (>= 2.17) [amd64 i386] <!nocheck> <!stage1>'
+    or substitution variable '${misc:Depends}'.
+    Raises DependencySyntaxError for malformed value.
+    """
+    raw_value = raw_value.strip()
 
-    if placeholder:
+    # dh_gencontrol(1) generates DEBIAN/control for each binary package
+    # while substituting
+    # ${shlibs:Depends}, ${perl:Depends}, ${misc:Depends}, etc.
+    if raw_value.startswith('${') and \
+            raw_value.find('}') == len(raw_value) - 1:
         return classes.DependencyPlaceholder(
             _raw=raw_value,
             meta=meta,
-            name=placeholder,
-            restriction=None,
-            architecture=None,
+            name=raw_value,
         )
+
+    # Package names must consist only of lower case letters (a-z),
+    # digits (0-9), plus (+) and minus (-) signs, and periods (.),
+    # they may be followed by architecture qualifier like :any or :native.
+    # For now let's be forgiving about names, because validation
+    # is not the case in this library.
+    end = len(raw_value)
+    name_end = end
+    for terminator in NAME_TERMINATORS:
+        position = raw_value.find(terminator, 0, name_end)
+        if position != -1:
+            name_end = position
+    name, _, arch_qualifier = raw_value[:name_end].partition(':')
+    if not name:
+        raise DependencySyntaxError('Package name expected')
+
+    # Whitespace may appear at any point in the version specification
+    # subject to the rules in Syntax of control files
+    position = _skip_whitespace(raw_value, name_end)
+
+    restriction = None
+    if raw_value.startswith('(', position):
+        closing = _find_closing(raw_value, ')', position)
+        restriction = _parse_restriction(raw_value[position + 1:closing])
+        position = _skip_whitespace(raw_value, closing + 1)
+
+    # Relationships may be restricted to a certain set of
+    # architectures. This is indicated in brackets after each
+    # individual package name and the optional version specification.
+    # The brackets enclose a non-empty list of Debian architecture
+    # names in the format described in Architecture specification
+    # strings, separated by whitespace.
+    architecture = None
+    if raw_value.startswith('[', position):
+        closing = _find_closing(raw_value, ']', position)
+        architecture = raw_value[position + 1:closing].strip()
+        if not architecture:
+            raise DependencySyntaxError('Empty architecture list')
+        position = _skip_whitespace(raw_value, closing + 1)
+
+    # Build profiles restriction formulas follow in angle brackets,
+    # e.g. <!nocheck> <stage1 cross>
+    profiles = []
+    while raw_value.startswith('<', position):
+        closing = _find_closing(raw_value, '>', position)
+        profile = raw_value[position + 1:closing].strip()
+        if not profile:
+            raise DependencySyntaxError('Empty build profile')
+        profiles.append(profile)
+        position = _skip_whitespace(raw_value, closing + 1)
+
+    if position != end:
+        raise DependencySyntaxError(
+            'Unexpected %r at %d' % (raw_value[position], position))
+
+    return classes.DependencySimple(
+        _raw=raw_value,
+        meta=meta,
+        name=name,
+        restriction=restriction,
+        architecture=architecture,
+        arch_qualifier=arch_qualifier or None,
+        profiles=tuple(profiles) if profiles else None,
+    )
+
+
+def _parse_restriction(raw_value):
+    raw_value = raw_value.strip()
+    for relation in RELATIONS:
+        if raw_value.startswith(relation):
+            break
     else:
-        return classes.DependencySimple(
-            _raw=raw_value,
-            meta=meta,
-            name=name,
-            restriction=classes.Restriction(
-                relation=relation,
-                version=version,
-            ) if version else None,
-            architecture=architecture,
-        )
+        raise DependencySyntaxError('Relation expected in %r' % raw_value)
+    # The format is: [epoch:]upstream_version[-debian_revision]
+    # For now let's be forgiving about version, because validation
+    # is not the case in this library.
+    version = raw_value[len(relation):].strip()
+    if not version:
+        raise DependencySyntaxError('Version expected in %r' % raw_value)
+    return classes.Restriction(relation=relation, version=version)
+
+
+def _find_closing(raw_value, symbol, position):
+    closing = raw_value.find(symbol, position + 1)
+    if closing == -1:
+        raise DependencySyntaxError(
+            'Unclosed %r at %d' % (raw_value[position], position))
+    return closing
+
+
+def _skip_whitespace(raw_value, position):
+    end = len(raw_value)
+    while position < end and raw_value[position] in WHITESPACE:
+        position += 1
+    return position
+
+
+register_field_type('simple', parse_field_type_simple)
+register_field_type('contact', parse_field_type_contact)
+register_field_type('dependency', parse_field_type_dependency)
+for name, spec in FIELDS.items():
+    register_field(name, spec)
@@ -6,8 +6,10 @@ https://www.debian.org/doc/debian-policy/ch-controlfields.html
 
 
 
+import sys
+
 from debparse import utils
-from . import fields, classes
+from . import fields, classes, diagnostics
 
 
 def get_raw_paragraphs(data):
@@ -21,8 +23,18 @@ def get_raw_paragraphs(data):
     :return list of str
     """
     lines = utils.split_string_by_newline(data)
+    return list(iter_raw_paragraphs(lines))
+
 
-    raw_paragraphs = []
+def iter_raw_paragraphs(lines):
+    """
+    Lazy version of `get_raw_paragraphs`.
+    Takes iterable of lines without trailing newlines, so only one
+    paragraph is kept in memory at a time.
+
+    :param lines: iterable of str
+    :return generator of str
+    """
     lines_buffer = []
 
     for line in lines:
@@ -33,35 +45,98 @@ def get_raw_paragraphs(data):
             lines_buffer.append(line)
         elif not line and lines_buffer:
             # end of paragraph
-            raw_paragraphs.append(lines_buffer)
+            yield utils.join_string_list_with_newline(lines_buffer)
             lines_buffer = []
 
     # don't forget last paragraph
     if lines_buffer:
-        raw_paragraphs.append(lines_buffer)
+        yield utils.join_string_list_with_newline(lines_buffer)
 
-    return list(map(utils.join_string_list_with_newline, raw_paragraphs))
 
+def split_raw_data(data, count):
+    """
+    Splits control file contents into about `count` chunks at empty lines,
+    so paragraphs of all chunks are the same as paragraphs of `data`.
 
-def parse_paragraph(data):
+    :param data: basestring
+    :param count: int
+    :return list of str
+    """
+    chunk_size = len(data) // count + 1
+    chunks = []
+    start = 0
+
+    while start < len(data):
+        # first newline ends the line, the second one is an empty line
+        end = data.find('\n\n', start + chunk_size)
+        if end == -1:
+            chunks.append(data[start:])
+            break
+        chunks.append(data[start:end + 1])
+        start = end + 1
+
+    return chunks
+
+
+def parse_paragraph(data, lazy=False, field_names=None):
     """
     Paragraph `data` must not contain blank lines.
     Each paragraph consists of a series of data fields.
+    With `lazy` field values are parsed on first access.
+    With `field_names`, set of lowercased field names, other fields are
+    skipped without parsing.
     """
-    raw_fields = get_raw_fields(data)
-    parsed_fields = list(map(fields.parse_field, raw_fields))
     return classes.Package(
-        parsed_fields,
+        parse_raw_fields(get_raw_fields(data, field_names), lazy),
         _raw=data,
     )
 
 
-def get_raw_fields(data):
+def parse_raw_fields(raw_fields, lazy=False):
+    """
+    Gives (key, value) of `raw_fields`, malformed fields are skipped if
+    they are reported to `diagnostics` collector.
+    """
+    if lazy:
+        get_value = fields.get_lazy_value
+    else:
+        get_value = fields.parse_raw_field_value
+    return [
+        (key, get_value(key, value))
+        for key, value in split_raw_fields(raw_fields)
+    ]
+
+
+def split_raw_fields(raw_fields):
+    """
+    Gives (key, raw value) of `raw_fields`, malformed fields are skipped
+    if they are reported to `diagnostics` collector.
+    """
+    try:
+        return list(map(fields.get_raw_key_value, raw_fields))
+    except fields.FieldSyntaxError:
+        pass
+    # only paragraphs with malformed fields get here
+    key_values = []
+    for raw_field in raw_fields:
+        try:
+            key_values.append(fields.get_raw_key_value(raw_field))
+        except fields.FieldSyntaxError:
+            if not diagnostics.report('field', 'Colon expected', raw_field):
+                raise
+    return key_values
+
+
+def get_raw_fields(data, field_names=None):
     """
     `data` should be paragraph (str or list of str)
     without blank lines around block, or inside it.
+    With `field_names`, set of lowercased field names, only these
+    fields are returned.
     """
     lines = utils.split_string_by_newline(data)
+    if field_names is not None:
+        return _get_projected_raw_fields(lines, field_names)
 
     blank_symbols = (' ', '\t')
 
@@ -85,5 +160,201 @@ def get_raw_fields(data):
     return list(map(utils.join_string_list_with_space, raw_fields))
 
 
+def _get_projected_raw_fields(lines, field_names):
+    blank_symbols = (' ', '\t')
+
+    raw_fields = []
+    # lines of current field, None if field is skipped
+    lines_buffer = None
+    started = False
+
+    for line in lines:
+        if started and line.startswith(blank_symbols):
+            if lines_buffer is not None:
+                lines_buffer.append(line)
+            continue
+        if lines_buffer is not None:
+            raw_fields.append(lines_buffer)
+        started = True
+        key = line.partition(':')[0].strip().lower()
+        lines_buffer = [line] if key in field_names else None
+
+    if lines_buffer is not None:
+        raw_fields.append(lines_buffer)
+
+    return list(map(utils.join_string_list_with_space, raw_fields))
+
+
+def iter_paragraph_spans(data):
+    """
+    Yields (start, end) offsets of paragraphs in `data`, which can be
+    str, bytes or mmap. Paragraphs are the same as `get_raw_paragraphs`
+    gives, but nothing is copied, so comment lines stay inside of spans.
+    Only the part of `data` up to the current paragraph is read.
+    """
+    newline, empty_line, comment, _, _, _ = _get_tokens(data)
+    size = len(data)
+    start = 0
+
+    while start < size:
+        if data[start:start + 1] == newline:
+            start += 1
+            continue
+        # first newline ends the last line, the second one is an empty line
+        end = data.find(empty_line, start)
+        if end == -1:
+            end = size
+            if data[end - 1:end] == newline:
+                end -= 1
+        if _has_not_comment_line(data, start, end):
+            yield start, end
+        start = end + 1
+
+
+def get_paragraph_spans(data):
+    return list(iter_paragraph_spans(data))
+
+
+def keep_comments(data, packages, trailing=True):
+    """
+    Comment lines are dropped from `_raw` of packages, so packages of
+    paragraphs of `data` with comments around or inside of them keep
+    (comment blocks before paragraph, paragraph text, comment blocks
+    after it) as `_source` for `writer`. Comment blocks before the first
+    paragraph belong to it and ones after the last paragraph belong to
+    the last one if `trailing`. Paragraphs without packages, e.g.
+    filtered out ones, are skipped with their comments.
+    Costs one scan of `data` if it has no comment lines.
+    """
+    if not has_comment_line(data):
+        return
+    packages = iter(packages)
+    package = next(packages, None)
+    gap_start = 0
+    last_text = None
+
+    for start, end in iter_paragraph_spans(data):
+        text = data[start:end]
+        has_comments = has_comment_line(text)
+        raw = _drop_comment_lines(text) if has_comments else text
+        if package is None or package._raw != raw:
+            gap_start = end + 1
+            last_text = None
+            continue
+        before = data[gap_start:start].strip('\n')
+        if before or has_comments:
+            package._source = (before + '\n\n' if before else '', text, '')
+        gap_start = end + 1
+        last_package, last_text = package, text
+        package = next(packages, None)
+
+    after = data[gap_start:].strip('\n')
+    if trailing and after and last_text is not None:
+        before, text, _ = last_package.__dict__.get(
+            '_source', ('', last_text, ''))
+        last_package._source = (before, text, '\n\n' + after)
+
+
+def get_edges(data):
+    """
+    (head, tail) of `data` for `writer`, which writes head before the
+    first paragraph and tail instead of newline after the last one:
+    blank lines before and after paragraphs or the whole `data` as head
+    if it has no paragraphs, e.g. only comments.
+    """
+    if not isinstance(data, str):
+        return None
+    if next(iter_paragraph_spans(data), None) is None:
+        return data, ''
+    # data is not stripped, as it would be copied
+    start = 0
+    while data[start] == '\n':
+        start += 1
+    end = len(data)
+    while data[end - 1] == '\n':
+        end -= 1
+    return data[:start], data[end:]
+
+
+def _drop_comment_lines(text):
+    return '\n'.join(
+        line for line in text.split('\n') if not line.startswith('#'))
+
+
+def iter_field_spans(data, start, end):
+    """
+    Yields (start, colon, end) offsets of fields in paragraph span
+    of `data`, same fields as `get_raw_fields` gives.
+    """
+    newline, _, comment, space, tab, colon_symbol = _get_tokens(data)
+    blank_symbols = (space, tab)
+    field = None
+    line_start = start
+
+    while line_start < end:
+        line_end = data.find(newline, line_start, end)
+        if line_end == -1:
+            line_end = end
+        first_symbol = data[line_start:line_start + 1]
+        if first_symbol == comment:
+            pass
+        elif first_symbol in blank_symbols and field is not None:
+            field[2] = line_end
+        else:
+            if field is not None:
+                yield tuple(field)
+            colon = data.find(colon_symbol, line_start, line_end)
+            if colon == -1:
+                raise ValueError('No colon in field at offset %d' % line_start)
+            field = [line_start, colon, line_end]
+        line_start = line_end + 1
+
+    if field is not None:
+        yield tuple(field)
+
+
+def parse_paragraph_span(data, start, end):
+    """
+    Lazily parsed `classes.MappedPackage` for paragraph span of `data`.
+    Only field names are decoded, values are decoded on access.
+    """
+    package = classes.MappedPackage(_buffer=data, _span=(start, end))
+    for field_start, colon, field_end in iter_field_spans(data, start, end):
+        key = utils.get_span_text(data, field_start, colon, joiner=' ')
+        key = sys.intern(key.strip())
+        package._add_field(key, classes.MappedFieldValue(
+            key, data, field_start, field_end, parse_field_span))
+    return package
+
+
+def parse_field_span(key, data, start, end):
+    raw_field = utils.get_span_text(data, start, end, joiner=' ')
+    _, value = fields.get_raw_key_value(raw_field)
+    return fields.parse_raw_field_value(key, value)
+
+
+_STR_TOKENS = ('\n', '\n\n', '#', ' ', '\t', ':')
+_BYTES_TOKENS = (b'\n', b'\n\n', b'#', b' ', b'\t', b':')
+
+
+def _get_tokens(data):
+    if isinstance(data, str):
+        return _STR_TOKENS
+    return _BYTES_TOKENS
+
+
+def has_comment_line(data):
+    return data.startswith('#') or '\n#' in data
 
 
+def _has_not_comment_line(data, start, end):
+    newline, _, comment, _, _, _ = _get_tokens(data)
+    line_start = start
+    while line_start < end:
+        if data[line_start:line_start + 1] != comment:
+            return True
+        line_end = data.find(newline, line_start, end)
+        if line_end == -1:
+            break
+        line_start = line_end + 1
+    return False
@@ -0,0 +1,141 @@
+# coding: utf-8
+"""
+Opt-in sharing of parsed data between `deb_control.parse` calls.
+
+    pool = ParsePool()
+    amd64 = deb_control.parse(amd64_path, pool=pool)
+    arm64 = deb_control.parse(arm64_path, pool=pool)
+
+Paragraph seen again, e.g. of `Architecture: all` package in indices of
+several architectures, gives the same `classes.FrozenPackage` instead
+of a new copy. Field values with the same field name and raw text, items
+of list fields and dependency names are shared between all packages of
+the pool, so repeated maintainers, sections or relations are kept once.
+Lazy values are shared too and parsed once for all packages.
+Packages of pool and their values are immutable, see
+`classes.freeze_value`, packages don't keep comments for `writer`.
+"""
+
+from . import paragraphs, fields, classes
+
+
+class ParsePool(object):
+
+    def __init__(self):
+        # (projected lowercased field names, raw paragraph) -> package
+        self._packages = {}
+        # lowercased field name -> {raw value: value or lazy value}
+        self._values = {}
+        # lowercased field name -> {raw item: item of list value}
+        self._items = {}
+        self._strings = {}
+
+    def __len__(self):
+        return len(self._packages)
+
+    def intern(self, string):
+        if string is None:
+            return None
+        return self._strings.setdefault(string, string)
+
+    def parse_paragraph(self, data, lazy=False, field_names=None):
+        """
+        Same as `paragraphs.parse_paragraph`, but gives shared
+        `classes.FrozenPackage`. Package of paragraph parsed before is
+        given as it is, whether it was parsed lazily or not.
+        """
+        key = (field_names, data)
+        package = self._packages.get(key)
+        if package is None:
+            package = self._packages[key] = self._build_package(
+                data, lazy, field_names)
+        return package
+
+    def _build_package(self, data, lazy, field_names):
+        parsed_fields = paragraphs.parse_raw_fields(
+            paragraphs.get_raw_fields(data, field_names), lazy)
+        return classes.FrozenPackage(
+            [
+                (key, self._share_field(key, value))
+                for key, value in parsed_fields
+            ],
+            _raw=data,
+        )
+
+    def _share_field(self, key, value):
+        raw = getattr(value, '_raw', None)
+        if raw is None:
+            return value
+        folded_key = key.lower()
+        values = self._values.get(folded_key)
+        if values is None:
+            values = self._values[folded_key] = {}
+        shared = values.get(raw)
+        if shared is None:
+            if isinstance(value, classes.LazyFieldValue):
+                shared = SharedLazyFieldValue(key, raw, self._parse_value)
+            else:
+                shared = self._share_value(folded_key, value)
+            values[raw] = shared
+        elif isinstance(shared, SharedLazyFieldValue) and \
+                not isinstance(value, classes.LazyFieldValue):
+            shared = shared.parse()
+        return shared
+
+    def _parse_value(self, key, raw):
+        # parser of shared lazy values, parsed value replaces lazy one
+        folded_key = key.lower()
+        value = self._share_value(
+            folded_key, fields.parse_raw_field_value(key, raw))
+        self._values[folded_key][raw] = value
+        return value
+
+    def _share_value(self, folded_key, value):
+        if not isinstance(value, list):
+            self._intern_dependency(value)
+            return classes.freeze_value(value)
+        items = self._items.get(folded_key)
+        if items is None:
+            items = self._items[folded_key] = {}
+        shared_items = []
+        for item in value:
+            raw = getattr(item, '_raw', None)
+            if raw is not None:
+                shared = items.get(raw)
+                if shared is None:
+                    self._intern_dependency(item)
+                    shared = items[raw] = classes.freeze_value(item)
+                item = shared
+            shared_items.append(item)
+        return classes.FrozenListField(
+            shared_items, _raw=value._raw, meta=getattr(value, 'meta', None))
+
+    def _intern_dependency(self, value):
+        if not isinstance(value, classes.DependencySimple):
+            return
+        if value.type == 'alternative':
+            for alternative in value.alternatives:
+                self._intern_dependency(alternative)
+        else:
+            value.name = self.intern(value.name)
+
+
+class SharedLazyFieldValue(classes.LazyFieldValue):
+    """
+    Lazy value of several packages of pool, parsed once for all of them.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, key, raw, parser):
+        super(SharedLazyFieldValue, self).__init__(key, raw, parser)
+        self.value = None
+
+    def parse(self):
+        if self.value is None:
+            self.value = self.parser(self.key, self._raw)
+        return self.value
+
+    def __reduce__(self):
+        # parser belongs to pool, which is not pickled with packages
+        return classes.LazyFieldValue, (
+            self.key, self._raw, fields.parse_raw_field_value)
@@ -0,0 +1,271 @@
+# coding: utf-8
+"""
+Opt-in statistics of `deb_control.parse`.
+
+    stats = profiling.ParseStats(hook=report_stage)
+    control_data = deb_control.parse(path, stats=stats)
+    stats.times['dependencies'], stats.fields['Depends']
+
+With `stats` parse runs stages one after another over batches of
+paragraphs instead of paragraph by paragraph, so every stage is timed
+with a couple of timer calls per batch. Stages are the steps of
+`paragraphs.parse_raw_fields` and call the same functions, so malformed
+fields are skipped or fail the same way. Without `stats` the usual
+pipeline runs and nothing is measured.
+"""
+
+import time
+import collections
+
+from functools import partial
+
+from debparse import utils
+
+from . import paragraphs, fields, classes
+
+
+# read: reading and decompressing of file
+# paragraphs: splitting of data to paragraphs and `where` filtering
+# fields: splitting of paragraphs to field names and raw values
+# lookup: finding `classes.FieldMeta` of field names
+# values: parsing of values, except of dependency fields
+# dependencies: parsing of dependency fields
+# construction: creation of `classes.Package` and `classes.ControlData`
+STAGES = (
+    'read', 'paragraphs', 'fields', 'lookup', 'values', 'dependencies',
+    'construction',
+)
+# paragraphs passed through stages at once, intermediate results of
+# larger batches make garbage collector slow down the parsing
+BATCH_SIZE = 1000
+
+
+class ParseStats(object):
+    """
+    Collects time of `STAGES` in seconds and counts of parsed items,
+    one object can collect statistics of several parses.
+    `hook` is called as hook(stage, seconds, stats) when stage is over.
+    """
+
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.times = collections.OrderedDict(
+            (stage, 0.0) for stage in STAGES)
+        # size of parsed data encoded to utf-8
+        self.bytes = 0
+        self.paragraphs = 0
+        # canonical field name -> count
+        self.fields = collections.Counter()
+        # single dependencies, alternatives are counted one by one
+        self.dependencies = 0
+        # dependencies with alternatives
+        self.alternatives = 0
+        self.placeholders = 0
+        # dependencies or alternatives with syntax errors
+        self.unparsed = 0
+
+    @property
+    def total_time(self):
+        return sum(self.times.values())
+
+    def add_time(self, stage, seconds):
+        self.times[stage] += seconds
+        if self.hook is not None:
+            self.hook(stage, seconds, self)
+
+    def as_dict(self):
+        """
+        Plain dict of statistics, e.g. for json.
+        """
+        return {
+            'times': dict(self.times),
+            'total_time': self.total_time,
+            'bytes': self.bytes,
+            'paragraphs': self.paragraphs,
+            'fields': dict(self.fields),
+            'dependencies': self.dependencies,
+            'alternatives': self.alternatives,
+            'placeholders': self.placeholders,
+            'unparsed': self.unparsed,
+        }
+
+    def __repr__(self):
+        return '<%s: %d paragraphs, %.3fs>' % (
+            self.__class__.__name__, self.paragraphs, self.total_time)
+
+
+def parse(path, data, lazy, stats, fields=None, where=None,
+          diagnostics=None):
+    """
+    Instrumented counterpart of `deb_control.parse`.
+    """
+    if path:
+        start = time.perf_counter()
+        data = utils.get_file_contents(path)
+        _finish_stage(stats, 'read', start)
+
+    if diagnostics is None:
+        parsed_paragraphs = parse_chunk(data, lazy, stats, fields, where)
+    else:
+        with diagnostics.collecting(data):
+            parsed_paragraphs = parse_chunk(
+                data, lazy, stats, fields, where, diagnostics)
+    start = time.perf_counter()
+    paragraphs.keep_comments(data, parsed_paragraphs)
+    control_data = classes.ControlData(
+        _raw=data,
+        _path=path,
+        _edges=paragraphs.get_edges(data),
+        packages=parsed_paragraphs,
+    )
+    _finish_stage(stats, 'construction', start)
+
+    stats.bytes += len(data.encode('utf-8'))
+    return control_data
+
+
+def parse_chunk(data, lazy, stats, field_names=None, where=None,
+                diagnostics=None):
+    start = time.perf_counter()
+    raw_paragraphs = paragraphs.get_raw_paragraphs(data)
+    indexes = range(len(raw_paragraphs))
+    if where is not None:
+        indexes = [
+            index for index, raw in enumerate(raw_paragraphs)
+            if where(classes.RawParagraph(raw))
+        ]
+        raw_paragraphs = [raw_paragraphs[index] for index in indexes]
+    _finish_stage(stats, 'paragraphs', start)
+
+    parsed_paragraphs = []
+    for batch_start in range(0, len(raw_paragraphs), BATCH_SIZE):
+        batch_end = batch_start + BATCH_SIZE
+        parsed_paragraphs.extend(_parse_batch(
+            raw_paragraphs[batch_start:batch_end], lazy, stats,
+            field_names, diagnostics, indexes[batch_start:batch_end]))
+    return parsed_paragraphs
+
+
+def _parse_batch(raw_paragraphs, lazy, stats, field_names,
+                 diagnostics=None, indexes=None):
+    # stages of `paragraphs.parse_raw_fields` are run one after another
+    # for the whole batch
+    start = time.perf_counter()
+    key_values = _map_paragraphs(
+        paragraphs.split_raw_fields,
+        [
+            paragraphs.get_raw_fields(raw, field_names)
+            for raw in raw_paragraphs
+        ],
+        diagnostics, indexes)
+    start = _finish_stage(stats, 'fields', start)
+
+    metas = [
+        [fields.get_field_meta(key) for key, _ in paragraph_key_values]
+        for paragraph_key_values in key_values
+    ]
+    start = _finish_stage(stats, 'lookup', start)
+
+    if lazy:
+        values = [
+            [
+                fields.get_lazy_value(key, value)
+                for key, value in paragraph_key_values
+            ]
+            for paragraph_key_values in key_values
+        ]
+        start = _finish_stage(stats, 'values', start)
+    else:
+        values = [
+            [None] * len(paragraph_metas) for paragraph_metas in metas]
+        paragraphs_to_parse = list(zip(key_values, metas, values))
+        _map_paragraphs(
+            partial(_parse_values, dependencies=False),
+            paragraphs_to_parse, diagnostics, indexes)
+        start = _finish_stage(stats, 'values', start)
+        _map_paragraphs(
+            partial(_parse_values, dependencies=True),
+            paragraphs_to_parse, diagnostics, indexes)
+        start = _finish_stage(stats, 'dependencies', start)
+
+    parsed_paragraphs = [
+        classes.Package(
+            list(zip(
+                [key for key, _ in paragraph_key_values],
+                paragraph_values,
+            )),
+            _raw=raw,
+        )
+        for raw, paragraph_key_values, paragraph_values in zip(
+            raw_paragraphs, key_values, values)
+    ]
+    _finish_stage(stats, 'construction', start)
+
+    _count(stats, key_values, metas, values, lazy)
+    return parsed_paragraphs
+
+
+def _map_paragraphs(function, items, diagnostics, indexes):
+    # problems reported to diagnostics know their paragraph
+    if diagnostics is None:
+        return list(map(function, items))
+    result = []
+    for index, item in zip(indexes, items):
+        diagnostics.paragraph = index
+        result.append(function(item))
+    return result
+
+
+def _parse_values(paragraph, dependencies):
+    # values of `classes.FieldMeta` type, the same as
+    # `fields.parse_raw_field_value` gives
+    key_values, metas, values = paragraph
+    for index, meta in enumerate(metas):
+        if (meta.type == 'dependency') is dependencies:
+            values[index] = fields.parse_field_value(
+                key_values[index][1], meta=meta)
+
+
+def _finish_stage(stats, stage, start):
+    end = time.perf_counter()
+    stats.add_time(stage, end - start)
+    return end
+
+
+def _count(stats, key_values, metas, values, lazy):
+    stats.paragraphs += len(metas)
+    for paragraph_key_values, paragraph_metas, paragraph_values in zip(
+            key_values, metas, values):
+        for (key, _), meta, value in zip(
+                paragraph_key_values, paragraph_metas, paragraph_values):
+            if meta is fields.UNKNOWN_FIELD_META:
+                stats.fields[key] += 1
+            else:
+                stats.fields[meta.canonical_name] += 1
+            if meta.type == 'dependency' and not lazy:
+                _count_dependencies(stats, value)
+
+
+def _count_dependencies(stats, value):
+    if not isinstance(value, list):
+        value = [value]
+    for dependency in value:
+        if not isinstance(dependency, classes.DependencySimple):
+            stats.unparsed += 1
+        elif dependency.type == 'alternative':
+            stats.alternatives += 1
+            for alternative in dependency.alternatives:
+                _count_dependency(stats, alternative)
+            # alternatives with syntax errors are skipped by parser
+            stats.unparsed += (
+                dependency._raw.count('|') + 1 -
+                len(dependency.alternatives))
+        else:
+            _count_dependency(stats, dependency)
+
+
+def _count_dependency(stats, dependency):
+    if dependency.type == 'placeholder':
+        stats.placeholders += 1
+    else:
+        stats.dependencies += 1
@@ -0,0 +1,348 @@
+# coding: utf-8
+"""
+grep-dctrl like queries over paragraphs.
+
+    net_ssl = query.compile('Depends has libssl3 and Section = net')
+    for package in net_ssl.search('/var/lib/apt/lists/..._Packages'):
+        ...
+    control_data = deb_control.parse(path, where=net_ssl)
+
+Conditions of expression are `field = text` (exact raw value),
+`field ~ regex` (search in raw value), `field has name` (name of
+dependency or of one of alternatives) and `field <op> version` with
+<<, <=, ==, >= or >> (Debian version comparison). They are combined
+with `and`, `or`, `not` and parentheses. Tokens are separated by spaces,
+values with spaces or parentheses are quoted with ' or ".
+The same queries are built with `Equals`, `Matches`, `HasDependency`,
+`CompareVersion` and &, |, ~ operators.
+
+Query is a `where` predicate of `deb_control.parse`: it is evaluated on
+`classes.RawParagraph` before paragraph is split to fields, so only
+matching paragraphs are parsed.
+"""
+
+import re
+import abc
+
+from . import classes, fields, versions
+
+
+VERSION_RELATIONS = {
+    '<<': '<<',
+    '<=': '<=',
+    '==': '=',
+    '>=': '>=',
+    '>>': '>>',
+}
+OPERATORS = ('=', '~', 'has') + tuple(VERSION_RELATIONS)
+KEYWORDS = ('and', 'or', 'not')
+
+_token_regex = re.compile(
+    r'\s*(?:(\(|\))|"((?:[^"\\]|\\.)*)"|\'((?:[^\'\\]|\\.)*)\'|'
+    r'([^\s()"\']+))'
+)
+_escape_regex = re.compile(r'\\(.)')
+
+
+class QueryError(ValueError):
+    pass
+
+
+class Query(abc.ABC):
+    """
+    Base of query nodes, `cost` orders conditions of `And` and `Or`
+    so that cheap ones are checked first.
+    """
+    __slots__ = ()
+    cost = 1
+
+    @abc.abstractmethod
+    def __call__(self, paragraph):
+        """
+        Checks `classes.RawParagraph`.
+        """
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+    def search(self, path_or_fileobj, lazy=False):
+        """
+        Yields `classes.Package` of matching paragraphs of file, see
+        `deb_control.iter_parse`.
+        """
+        from . import iter_parse
+        return iter_parse(path_or_fileobj, lazy=lazy, where=self)
+
+    def __repr__(self):
+        return '<%s: %s>' % (self.__class__.__name__, self)
+
+
+class Equals(Query):
+    __slots__ = ('field', 'value')
+
+    def __init__(self, field, value):
+        self.field = field
+        self.value = value
+
+    def __call__(self, paragraph):
+        return paragraph.get(self.field) == self.value
+
+    def __str__(self):
+        return '%s = %s' % (self.field, _quote(self.value))
+
+
+class Matches(Query):
+    __slots__ = ('field', 'regex')
+
+    def __init__(self, field, pattern):
+        self.field = field
+        self.regex = re.compile(pattern)
+
+    def __call__(self, paragraph):
+        value = paragraph.get(self.field)
+        return value is not None and self.regex.search(value) is not None
+
+    def __str__(self):
+        return '%s ~ %s' % (self.field, _quote(self.regex.pattern))
+
+
+class HasDependency(Query):
+    """
+    Field value mentions dependency `name`, alternatives included.
+    Only values where name is found as a word are parsed.
+    """
+    __slots__ = ('field', 'name', 'meta', 'regex')
+    cost = 2
+
+    def __init__(self, field, name):
+        self.field = field
+        self.name = name
+        self.meta = fields.get_field_meta(field)
+        if self.meta.type != 'dependency':
+            raise QueryError('%s is not a dependency field' % field)
+        self.regex = re.compile(
+            r'(?<![\w.+-])%s(?![\w.+-])' % re.escape(name))
+
+    def __call__(self, paragraph):
+        value = paragraph.get(self.field)
+        if value is None or self.regex.search(value) is None:
+            return False
+        parsed = fields.parse_field_value(value, meta=self.meta)
+        return any(
+            dependency.name == self.name
+            for dependency in classes.iter_dependencies(parsed)
+        )
+
+    def __str__(self):
+        return '%s has %s' % (self.field, _quote(self.name))
+
+
+class CompareVersion(Query):
+    """
+    Field value is a version satisfying `relation` ('<<', '<=', '=',
+    '>=' or '>>') to `version`, invalid versions don't match.
+    """
+    __slots__ = ('field', 'relation', 'version')
+
+    def __init__(self, field, relation, version):
+        if relation not in VERSION_RELATIONS.values():
+            raise QueryError('Unknown version relation %r' % relation)
+        self.field = field
+        self.relation = relation
+        self.version = version
+
+    def __call__(self, paragraph):
+        value = paragraph.get(self.field)
+        if value is None:
+            return False
+        try:
+            return versions.check_relation(
+                value, self.relation, self.version)
+        except ValueError:
+            return False
+
+    def __str__(self):
+        relation = '==' if self.relation == '=' else self.relation
+        return '%s %s %s' % (self.field, relation, _quote(self.version))
+
+
+class And(Query):
+    __slots__ = ('queries', 'cost')
+
+    def __init__(self, *queries):
+        self.queries = _flatten(self.__class__, queries)
+        self.cost = max(query.cost for query in self.queries)
+
+    def __call__(self, paragraph):
+        for query in self.queries:
+            if not query(paragraph):
+                return False
+        return True
+
+    def __str__(self):
+        return ' and '.join(_group(query) for query in self.queries)
+
+
+class Or(And):
+    __slots__ = ()
+
+    def __call__(self, paragraph):
+        for query in self.queries:
+            if query(paragraph):
+                return True
+        return False
+
+    def __str__(self):
+        return ' or '.join(_group(query) for query in self.queries)
+
+
+class Not(Query):
+    __slots__ = ('query', 'cost')
+
+    def __init__(self, query):
+        self.query = query
+        self.cost = query.cost
+
+    def __call__(self, paragraph):
+        return not self.query(paragraph)
+
+    def __str__(self):
+        return 'not %s' % _group(self.query)
+
+
+def _flatten(cls, queries):
+    flat = []
+    for query in queries:
+        if type(query) is cls:
+            flat.extend(query.queries)
+        else:
+            flat.append(query)
+    # stable, so order of conditions of the same cost is kept
+    return sorted(flat, key=lambda query: query.cost)
+
+
+def _group(query):
+    if isinstance(query, And):
+        return '(%s)' % query
+    return str(query)
+
+
+def _quote(value):
+    if value and _token_regex.match(value).group(4) == value and \
+            value not in KEYWORDS and value not in OPERATORS:
+        return value
+    return '"%s"' % value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def compile(expression):
+    """
+    Builds `Query` of text `expression`, see module docstring.
+    """
+    parser = _Parser(_tokenize(expression))
+    query = parser.parse_or()
+    if parser.peek() is not None:
+        raise QueryError('Unexpected %r' % parser.peek()[1])
+    return query
+
+
+def _tokenize(expression):
+    # (kind, text): kind is 'group', 'word' or 'quoted'
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _token_regex.match(expression, position)
+        if match is None:
+            raise QueryError(
+                'Unterminated quote at %d in %r' % (position, expression))
+        group, double_quoted, single_quoted, word = match.groups()
+        if group is not None:
+            tokens.append(('group', group))
+        elif word is not None:
+            tokens.append(('word', word))
+        else:
+            quoted = double_quoted if double_quoted is not None \
+                else single_quoted
+            tokens.append(('quoted', _escape_regex.sub(r'\1', quoted)))
+        position = match.end()
+    return tokens
+
+
+class _Parser(object):
+    """
+    Recursive descent parser of tokens: `or` binds weaker than `and`,
+    `and` binds weaker than `not`.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise QueryError('Unexpected end of query')
+        self.position += 1
+        return token
+
+    def is_keyword(self, keyword):
+        return self.peek() == ('word', keyword)
+
+    def parse_or(self):
+        queries = [self.parse_and()]
+        while self.is_keyword('or'):
+            self.take()
+            queries.append(self.parse_and())
+        return queries[0] if len(queries) == 1 else Or(*queries)
+
+    def parse_and(self):
+        queries = [self.parse_not()]
+        while self.is_keyword('and'):
+            self.take()
+            queries.append(self.parse_not())
+        return queries[0] if len(queries) == 1 else And(*queries)
+
+    def parse_not(self):
+        if self.is_keyword('not'):
+            self.take()
+            return Not(self.parse_not())
+        if self.peek() == ('group', '('):
+            self.take()
+            query = self.parse_or()
+            if self.take() != ('group', ')'):
+                raise QueryError('Expected )')
+            return query
+        return self.parse_condition()
+
+    def parse_condition(self):
+        kind, field = self.take()
+        if kind != 'word' or field in KEYWORDS:
+            raise QueryError('Expected field name, not %r' % field)
+        kind, operator = self.take()
+        if kind != 'word' or operator not in OPERATORS:
+            raise QueryError('Expected operator after %s, not %r' % (
+                field, operator))
+        kind, value = self.take()
+        if kind == 'group':
+            raise QueryError('Expected value after %s %s' % (
+                field, operator))
+        if operator == '=':
+            return Equals(field, value)
+        if operator == '~':
+            try:
+                return Matches(field, value)
+            except re.error as e:
+                raise QueryError('Invalid regex %r: %s' % (value, e))
+        if operator == 'has':
+            return HasDependency(field, value)
+        return CompareVersion(field, VERSION_RELATIONS[operator], value)
@@ -0,0 +1,301 @@
+# coding: utf-8
+"""
+Loading of all indices of apt `lists/` directory or `dists/` tree of
+mirror into one repository view.
+
+    repository = repository.load('/var/lib/apt/lists', workers=8)
+    repository.get('bookworm', 'main', 'amd64', 'nginx')
+    repository.get('bookworm', 'main', 'source', 'nginx')
+    repository.get_translations('bookworm', 'main', 'nginx', 'en')
+    repository.timings[path].parse
+
+Packages, Sources and Translation files are found by their names:
+dists/<suite>/<component>/binary-<arch>/Packages[.gz|.xz|...] in mirror
+tree or <host>_<path>_dists_<suite>_<component>_binary-<arch>_Packages
+in apt lists. When index is there in several compressions only one of
+them is loaded. Files are read and parsed in a pool of processes, every
+file is read once.
+"""
+
+import os
+import gc
+import time
+import collections
+
+from concurrent import futures
+from urllib.parse import unquote
+
+from debparse import utils
+
+from . import _parse_data
+
+
+KINDS = ('Packages', 'Sources', 'Translation')
+# suffixes of compressed files in order of preference when index is
+# there in several compressions, faster to read go first
+COMPRESSION_SUFFIXES = ('', '.gz', '.zst', '.xz', '.bz2')
+SOURCE_ARCHITECTURE = 'source'
+SKIPPED_DIRECTORIES = ('partial', 'by-hash')
+
+
+class IndexFile(object):
+    """
+    Index file of repository, `architecture` is 'source' for Sources and
+    None for Translation files, `language` is None for all but them.
+    """
+    __slots__ = (
+        'path', 'kind', 'suite', 'component', 'architecture', 'language',
+        'size',
+    )
+
+    def __init__(self, path, kind, suite, component, architecture=None,
+                 language=None, size=0):
+        self.path = path
+        self.kind = kind
+        self.suite = suite
+        self.component = component
+        self.architecture = architecture
+        self.language = language
+        self.size = size
+
+    def __repr__(self):
+        return '<%s: %s %s/%s %s>' % (
+            self.__class__.__name__, self.kind, self.suite, self.component,
+            self.architecture or self.language)
+
+
+class FileTiming(object):
+    """
+    Seconds spent on reading (with decompression) and parsing of file,
+    measured in process which loaded it.
+    """
+    __slots__ = ('read', 'parse', 'packages')
+
+    def __init__(self, read=0.0, parse=0.0, packages=0):
+        self.read = read
+        self.parse = parse
+        self.packages = packages
+
+    @property
+    def total(self):
+        return self.read + self.parse
+
+    def __repr__(self):
+        return '<%s: read %.3fs, parse %.3fs, %d packages>' % (
+            self.__class__.__name__, self.read, self.parse, self.packages)
+
+
+class Repository(object):
+    """
+    Packages of loaded index files. Packages and sources are keyed by
+    (suite, component, architecture, name), architecture of sources is
+    'source', translations are keyed by (suite, component, language,
+    name). Every key maps to list of packages, as index can have several
+    versions of package.
+    """
+
+    def __init__(self, files=()):
+        self.files = []
+        # path of index file -> classes.ControlData
+        self.control_data = collections.OrderedDict()
+        # path of index file -> FileTiming
+        self.timings = collections.OrderedDict()
+        self.packages = {}
+        self.translations = {}
+        # seconds spent on the whole load
+        self.load_time = 0.0
+        for index_file, control_data, timing in files:
+            self.add(index_file, control_data, timing)
+
+    def add(self, index_file, control_data, timing=None):
+        self.files.append(index_file)
+        self.control_data[index_file.path] = control_data
+        if timing is not None:
+            self.timings[index_file.path] = timing
+        if index_file.kind == 'Translation':
+            target = self.translations
+            prefix = (
+                index_file.suite, index_file.component, index_file.language)
+        else:
+            target = self.packages
+            prefix = (
+                index_file.suite, index_file.component,
+                index_file.architecture)
+        # stanzas of Sources name source package with Package field too
+        for package in control_data.packages:
+            name = package.get('Package')
+            if name is None:
+                continue
+            target.setdefault(prefix + (name.text,), []).append(package)
+
+    def __len__(self):
+        return len(self.packages)
+
+    def __iter__(self):
+        return iter(self.packages)
+
+    def __contains__(self, key):
+        return key in self.packages
+
+    def __getitem__(self, key):
+        return self.packages[key]
+
+    def get(self, suite, component, architecture, name):
+        """
+        Packages named `name`, architecture 'source' gives sources.
+        """
+        return self.packages.get((suite, component, architecture, name), [])
+
+    def get_translations(self, suite, component, name, language='en'):
+        return self.translations.get((suite, component, language, name), [])
+
+    def iter_packages(self, suite=None, component=None, architecture=None):
+        """
+        Yields (key, packages) of keys matching arguments which are not
+        None.
+        """
+        for key, packages in self.packages.items():
+            if suite is not None and key[0] != suite:
+                continue
+            if component is not None and key[1] != component:
+                continue
+            if architecture is not None and key[2] != architecture:
+                continue
+            yield key, packages
+
+    def __repr__(self):
+        return '<%s: %d files, %d keys>' % (
+            self.__class__.__name__, len(self.files), len(self.packages))
+
+
+def load(path, workers=None, lazy=False, kinds=KINDS):
+    """
+    Finds index files of `kinds` under `path` and parses them in a pool
+    of `workers` processes (number of CPUs by default, 1 to parse in
+    this process), gives `Repository`. `lazy` has the same meaning as
+    for `deb_control.parse`.
+    """
+    start = time.perf_counter()
+    index_files = find_index_files(path, kinds)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    results = {}
+    if workers > 1 and len(index_files) > 1:
+        # large files go first, so they don't finish last
+        ordered_files = sorted(
+            index_files, key=lambda index_file: -index_file.size)
+        # results are unpickled in a thread of executor, see
+        # `deb_control._parse_parallel`
+        with utils.gc_disabled():
+            with futures.ProcessPoolExecutor(
+                    max_workers=min(workers, len(index_files)),
+                    initializer=gc.disable) as executor:
+                loads = dict(
+                    (executor.submit(
+                        _load_file, index_file.path, lazy), index_file)
+                    for index_file in ordered_files
+                )
+                for future in futures.as_completed(loads):
+                    results[loads[future].path] = future.result()
+    else:
+        for index_file in index_files:
+            results[index_file.path] = _load_file(index_file.path, lazy)
+
+    repository = Repository()
+    for index_file in index_files:
+        control_data, timing = results[index_file.path]
+        repository.add(index_file, control_data, timing)
+    repository.load_time = time.perf_counter() - start
+    return repository
+
+
+def _load_file(path, lazy):
+    start = time.perf_counter()
+    data = utils.get_file_contents(path)
+    read_time = time.perf_counter() - start
+    control_data = _parse_data(data, path, lazy)
+    parse_time = time.perf_counter() - start - read_time
+    return control_data, FileTiming(
+        read_time, parse_time, len(control_data.packages))
+
+
+def find_index_files(path, kinds=KINDS):
+    """
+    Index files of `kinds` under `path` sorted by path, one file of every
+    index when it is there in several compressions.
+    """
+    # (kind, suite, component, architecture, language) -> (preference,
+    # IndexFile)
+    found = {}
+    for directory, directory_names, file_names in os.walk(path):
+        # partial downloads of apt and files of mirror named by hashes
+        directory_names[:] = [
+            name for name in directory_names
+            if name not in SKIPPED_DIRECTORIES
+        ]
+        for file_name in file_names:
+            file_path = os.path.join(directory, file_name)
+            parsed = parse_index_path(file_path)
+            if parsed is None:
+                continue
+            index_file, suffix = parsed
+            if index_file.kind not in kinds:
+                continue
+            key = (
+                index_file.kind, index_file.suite, index_file.component,
+                index_file.architecture, index_file.language,
+            )
+            preference = COMPRESSION_SUFFIXES.index(suffix)
+            if key not in found or preference < found[key][0]:
+                index_file.size = os.path.getsize(file_path)
+                found[key] = (preference, index_file)
+    return sorted(
+        (index_file for _, index_file in found.values()),
+        key=lambda index_file: index_file.path)
+
+
+def parse_index_path(path):
+    """
+    Gives (`IndexFile`, compression suffix) for path of index file in
+    `dists/` tree or apt lists directory or None for other files.
+    """
+    parts = os.path.abspath(path).split(os.sep)
+    if 'dists' in parts[:-1]:
+        position = len(parts) - parts[::-1].index('dists')
+        parts = parts[position:]
+    else:
+        # apt lists replace '/' with '_' and escape '_' as %5f
+        parts = parts[-1].split('_')
+        if 'dists' not in parts:
+            return None
+        parts = parts[parts.index('dists') + 1:]
+    parts = [unquote(part) for part in parts]
+    # suite, component (maybe several parts), directory, file
+    if len(parts) < 4:
+        return None
+    suite = parts[0]
+    component = '/'.join(parts[1:-2])
+    directory = parts[-2]
+
+    file_name, suffix = parts[-1], ''
+    for compression_suffix in COMPRESSION_SUFFIXES[1:]:
+        if file_name.endswith(compression_suffix):
+            file_name = file_name[:-len(compression_suffix)]
+            suffix = compression_suffix
+            break
+
+    if file_name == 'Packages' and directory.startswith('binary-'):
+        index_file = IndexFile(
+            path, 'Packages', suite, component,
+            architecture=directory[len('binary-'):])
+    elif file_name == 'Sources' and directory == 'source':
+        index_file = IndexFile(
+            path, 'Sources', suite, component,
+            architecture=SOURCE_ARCHITECTURE)
+    elif file_name.startswith('Translation-') and directory == 'i18n':
+        index_file = IndexFile(
+            path, 'Translation', suite, component,
+            language=file_name[len('Translation-'):])
+    else:
+        return None
+    return index_file, suffix
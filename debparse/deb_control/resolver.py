@@ -0,0 +1,384 @@
+# coding: utf-8
+"""
+Installability checks over a universe of binary packages.
+
+    universe = resolver.Universe.from_control_data(main, updates)
+    universe.is_installable(package)
+    universe.get_installation(package)  # packages to install with it
+    universe.what_breaks(package)       # packages needing it to install
+
+Package is installable if there is a set of packages including it where
+every Depends and Pre-Depends relation is satisfied by some package
+of the set, no package conflicts with (Conflicts or Breaks) another one
+and every package name has one version. Relations are satisfied by
+packages with that name and matching version or by packages providing
+it; unversioned Provides satisfy only unversioned relations.
+Architectures are not checked, universe should be of one architecture.
+
+Results are memoized per package together with names of packages
+looked up while checking it. `add` and `remove` drop only results which
+looked up names of changed package, so universe can be changed and
+checked again incrementally.
+"""
+
+import itertools
+
+from . import classes, versions
+
+
+DEPENDS_FIELDS = ('Pre-Depends', 'Depends')
+CONFLICTS_FIELDS = ('Conflicts', 'Breaks')
+# selections made while checking one package before giving up
+MAX_STEPS = 100000
+
+
+class ResolverError(Exception):
+    pass
+
+
+class Universe(object):
+
+    def __init__(self, packages=(), max_steps=MAX_STEPS):
+        self.max_steps = max_steps
+        # id of package -> _Entry
+        self._entries = {}
+        # name -> entries with that name
+        self._by_name = {}
+        # provided name -> entries providing it
+        self._providers = {}
+        # name -> entries depending on it
+        self._reverse = {}
+        # name -> {(relation, version): candidate entries}
+        self._candidates = {}
+        # entry -> (installation entries or None, looked up names)
+        self._results = {}
+        # name -> entries whose results looked it up
+        self._result_names = {}
+        for package in packages:
+            self.add(package)
+
+    @classmethod
+    def from_control_data(cls, *control_data, **kwargs):
+        """
+        Universe of binary packages of merged `classes.ControlData`.
+        """
+        return cls(itertools.chain.from_iterable(
+            data.packages for data in control_data), **kwargs)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, package):
+        return id(package) in self._entries
+
+    def add(self, package):
+        """
+        Adds binary `classes.Package`, others are ignored.
+        """
+        # paragraphs of Packages indices have Source field too
+        if 'Package' not in package or id(package) in self._entries:
+            return
+        entry = _Entry(package)
+        self._entries[id(package)] = entry
+        self._by_name.setdefault(entry.name, []).append(entry)
+        for dependency in entry.provides:
+            self._providers.setdefault(dependency.name, []).append(entry)
+        for name in entry.get_depends_names():
+            self._reverse.setdefault(name, []).append(entry)
+        self._invalidate(entry)
+
+    def remove(self, package):
+        entry = self._entries.pop(id(package), None)
+        if entry is None:
+            raise KeyError(package)
+        self._by_name[entry.name].remove(entry)
+        for dependency in entry.provides:
+            self._providers[dependency.name].remove(entry)
+        for name in entry.get_depends_names():
+            self._reverse[name].remove(entry)
+        self._invalidate(entry)
+        self._results.pop(entry, None)
+
+    def is_installable(self, package):
+        return self.get_installation(package) is not None
+
+    def get_installation(self, package):
+        """
+        List of packages which can be installed together with `package`
+        (it included) or None if it is not installable.
+        """
+        installation = self._check(self._get_entry(package))
+        if installation is None:
+            return None
+        return [entry.package for entry in installation]
+
+    def get_uninstallable(self):
+        """
+        Packages of universe which are not installable.
+        """
+        return [
+            entry.package for entry in list(self._entries.values())
+            if self._check(entry) is None
+        ]
+
+    def what_breaks(self, package):
+        """
+        Installable packages which would not be installable without
+        `package`, only packages depending on it directly or through
+        other packages are checked.
+        """
+        removed = self._get_entry(package)
+        broken = []
+        for entry in self._get_reverse_closure(removed):
+            if self._check(entry) is None:
+                continue
+            installation, _ = self._solve(entry, excluded=removed)
+            if installation is None:
+                broken.append(entry.package)
+        return broken
+
+    def get_candidates(self, dependency):
+        """
+        Packages satisfying `classes.DependencySimple`.
+        """
+        return [
+            entry.package for entry in self._get_candidates(dependency)]
+
+    def _get_entry(self, package):
+        try:
+            return self._entries[id(package)]
+        except KeyError:
+            raise KeyError(package)
+
+    def _check(self, entry):
+        result = self._results.get(entry)
+        if result is None:
+            result = self._results[entry] = self._solve(entry)
+            for name in result[1]:
+                self._result_names.setdefault(name, set()).add(entry)
+        return result[0]
+
+    def _invalidate(self, entry):
+        names = [entry.name]
+        names.extend(dependency.name for dependency in entry.provides)
+        for name in names:
+            self._candidates.pop(name, None)
+            for dependent in self._result_names.pop(name, ()):
+                self._results.pop(dependent, None)
+
+    def _get_candidates(self, dependency):
+        name_candidates = self._candidates.setdefault(dependency.name, {})
+        restriction = dependency.restriction
+        key = (restriction.relation, restriction.version) \
+            if restriction is not None else None
+        candidates = name_candidates.get(key)
+        if candidates is None:
+            candidates = name_candidates[key] = [
+                entry
+                for entry in itertools.chain(
+                    self._by_name.get(dependency.name, ()),
+                    self._providers.get(dependency.name, ()))
+                if entry.satisfies(dependency)
+            ]
+        return candidates
+
+    def _solve(self, root, excluded=None):
+        """
+        Depth first search of installation of `root` with backtracking.
+        Returns (installation entries or None, looked up names).
+        """
+        names = set()
+        # name -> selected entry
+        selected = {}
+        # selected entries in order of selection
+        trail = []
+        # (owner entry, conflicts relation) of selected entries
+        conflicts = []
+        # groups of candidates of selected entries to satisfy
+        queue = [[root]]
+        position = 0
+        # (position, next candidate, trail size, conflicts size,
+        # queue size) for backtracking
+        choices = []
+        steps = 0
+        start = 0
+
+        while True:
+            if position == len(queue):
+                return list(trail), names
+            candidates = queue[position]
+            if start == 0 and any(
+                    selected.get(candidate.name) is candidate
+                    for candidate in candidates):
+                position += 1
+                continue
+
+            for index in range(start, len(candidates)):
+                candidate = candidates[index]
+                if candidate is excluded:
+                    continue
+                if candidate is not root:
+                    result = self._results.get(candidate)
+                    if result is not None and result[0] is None:
+                        # not installable even alone
+                        names.update(result[1])
+                        continue
+                if not self._can_select(
+                        candidate, selected, conflicts, names):
+                    continue
+                steps += 1
+                if steps > self.max_steps:
+                    raise ResolverError(
+                        'Too many steps checking %s' % root.name)
+                choices.append((
+                    position, index + 1, len(trail), len(conflicts),
+                    len(queue)))
+                selected[candidate.name] = candidate
+                trail.append(candidate)
+                conflicts.extend(
+                    (candidate, dependency)
+                    for dependency in candidate.conflicts)
+                for group in candidate.depends:
+                    group_candidates = []
+                    for dependency in group:
+                        names.add(dependency.name)
+                        group_candidates.extend(
+                            self._get_candidates(dependency))
+                    queue.append(group_candidates)
+                position += 1
+                start = 0
+                break
+            else:
+                if not choices:
+                    return None, names
+                (position, start, trail_size, conflicts_size,
+                 queue_size) = choices.pop()
+                for entry in trail[trail_size:]:
+                    del selected[entry.name]
+                del trail[trail_size:]
+                del conflicts[conflicts_size:]
+                del queue[queue_size:]
+
+    def _can_select(self, candidate, selected, conflicts, names):
+        names.add(candidate.name)
+        if candidate.name in selected:
+            return False
+        for dependency in candidate.conflicts:
+            names.add(dependency.name)
+            for conflicting in self._get_candidates(dependency):
+                if conflicting is not candidate and \
+                        selected.get(conflicting.name) is conflicting:
+                    return False
+        for owner, dependency in conflicts:
+            if owner is not candidate and candidate.satisfies(dependency):
+                return False
+        return True
+
+    def _get_reverse_closure(self, entry):
+        seen = set()
+        names = [entry.name]
+        names.extend(dependency.name for dependency in entry.provides)
+        while names:
+            name = names.pop()
+            for dependent in self._reverse.get(name, ()):
+                if dependent in seen or dependent is entry:
+                    continue
+                seen.add(dependent)
+                names.append(dependent.name)
+                names.extend(
+                    dependency.name for dependency in dependent.provides)
+        return [
+            dependent for dependent in self._entries.values()
+            if dependent in seen
+        ]
+
+
+class _Entry(object):
+    """
+    Package with relations needed for checks extracted once.
+    """
+    __slots__ = (
+        'package', 'name', 'version', 'depends', 'conflicts', 'provides',
+    )
+
+    def __init__(self, package):
+        self.package = package
+        self.name = package['Package'].text
+        version = package.get('Version')
+        self.version = version.text if version is not None else None
+        # groups of alternatives, one of each group is needed
+        self.depends = []
+        for field in DEPENDS_FIELDS:
+            for dependency in _iter_relations(package.get(field)):
+                if dependency.type == 'alternative':
+                    group = [
+                        alternative
+                        for alternative in dependency.alternatives
+                        if alternative.type == 'simple'
+                    ]
+                else:
+                    group = [dependency]
+                self.depends.append(group)
+        self.conflicts = [
+            dependency
+            for field in CONFLICTS_FIELDS
+            for dependency in classes.iter_dependencies(package.get(field))
+        ]
+        self.provides = list(
+            classes.iter_dependencies(package.get('Provides')))
+
+    def get_depends_names(self):
+        return set(
+            dependency.name
+            for group in self.depends
+            for dependency in group
+        )
+
+    def satisfies(self, dependency):
+        """
+        Checks that package itself or one of its Provides satisfies
+        `classes.DependencySimple`.
+        """
+        restriction = dependency.restriction
+        if self.name == dependency.name and \
+                _check_version(self.version, restriction):
+            return True
+        for provided in self.provides:
+            if provided.name != dependency.name:
+                continue
+            if restriction is None:
+                return True
+            if provided.restriction is not None and \
+                    provided.restriction.relation == '=' and \
+                    _check_version(provided.restriction.version, restriction):
+                return True
+        return False
+
+    def __repr__(self):
+        return '<%s: %s %s>' % (
+            self.__class__.__name__, self.name, self.version)
+
+
+def _iter_relations(value):
+    # relations of field keeping alternatives, unlike
+    # `classes.iter_dependencies`
+    if value is None:
+        return
+    if not isinstance(value, list):
+        value = [value]
+    for dependency in value:
+        if isinstance(dependency, classes.DependencySimple) and \
+                dependency.type != 'placeholder':
+            yield dependency
+
+
+def _check_version(version, restriction):
+    if restriction is None:
+        return True
+    if version is None:
+        return False
+    try:
+        return versions.check_relation(
+            version, restriction.relation, restriction.version)
+    except ValueError:
+        return False
@@ -0,0 +1,210 @@
+# coding: utf-8
+"""
+Debian versions comparison with the same ordering as dpkg has
+https://www.debian.org/doc/debian-policy/ch-controlfields.html#version
+
+Version is turned into sort key once, after that sorting, `max` and
+relation checks are plain tuple comparisons.
+"""
+
+import operator
+import functools
+
+
+SORT_KEY_CACHE_SIZE = 65536
+
+# The relations of `classes.Restriction`, deprecated < and >
+# mean earlier/later or equal.
+RELATION_CHECKS = {
+    '<<': operator.lt,
+    '<=': operator.le,
+    '<': operator.le,
+    '=': operator.eq,
+    '>=': operator.ge,
+    '>': operator.ge,
+    '>>': operator.gt,
+}
+
+# Sort key of version part is flat tuple of its non-digit and digit
+# parts. Non-digit part is encoded with char orders followed by
+# `PART_END`, letters sort earlier than non-letters and tilde sorts
+# before anything, even the end of a part. Digit part is its number.
+# Key is closed with `KEY_END`, which is between tilde and the end of part:
+# when one version is over, the other one is greater unless it continues
+# with tilde.
+TILDE_ORDER = -2
+KEY_END = -1
+PART_END = 0
+DIGITS = frozenset('0123456789')
+
+
+def _get_char_order(char):
+    if char == '~':
+        return TILDE_ORDER
+    if char.isalpha():
+        return 2 * ord(char)
+    return 2 * (ord(char) + 256)
+
+
+CHAR_ORDERS = dict((chr(code), _get_char_order(chr(code)))
+                   for code in range(128))
+
+
+class Version(object):
+    """
+    Debian version [epoch:]upstream_version[-debian_revision],
+    comparable with other versions and strings.
+    """
+    __slots__ = ('_raw', 'epoch', 'upstream', 'revision', '_sort_key')
+
+    def __init__(self, version):
+        self._raw = version
+        self.epoch, self.upstream, self.revision = split_version(version)
+        self._sort_key = None
+
+    @property
+    def sort_key(self):
+        if self._sort_key is None:
+            self._sort_key = get_sort_key(self._raw)
+        return self._sort_key
+
+    def __str__(self):
+        return self._raw
+
+    def __repr__(self):
+        return '<%s: %s>' % (self.__class__.__name__, self._raw)
+
+    def __hash__(self):
+        return hash(self.sort_key)
+
+    def _compare(self, other, compare):
+        if isinstance(other, (Version, str)):
+            return compare(self.sort_key, get_sort_key(other))
+        return NotImplemented
+
+    def __eq__(self, other):
+        return self._compare(other, operator.eq)
+
+    def __ne__(self, other):
+        return self._compare(other, operator.ne)
+
+    def __lt__(self, other):
+        return self._compare(other, operator.lt)
+
+    def __le__(self, other):
+        return self._compare(other, operator.le)
+
+    def __gt__(self, other):
+        return self._compare(other, operator.gt)
+
+    def __ge__(self, other):
+        return self._compare(other, operator.ge)
+
+
+def split_version(version):
+    """
+    Splits version string to (epoch, upstream_version, debian_revision),
+    epoch is int, missing epoch is 0 and missing revision is ''.
+    """
+    version = version.strip()
+    epoch, colon, rest = version.partition(':')
+    if colon:
+        if not epoch.isdigit():
+            raise ValueError('Invalid epoch in version %r' % version)
+        epoch = int(epoch)
+    else:
+        epoch, rest = 0, version
+    upstream, dash, revision = rest.rpartition('-')
+    if not dash:
+        upstream, revision = rest, ''
+    if not upstream:
+        raise ValueError('Empty upstream version in %r' % version)
+    return epoch, upstream, revision
+
+
+def get_sort_key(version):
+    """
+    Sort key of version string or `Version`, keys of equal versions
+    are equal, e.g. for '1.0' and '0:1.0-0'.
+    """
+    if isinstance(version, Version):
+        return version.sort_key
+    return _get_sort_key(version)
+
+
+@functools.lru_cache(maxsize=SORT_KEY_CACHE_SIZE)
+def _get_sort_key(version):
+    epoch, upstream, revision = split_version(version)
+    return epoch, _get_part_key(upstream), _get_part_key(revision)
+
+
+def _get_part_key(part):
+    pairs = []
+    position = 0
+    end = len(part)
+
+    while position < end:
+        non_digit_end = position
+        while non_digit_end < end and part[non_digit_end] not in DIGITS:
+            non_digit_end += 1
+        digit_end = non_digit_end
+        while digit_end < end and part[digit_end] in DIGITS:
+            digit_end += 1
+        pairs.append((
+            part[position:non_digit_end],
+            int(part[non_digit_end:digit_end] or 0),
+        ))
+        position = digit_end
+
+    # trailing empty parts are the same as the end of version
+    while pairs and pairs[-1] == ('', 0):
+        pairs.pop()
+
+    key = []
+    for non_digit, number in pairs:
+        for char in non_digit:
+            order = CHAR_ORDERS.get(char)
+            key.append(order if order is not None else _get_char_order(char))
+        key.append(PART_END)
+        key.append(number)
+    key.append(KEY_END)
+    return tuple(key)
+
+
+def compare_versions(first, second):
+    """
+    Returns -1, 0 or 1 like dpkg --compare-versions does.
+    """
+    first_key = get_sort_key(first)
+    second_key = get_sort_key(second)
+    return (first_key > second_key) - (first_key < second_key)
+
+
+def check_relation(version, relation, restriction_version):
+    """
+    Checks that `version` satisfies e.g. '>= 1.15.7' restriction.
+    """
+    check = RELATION_CHECKS[relation]
+    return check(get_sort_key(version), get_sort_key(restriction_version))
+
+
+def check_restrictions(restrictions, candidates):
+    """
+    Checks every `classes.Restriction` against every candidate version.
+    Returns list of lists of bools, one list for each restriction;
+    missing restriction (None) is satisfied by any version.
+    Sort keys of candidates are computed once for all restrictions.
+    """
+    candidate_keys = [get_sort_key(candidate) for candidate in candidates]
+    results = []
+    for restriction in restrictions:
+        if restriction is None:
+            results.append([True] * len(candidate_keys))
+            continue
+        check = RELATION_CHECKS[restriction.relation]
+        restriction_key = get_sort_key(restriction.version)
+        results.append([
+            check(candidate_key, restriction_key)
+            for candidate_key in candidate_keys
+        ])
+    return results
@@ -0,0 +1,151 @@
+# coding: utf-8
+"""
+Writing of packages back to deb822 text.
+
+    deb_control.dump(control_data, fileobj)
+    text = deb_control.dumps(
+        package for package in control_data.packages if keep(package))
+
+Packages are written from text they were parsed from, so layout of
+continuation lines and comments is kept and unmodified packages cost
+a single copy. Only fields marked by `classes.Package.mark_modified`
+(setting and deleting of fields marks them) are rendered again, lines
+of modified fields with the same value are taken from text as they are.
+"""
+
+import io
+
+from debparse import utils
+
+from . import paragraphs, fields
+
+
+def dump(control_data, fileobj):
+    """
+    Writes packages of `classes.ControlData` or iterable of
+    `classes.Package` to text `fileobj`, paragraphs are separated with
+    empty lines. Blank lines and comments of parsed control data before
+    the first and after the last paragraph are written as they were, so
+    unmodified control data is written as it was parsed, but for several
+    empty lines between paragraphs, which are written as one.
+    """
+    packages = getattr(control_data, 'packages', control_data)
+    head, tail = getattr(control_data, '_edges', None) or ('', '\n')
+    write = fileobj.write
+    write(head)
+    written = False
+    for package in packages:
+        if written:
+            write('\n\n')
+        write(render_package(package))
+        written = True
+    if written:
+        write(tail)
+
+
+def dumps(control_data):
+    fileobj = io.StringIO()
+    dump(control_data, fileobj)
+    return fileobj.getvalue()
+
+
+def render_package(package):
+    """
+    Text of paragraph of `package` without trailing newline.
+    """
+    before, text, after = package.__dict__.get('_source') or (
+        '', getattr(package, '_raw', None), '')
+    modified = package.__dict__.get('_modified')
+    if text is None:
+        text = '\n'.join(
+            render_field(key, package[key]) for key in package.keys())
+    elif modified:
+        text = _render_modified(package, text, modified)
+    return before + text + after
+
+
+def _render_modified(package, text, modified):
+    chunks = []
+    rendered = set()
+    position = 0
+    for start, colon, end in paragraphs.iter_field_spans(text, 0, len(text)):
+        comments = text[position:start].strip('\n')
+        if comments:
+            chunks.append(comments)
+        position = end
+        folded_key = text[start:colon].strip().lower()
+        rendered.add(folded_key)
+        if folded_key not in modified:
+            chunks.append(text[start:end])
+        elif folded_key in package:
+            chunks.append(_render_package_field(
+                package, folded_key, text[start:end]))
+    comments = text[position:].strip('\n')
+    if comments:
+        chunks.append(comments)
+
+    # added fields go after fields of paragraph
+    for key in package.keys():
+        folded_key = key.lower()
+        if folded_key not in rendered:
+            chunks.append(_render_package_field(package, folded_key))
+    return '\n'.join(chunks)
+
+
+def _render_package_field(package, folded_key, field_text=None):
+    key = package._keys[folded_key]
+    value = package[key]
+    if field_text is not None and _is_unchanged(value, field_text):
+        # continuation lines are joined with spaces in raw values,
+        # so lines of the same value are kept from text of field
+        return key + field_text[field_text.index(':'):]
+    return render_field(key, value)
+
+
+def _is_unchanged(value, field_text):
+    if isinstance(value, (str, list)):
+        # items of lists can be changed in place
+        return False
+    raw = getattr(value, '_raw', None)
+    if raw is None:
+        return False
+    lines = [
+        line for line in field_text.split('\n') if not line.startswith('#')]
+    _, raw_value = fields.get_raw_key_value(
+        utils.join_string_list_with_space(lines))
+    return raw == raw_value
+
+
+def render_field(key, value):
+    """
+    'Key: value' text of field, lines of multiline value after the first
+    one become continuation lines.
+    """
+    lines = get_value_text(value).split('\n')
+    result = ['%s: %s' % (key, lines[0]) if lines[0] else '%s:' % key]
+    for line in lines[1:]:
+        if not line.strip():
+            result.append(' .')
+        elif line.startswith((' ', '\t')):
+            result.append(line)
+        else:
+            result.append(' ' + line)
+    return '\n'.join(result)
+
+
+def get_value_text(value):
+    """
+    Text of field value: str as it is, items of lists joined with commas,
+    raw text of parsed values.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return ', '.join(get_value_text(item) for item in value)
+    raw = getattr(value, '_raw', None)
+    if raw is not None:
+        return raw
+    text = getattr(value, 'text', None)
+    if text is not None:
+        return text
+    return str(value)
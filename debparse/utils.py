@@ -1,16 +1,152 @@
 # coding: utf-8
 
 
-import codecs
+import io
+import os
+import gc
+import bz2
+import gzip
+import lzma
+import contextlib
 
 from functools import partial
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# magic bytes of compressed files, mirror indices are often compressed
+COMPRESSION_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'BZh', 'bz2'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+COMPRESSION_MAGIC_SIZE = max(len(magic) for magic, _ in COMPRESSION_MAGIC)
+
 
 def get_file_contents(path):
-    with codecs.open(path, "r", "utf-8") as f:
+    with open_text_file(path) as f:
         return f.read()
 
 
+@contextlib.contextmanager
+def open_text_file(path_or_fileobj):
+    """
+    Context manager giving text file object for path or file object.
+    Lines are terminated by '\n' only, like in `split_string_by_newline`.
+    Binary files are decoded as utf-8 and, if compressed with gzip, xz,
+    bzip2 or zstd, are decompressed on the fly.
+    File opened by path is closed on exit, given file object is not.
+    """
+    if isinstance(path_or_fileobj, os.PathLike):
+        path_or_fileobj = os.fspath(path_or_fileobj)
+    is_path = isinstance(path_or_fileobj, (str, bytes))
+    if not is_path and not is_binary_file(path_or_fileobj):
+        yield path_or_fileobj
+        return
+
+    with contextlib.ExitStack() as stack:
+        if is_path:
+            fileobj = stack.enter_context(io.open(path_or_fileobj, 'rb'))
+        else:
+            fileobj = path_or_fileobj
+        if not hasattr(fileobj, 'peek'):
+            fileobj = io.BufferedReader(fileobj)
+            # closing of buffer would close given file object
+            stack.callback(fileobj.detach)
+        decompressed = open_decompressed(fileobj)
+        if decompressed is not fileobj:
+            # doesn't close underlying file object
+            stack.callback(decompressed.close)
+        text_fileobj = io.TextIOWrapper(
+            decompressed, encoding='utf-8', newline='\n')
+        stack.callback(text_fileobj.detach)
+        yield text_fileobj
+
+
+def open_decompressed(fileobj):
+    """
+    Wraps binary file object having `peek` method with decompressing one
+    if compression is detected by magic bytes.
+    """
+    compression = detect_compression(fileobj.peek(COMPRESSION_MAGIC_SIZE))
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if compression == 'xz':
+        return lzma.LZMAFile(fileobj, mode='rb')
+    if compression == 'bz2':
+        return bz2.BZ2File(fileobj, mode='rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError('zstandard package is required for zstd files')
+        return zstandard.ZstdDecompressor().stream_reader(
+            fileobj, closefd=False)
+    return fileobj
+
+
+def detect_compression(data):
+    for magic, compression in COMPRESSION_MAGIC:
+        if data[:len(magic)] == magic:
+            return compression
+
+
+def is_binary_file(fileobj):
+    if isinstance(fileobj, io.TextIOBase):
+        return False
+    if isinstance(fileobj, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+    return 'b' in getattr(fileobj, 'mode', '')
+
+
+def iter_lines(fileobj):
+    """
+    Yields lines of text file object without trailing newline.
+    """
+    for line in fileobj:
+        if line.endswith('\n'):
+            line = line[:-1]
+        yield line
+
+
+@contextlib.contextmanager
+def gc_disabled():
+    """
+    Disables cyclic garbage collector while lots of objects without
+    reference cycles are created, e.g. parsed packages are unpickled.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def get_span_text(data, start, end, joiner='\n'):
+    """
+    Decodes span of `data` (str, bytes or mmap) dropping comment lines
+    starting with '#'. Lines are joined with `joiner`.
+    """
+    text = data[start:end]
+    if not isinstance(text, str):
+        text = text.decode('utf-8')
+    if '#' in text:
+        text = join_string_list(
+            [
+                line for line in split_string_by_newline(text)
+                if not line.startswith('#')
+            ],
+            joiner,
+        )
+    elif joiner != '\n':
+        text = text.replace('\n', joiner)
+    return text
+
+
 def split_string(string, separator, strip=False, skip_blank=False):
     result = []
 
@@ -54,3 +54,46 @@ Build-Depends: autotools-dev,
                dpkg-dev (>= 1.15.7),
                zlib1g-dev
 """
+
+CONTROL_FILE_WITH_COMMENTS = """
+# leading comment
+
+Source: nginx
+# comment inside of paragraph
+Build-Depends: autotools-dev,
+# comment inside of field
+               zlib1g-dev
+Homepage: http://nginx.net
+# trailing comment
+
+
+# comment between paragraphs
+
+Package: nginx
+Architecture: all
+Depends: nginx-full | nginx-light, ${misc:Depends}
+Description: small, but very powerful and efficient web server
+ Nginx (engine x) is a web server created by Igor Sysoev.
+ .
+ This is a dummy package that selects nginx-full by default.
+"""
+
+PACKAGES_FILE_DATA = """
+Package: mail-transport
+Version: 1.0
+Provides: mail-transport-agent, default-mta
+Depends: libc6 (>= 2.17)
+
+Package: other-mta
+Version: 2.0
+Provides: mail-transport-agent
+
+Package: mailer
+Version: 3.0
+Pre-Depends: libc6
+Depends: mail-transport-agent | other-mta, libc6 (>= 2.28), ${misc:Depends}
+
+Package: mailer
+Version: 3.1
+Depends: default-mta
+"""
@@ -0,0 +1,110 @@
+# coding: utf-8
+
+import asyncio
+
+import pytest
+
+from debparse import deb_control
+from debparse.deb_control import aio
+
+from . import examples
+
+
+@pytest.fixture
+def control_paths(tmpdir):
+    paths = []
+    for index in range(5):
+        path = tmpdir.join('control%d' % index)
+        path.write_text(
+            examples.CONTROL_FILE_DATA + '\nPackage: extra%d\n' % index,
+            encoding='utf-8',
+        )
+        paths.append(str(path))
+    return paths
+
+
+def test_aparse(control_paths):
+    control_data = asyncio.run(aio.aparse(control_paths[0]))
+    assert control_data.source_package.id == 'nginx'
+    assert control_data.packages[-1].id == 'extra0'
+    assert control_data._path == control_paths[0]
+
+
+def test_aparse_many(control_paths):
+    async def collect():
+        results = {}
+        async for path, control_data in aio.aparse_many(
+                control_paths, concurrency=2):
+            results[path] = control_data.packages[-1].id
+        return results
+
+    results = asyncio.run(collect())
+    assert results == dict(
+        (path, 'extra%d' % index)
+        for index, path in enumerate(control_paths)
+    )
+
+
+def test_aparse_many_backpressure(control_paths, monkeypatch):
+    started = []
+    original_aparse = aio.aparse
+
+    async def aparse(path, **kwargs):
+        started.append(path)
+        return await original_aparse(path, **kwargs)
+
+    monkeypatch.setattr(aio, 'aparse', aparse)
+
+    async def take_first():
+        results = aio.aparse_many(control_paths, concurrency=2)
+        await results.__anext__()
+        await results.aclose()
+
+    asyncio.run(take_first())
+    # files are started only when consumer asks for results
+    assert len(started) == 2
+
+
+def test_aparse_many_error(control_paths, tmpdir):
+    paths = control_paths + [str(tmpdir.join('missing'))]
+
+    async def collect():
+        async for _ in aio.aparse_many(paths, concurrency=10):
+            pass
+
+    with pytest.raises(IOError):
+        asyncio.run(collect())
+
+
+def test_aparse_many_awaits_cancelled(control_paths, monkeypatch):
+    cancelled = []
+    original_aparse = aio.aparse
+
+    async def aparse(path, **kwargs):
+        if path != control_paths[0]:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(path)
+                raise
+        return await original_aparse(path, **kwargs)
+
+    monkeypatch.setattr(aio, 'aparse', aparse)
+
+    async def take_first():
+        results = aio.aparse_many(control_paths, concurrency=3)
+        await results.__anext__()
+        await results.aclose()
+        return len(cancelled)
+
+    # cancelled tasks are finished when aclose returns
+    assert asyncio.run(take_first()) == 2
+
+
+def test_aparse_keeps_comments(tmpdir):
+    path = tmpdir.join('control')
+    path.write_text(examples.CONTROL_FILE_WITH_COMMENTS, encoding='utf-8')
+    control_data = asyncio.run(aio.aparse(str(path)))
+    assert deb_control.dumps(control_data) == deb_control.dumps(
+        deb_control.parse(str(path)))
+    assert '# comment inside of field' in deb_control.dumps(control_data)
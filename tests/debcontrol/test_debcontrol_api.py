@@ -0,0 +1,234 @@
+# coding: utf-8
+
+import io
+import bz2
+import gzip
+import lzma
+import random
+import asyncio
+import pathlib
+
+import pytest
+
+from debparse import deb_control
+from debparse.deb_control import aio, cache, profiling
+
+from . import examples
+
+
+def assert_same_packages(packages, expected):
+    assert [p._raw for p in packages] == [p._raw for p in expected]
+    assert [list(p.keys()) for p in packages] == [
+        list(p.keys()) for p in expected]
+
+
+def test_iter_parse_path(tmpdir):
+    path = tmpdir.join('control')
+    path.write_text(examples.CONTROL_FILE_DATA, encoding='utf-8')
+    packages = list(deb_control.iter_parse(str(path)))
+    expected = deb_control.parse(data=examples.CONTROL_FILE_DATA).packages
+    assert_same_packages(packages, expected)
+
+
+@pytest.mark.parametrize('compress', [None, gzip.compress])
+def test_parse_pathlike(tmpdir, compress):
+    data = examples.CONTROL_FILE_DATA.encode('utf-8')
+    path = pathlib.Path(str(tmpdir.join('control')))
+    path.write_bytes(compress(data) if compress else data)
+    expected = deb_control.parse(data=examples.CONTROL_FILE_DATA).packages
+    assert_same_packages(deb_control.parse(path).packages, expected)
+    assert_same_packages(list(deb_control.iter_parse(path)), expected)
+    control_data = asyncio.run(aio.aparse(path))
+    assert_same_packages(control_data.packages, expected)
+
+
+def test_iter_parse_text_fileobj():
+    fileobj = io.StringIO(examples.CONTROL_FILE_DATA)
+    packages = list(deb_control.iter_parse(fileobj))
+    assert [p.id for p in packages] == ['nginx', 'nginx', 'nginx-doc']
+
+
+def test_iter_parse_binary_fileobj_is_not_closed():
+    fileobj = io.BytesIO(examples.CONTROL_FILE_DATA.encode('utf-8'))
+    packages = list(deb_control.iter_parse(fileobj))
+    assert len(packages) == 3
+    assert not fileobj.closed
+
+
+def test_parse_lazy():
+    control_data = deb_control.parse(
+        data=examples.CONTROL_FILE_DATA, lazy=True)
+    expected = deb_control.parse(data=examples.CONTROL_FILE_DATA)
+    assert_same_packages(control_data.packages, expected.packages)
+    assert control_data.source_package.id == 'nginx'
+    assert list(control_data.binary_packages) == ['nginx', 'nginx-doc']
+
+
+def test_parse_workers():
+    data = examples.CONTROL_FILE_DATA * 10
+    control_data = deb_control.parse(data=data, workers=2)
+    expected = deb_control.parse(data=data)
+    assert_same_packages(control_data.packages, expected.packages)
+    assert control_data.packages[3]['Build-Depends'][1].name == 'debhelper'
+
+
+def test_parse_mmap(tmpdir):
+    path = tmpdir.join('control')
+    path.write_text(examples.CONTROL_FILE_WITH_COMMENTS, encoding='utf-8')
+    expected = deb_control.parse(data=examples.CONTROL_FILE_WITH_COMMENTS)
+
+    with deb_control.parse_mmap(str(path)) as control_data:
+        package = control_data.packages[1]
+        assert package is control_data.packages[1]
+        assert package['Depends'][0].alternatives[1].name == 'nginx-light'
+        assert_same_packages(control_data.packages, expected.packages)
+        assert [
+            [dep.name for dep in package['Build-Depends']]
+            for package in control_data.packages
+            if 'Build-Depends' in package
+        ] == [['autotools-dev', 'zlib1g-dev']]
+        assert control_data.source_package.id == 'nginx'
+
+
+def test_parse_mmap_empty_file(tmpdir):
+    path = tmpdir.join('control')
+    path.write_text('', encoding='utf-8')
+    with deb_control.parse_mmap(str(path)) as control_data:
+        assert len(control_data.packages) == 0
+
+
+@pytest.mark.parametrize('compress', [
+    gzip.compress,
+    lzma.compress,
+    bz2.compress,
+])
+def test_parse_compressed(tmpdir, compress):
+    data = compress(examples.CONTROL_FILE_DATA.encode('utf-8'))
+    path = tmpdir.join('Packages')
+    path.write_binary(data)
+    expected = deb_control.parse(data=examples.CONTROL_FILE_DATA)
+
+    control_data = deb_control.parse(str(path))
+    assert control_data._raw == examples.CONTROL_FILE_DATA
+    assert_same_packages(control_data.packages, expected.packages)
+
+    packages = list(deb_control.iter_parse(str(path)))
+    assert_same_packages(packages, expected.packages)
+
+    fileobj = io.BytesIO(data)
+    packages = list(deb_control.iter_parse(fileobj))
+    assert_same_packages(packages, expected.packages)
+    assert not fileobj.closed
+
+    with pytest.raises(ValueError):
+        deb_control.parse_mmap(str(path))
+
+
+def test_reparse_reuses_untouched_packages():
+    data = examples.CONTROL_FILE_DATA
+    previous = deb_control.parse(data=data)
+    start = data.index('Section: doc')
+    end = start + len('Section: doc')
+    control_data = deb_control.reparse(previous, start, end, 'Section: web')
+    assert control_data.packages[2]['Section'].text == 'web'
+    assert control_data.packages[0] is previous.packages[0]
+    assert control_data.packages[1] is previous.packages[1]
+    assert control_data._raw == data.replace('Section: doc', 'Section: web')
+
+
+def test_reparse_splits_and_merges_paragraphs():
+    data = examples.CONTROL_FILE_DATA
+    previous = deb_control.parse(data=data)
+    position = data.index('Package: nginx-doc') - 1
+    merged = deb_control.reparse(previous, position, position + 1, '')
+    assert len(merged.packages) == 2
+    assert merged.packages[1]['Section'].text == 'doc'
+    split = deb_control.reparse(merged, position, position, '\n')
+    assert_same_packages(split.packages, previous.packages)
+
+
+REPARSE_SNIPPETS = [
+    '', '\n', '\n\n', '#comment\n', 'X-Field: value\n', ' continuation',
+    'Package: new\n', 'Depends: a | b (>= 1)\n\n',
+]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_reparse_random_edits(seed):
+    rnd = random.Random(seed)
+    data = examples.CONTROL_FILE_WITH_COMMENTS + examples.PACKAGES_FILE_DATA
+    control_data = deb_control.parse(data=data)
+    for _ in range(30):
+        start = rnd.randint(0, len(data))
+        end = min(len(data), start + rnd.choice([0, 0, 1, 2, 10, 40]))
+        replacement = rnd.choice(REPARSE_SNIPPETS)
+        new_data = data[:start] + replacement + data[end:]
+        try:
+            expected = deb_control.parse(data=new_data)
+        except ValueError:
+            with pytest.raises(ValueError):
+                deb_control.reparse(control_data, start, end, replacement)
+            continue
+        control_data = deb_control.reparse(
+            control_data, start, end, replacement)
+        data = new_data
+        assert control_data._raw == data
+        assert_same_packages(control_data.packages, expected.packages)
+        assert control_data._spans == \
+            deb_control.paragraphs.get_paragraph_spans(data)
+        assert deb_control.dumps(control_data) == \
+            deb_control.dumps(expected)
+
+
+def is_mailer(paragraph):
+    return paragraph.get('Package') == 'mailer'
+
+
+def test_parse_fields_projection():
+    control_data = deb_control.parse(
+        data=examples.PACKAGES_FILE_DATA, fields=['package', 'DEPENDS'])
+    expected = deb_control.parse(data=examples.PACKAGES_FILE_DATA)
+    assert [list(p.keys()) for p in control_data.packages] == [
+        ['Package', 'Depends'], ['Package'], ['Package', 'Depends'],
+        ['Package', 'Depends'],
+    ]
+    assert [p._raw for p in control_data.packages] == [
+        p._raw for p in expected.packages]
+    assert control_data.packages[2]['Depends'][1].name == 'libc6'
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_parse_where(workers):
+    control_data = deb_control.parse(
+        data=examples.PACKAGES_FILE_DATA, where=is_mailer,
+        fields=['Version'], workers=workers)
+    assert [p['Version'].text for p in control_data.packages] == [
+        '3.0', '3.1']
+    assert 'Package' not in control_data.packages[0]
+
+
+def test_parse_where_keeps_comments_of_parsed_paragraphs():
+    control_data = deb_control.parse(
+        data=examples.CONTROL_FILE_WITH_COMMENTS,
+        where=lambda paragraph: 'Source' in paragraph)
+    assert len(control_data.packages) == 1
+    dumped = deb_control.dumps(control_data)
+    assert dumped.startswith('\n# leading comment\n\nSource: nginx\n')
+    assert '# comment between paragraphs' not in dumped
+
+
+def test_parse_fields_with_stats():
+    stats = profiling.ParseStats()
+    control_data = deb_control.parse(
+        data=examples.PACKAGES_FILE_DATA, fields=['Package'],
+        where=is_mailer, stats=stats)
+    assert [p.id for p in control_data.packages] == ['mailer', 'mailer']
+    assert dict(stats.fields) == {'Package': 2}
+
+
+def test_parse_fields_can_not_be_cached(tmpdir):
+    path = tmpdir.join('control')
+    path.write_text(examples.CONTROL_FILE_DATA, encoding='utf-8')
+    parse_cache = cache.ParseCache(str(tmpdir.join('cache')))
+    with pytest.raises(ValueError):
+        deb_control.parse(str(path), cache=parse_cache, fields=['Package'])
@@ -0,0 +1,118 @@
+# coding: utf-8
+
+import os
+import pickle
+
+import pytest
+
+from debparse import deb_control
+from debparse.deb_control import cache as parse_cache, classes
+
+from . import examples
+
+
+@pytest.fixture
+def control_path(tmpdir):
+    path = tmpdir.join('control')
+    path.write_text(examples.CONTROL_FILE_DATA, encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.parametrize('key', ['stat', 'digest'])
+def test_parse_cache_hit(tmpdir, control_path, key):
+    cache = parse_cache.ParseCache(str(tmpdir.join('cache')), key=key)
+    assert cache.get(control_path) is None
+
+    parsed = deb_control.parse(control_path, cache=cache)
+    cached = deb_control.parse(control_path, cache=cache)
+    assert cached is not parsed
+    assert cached._raw == parsed._raw
+    assert [p._raw for p in cached.packages] == [
+        p._raw for p in parsed.packages]
+    assert cached.source_package.id == 'nginx'
+    assert cached._path == control_path
+
+
+def test_parse_cache_keeps_lazy_and_eager_apart(tmpdir, control_path):
+    cache = parse_cache.ParseCache(str(tmpdir.join('cache')))
+    deb_control.parse(control_path, cache=cache)
+    assert cache.get(control_path, lazy=True) is None
+    lazy = deb_control.parse(control_path, lazy=True, cache=cache)
+    eager = deb_control.parse(control_path, cache=cache)
+    assert isinstance(
+        dict.__getitem__(lazy.source_package, 'Build-Depends'),
+        classes.LazyFieldValue)
+    assert not isinstance(
+        dict.__getitem__(eager.source_package, 'Build-Depends'),
+        classes.LazyFieldValue)
+    assert len(cache._scan_entries()) == 2
+
+
+def test_parse_cache_invalidated_by_change(tmpdir, control_path):
+    cache = parse_cache.ParseCache(str(tmpdir.join('cache')))
+    deb_control.parse(control_path, cache=cache)
+
+    with open(control_path, 'a') as f:
+        f.write('\nPackage: extra\n')
+    control_data = deb_control.parse(control_path, cache=cache)
+    assert control_data.packages[-1].id == 'extra'
+
+
+def test_parse_cache_broken_entry_is_miss(tmpdir, control_path):
+    cache = parse_cache.ParseCache(str(tmpdir.join('cache')))
+    deb_control.parse(control_path, cache=cache)
+    entry_path = cache._get_entry_path(control_path)
+    with open(entry_path, 'wb') as f:
+        f.write(b'garbage')
+
+    assert cache.get(control_path) is None
+    assert not os.path.exists(entry_path)
+
+
+def test_parse_cache_eviction(tmpdir):
+    cache = parse_cache.ParseCache(str(tmpdir.join('cache')), max_size=1)
+    paths = []
+    for index in range(3):
+        path = tmpdir.join('control%d' % index)
+        path.write_text(examples.CONTROL_FILE_DATA, encoding='utf-8')
+        paths.append(str(path))
+        deb_control.parse(str(path), cache=cache)
+    # every entry is larger than max_size
+    assert len(cache._scan_entries()) == 0
+
+    cache.max_size = 10 ** 9
+    for path in paths:
+        deb_control.parse(path, cache=cache)
+    assert len(cache._scan_entries()) == 3
+    cache.clear()
+    assert cache._scan_entries() == []
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+@pytest.mark.parametrize('data', [
+    examples.CONTROL_FILE_DATA,
+    examples.CONTROL_FILE_WITH_COMMENTS,
+    examples.PACKAGES_FILE_DATA + '\n\n\nPackage: extra\nDepends: (\n',
+])
+def test_parse_cache_stores_text_once(tmpdir, lazy, data):
+    path = tmpdir.join('control')
+    path.write_text(data, encoding='utf-8')
+    cache = parse_cache.ParseCache(str(tmpdir.join('cache')))
+    parsed = deb_control.parse(str(path), lazy=lazy, cache=cache)
+    cached = deb_control.parse(str(path), lazy=lazy, cache=cache)
+
+    entry_size = os.path.getsize(cache._get_entry_path(str(path), lazy))
+    assert entry_size < len(pickle.dumps(parsed, pickle.HIGHEST_PROTOCOL))
+    assert cached._raw == data
+    assert deb_control.dumps(cached) == deb_control.dumps(parsed)
+    for cached_package, package in zip(cached.packages, parsed.packages):
+        assert cached_package._raw == package._raw
+        assert describe_values(cached_package) == describe_values(package)
+
+
+def describe_values(package):
+    return [
+        (key, type(value), getattr(value, '_raw', None),
+         getattr(value, 'text', None))
+        for key, value in package.items()
+    ]
@@ -0,0 +1,84 @@
+# coding: utf-8
+
+from debparse import deb_control
+
+from . import examples
+
+
+def ids(packages):
+    return [
+        (package.id, package['Version'].text)
+        for package in packages
+    ]
+
+
+def test_control_data_source_and_binary_packages():
+    control_data = deb_control.parse(data=examples.CONTROL_FILE_DATA)
+    assert control_data.source_package.id == 'nginx'
+    assert list(control_data.binary_packages) == ['nginx', 'nginx-doc']
+    assert control_data.binary_packages is control_data.binary_packages
+
+
+def test_control_data_get_packages():
+    control_data = deb_control.parse(data=examples.PACKAGES_FILE_DATA)
+    assert ids(control_data.get_packages('mailer')) == [
+        ('mailer', '3.0'), ('mailer', '3.1')]
+    assert control_data.get_packages('missing') == []
+
+
+def test_control_data_get_providers():
+    control_data = deb_control.parse(data=examples.PACKAGES_FILE_DATA)
+    assert ids(control_data.get_providers('mail-transport-agent')) == [
+        ('mail-transport', '1.0'), ('other-mta', '2.0')]
+    assert ids(control_data.get_providers('default-mta')) == [
+        ('mail-transport', '1.0')]
+
+
+def test_control_data_get_reverse_dependencies():
+    control_data = deb_control.parse(data=examples.PACKAGES_FILE_DATA)
+    assert ids(control_data.get_reverse_dependencies('libc6')) == [
+        ('mail-transport', '1.0'), ('mailer', '3.0')]
+    assert ids(control_data.get_reverse_dependencies('other-mta')) == [
+        ('mailer', '3.0')]
+    assert control_data.get_reverse_dependencies('${misc:Depends}') == []
+
+
+def test_control_data_invalidate_indexes():
+    control_data = deb_control.parse(data=examples.PACKAGES_FILE_DATA)
+    assert len(control_data.get_packages('mailer')) == 2
+    del control_data.packages[-1]
+    control_data.invalidate_indexes()
+    assert len(control_data.get_packages('mailer')) == 1
+
+
+def test_raw_paragraph_get():
+    paragraph = deb_control.classes.RawParagraph(
+        'Package: nginx\nDepends: a,\n b\nArchitecture:  all')
+    assert paragraph.get('package') == 'nginx'
+    assert paragraph['Depends'] == 'a,  b'
+    assert paragraph.get('Architecture') == 'all'
+    assert paragraph.get('Section', 'none') == 'none'
+    assert 'DEPENDS' in paragraph
+    assert 'Arch' not in paragraph
+
+
+def test_raw_paragraph_field_regexes_are_bounded():
+    get_field_regex = deb_control.classes._get_field_regex
+    for index in range(deb_control.classes.FIELD_REGEX_CACHE_SIZE + 10):
+        deb_control.classes.RawParagraph('A: b').get('X-Field-%d' % index)
+    cache_info = get_field_regex.cache_info()
+    assert cache_info.currsize == deb_control.classes.FIELD_REGEX_CACHE_SIZE
+
+
+def test_control_data_packages_with_source_field():
+    control_data = deb_control.parse(data=(
+        'Package: apt-transport-https\nSource: apt\nVersion: 2.6.1\n\n'
+        'Package: apt\nVersion: 2.6.1\n\n'
+        'Package: libapt-pkg6.0\nSource: apt\nVersion: 2.6.1\n'
+    ))
+    transport, = control_data.get_packages('apt-transport-https')
+    assert transport['Package'].text == 'apt-transport-https'
+    apt, = control_data.get_packages('apt')
+    assert apt is control_data.packages[1]
+    assert list(control_data.binary_packages) == [
+        'apt-transport-https', 'apt', 'libapt-pkg6.0']
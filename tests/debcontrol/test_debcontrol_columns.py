@@ -0,0 +1,63 @@
+# coding: utf-8
+
+import array
+
+import pytest
+
+from debparse import deb_control
+from debparse.deb_control import columns
+
+from . import examples
+
+
+@pytest.fixture
+def table():
+    control_data = deb_control.parse(data=examples.PACKAGES_FILE_DATA)
+    return control_data.to_columns(['Package', 'Version', 'Depends'])
+
+
+def test_string_column(table):
+    assert len(table) == 4
+    package = table['Package']
+    assert package.values == ['mail-transport', 'other-mta', 'mailer']
+    assert list(package.codes) == [0, 1, 2, 2]
+    assert package[3] == 'mailer'
+    assert table['Version'].to_list() == ['1.0', '2.0', '3.0', '3.1']
+
+
+def test_list_column(table):
+    depends = table['Depends']
+    assert list(depends.offsets) == [0, 1, 1, 4, 5]
+    assert depends[0] == ['libc6 (>= 2.17)']
+    assert depends[1] == []
+    assert depends[2] == [
+        'mail-transport-agent | other-mta', 'libc6 (>= 2.28)',
+        '${misc:Depends}',
+    ]
+
+
+def test_edge_table(table):
+    edges = table.edges['Depends']
+    assert len(edges) == 5
+    assert list(edges.package) == [0, 2, 2, 2, 3]
+    assert list(edges.group) == [0, 0, 0, 1, 0]
+    assert edges.name.to_list() == [
+        'libc6', 'mail-transport-agent', 'other-mta', 'libc6', 'default-mta']
+    assert edges.relation.to_list() == ['>=', None, None, '>=', None]
+    assert edges.version.to_list() == ['2.17', None, None, '2.28', None]
+    assert 'Version' not in table.edges
+
+
+def test_missing_values_and_case_insensitive_names():
+    control_data = deb_control.parse(data=examples.CONTROL_FILE_DATA)
+    table = control_data.to_columns(['section', 'Uploaders'])
+    assert table['section'].to_list() == ['httpd', None, 'doc']
+    assert list(table['Uploaders'].offsets) == [0, 3, 3, 3]
+
+
+def test_stdlib_arrays(monkeypatch):
+    monkeypatch.setattr(columns, 'numpy', None)
+    control_data = deb_control.parse(data=examples.PACKAGES_FILE_DATA)
+    table = control_data.to_columns(['Depends'])
+    assert isinstance(table['Depends'].offsets, array.array)
+    assert isinstance(table.edges['Depends'].package, array.array)
@@ -0,0 +1,112 @@
+# coding: utf-8
+
+import pickle
+
+import pytest
+
+from debparse import deb_control
+from debparse.deb_control import diagnostics as parse_diagnostics
+from debparse.deb_control import fields, pool as parse_pool
+
+
+MESSY_DATA = """
+Package: good
+Version: 1.0
+Depends: libc6
+
+Package: broken-depends
+Depends: libc6 (>= , (>= 1) | libssl3, a [ ]
+Maintainer:
+
+# comment
+Package: no-colon
+this line has no colon
+Version: 2.0
+ continuation
+another bad line
+"""
+
+
+def test_lenient_parsing_collects_diagnostics():
+    diagnostics = parse_diagnostics.Diagnostics(max_examples=1)
+    control_data = deb_control.parse(
+        data=MESSY_DATA, diagnostics=diagnostics)
+    assert [package.id for package in control_data.packages] == [
+        'good', 'broken-depends', 'no-colon']
+
+    broken = control_data.packages[1]
+    # alternative keeps well formed alternatives, malformed items are None
+    depends = broken['Depends']
+    assert depends[0] is None and depends[2] is None
+    assert [d.name for d in depends[1].alternatives] == ['libssl3']
+    assert broken['Maintainer'].name is None
+    no_colon = control_data.packages[2]
+    assert list(no_colon.keys()) == ['Package', 'Version']
+
+    assert diagnostics.counts == {'dependency': 3, 'contact': 1, 'field': 2}
+    assert diagnostics.total == 6
+    assert [len(examples) for examples in diagnostics.examples.values()] \
+        == [1, 1, 1]
+    dependency, = diagnostics.examples['dependency']
+    assert dependency.text == 'libc6 (>='
+    assert (dependency.paragraph, dependency.line) == (1, 7)
+    field, = diagnostics.examples['field']
+    assert field.text == 'this line has no colon'
+    assert (field.paragraph, field.line) == (2, 12)
+    assert 'line 12' in str(field)
+    assert diagnostics.as_dict()['counts'] == dict(diagnostics.counts)
+
+
+def test_diagnostics_with_where_and_pool():
+    diagnostics = parse_diagnostics.Diagnostics()
+    control_data = deb_control.parse(
+        data=MESSY_DATA, diagnostics=diagnostics,
+        where=lambda paragraph: paragraph.get('Package') == 'no-colon',
+        pool=parse_pool.ParsePool())
+    assert len(control_data.packages) == 1
+    assert diagnostics.counts == {'field': 2}
+    assert [d.paragraph for d in diagnostics] == [2, 2]
+
+
+def test_strict_parsing_raises_first_problem():
+    diagnostics = parse_diagnostics.Diagnostics(strict=True)
+    with pytest.raises(deb_control.ParseError) as exc_info:
+        deb_control.parse(data=MESSY_DATA, diagnostics=diagnostics)
+    diagnostic = exc_info.value.diagnostic
+    assert (diagnostic.category, diagnostic.paragraph, diagnostic.line) == (
+        'dependency', 1, 7)
+    assert 'line 7' in str(exc_info.value)
+    restored = pickle.loads(pickle.dumps(diagnostic))
+    assert str(restored) == str(diagnostic)
+
+
+def test_parsing_without_diagnostics():
+    with pytest.raises(fields.FieldSyntaxError):
+        deb_control.parse(data=MESSY_DATA.split('# comment')[1])
+    # malformed dependencies are dropped silently
+    data = MESSY_DATA.split('Maintainer')[0]
+    control_data = deb_control.parse(data=data)
+    assert control_data.packages[1]['Depends'][0] is None
+    assert len(control_data.packages[1]['Depends'][1].alternatives) == 1
+    with pytest.raises(ValueError):
+        fields.parse_field_type_contact('')
+
+
+def test_lazy_values_are_parsed_without_collector():
+    diagnostics = parse_diagnostics.Diagnostics()
+    control_data = deb_control.parse(
+        data=MESSY_DATA, lazy=True, diagnostics=diagnostics)
+    # only the line without colon is found while parsing
+    assert diagnostics.counts == {'field': 2}
+    broken = control_data.packages[1]
+    assert broken['Depends'][0] is None
+    with pytest.raises(ValueError):
+        broken['Maintainer']
+    assert diagnostics.counts == {'field': 2}
+
+
+def test_diagnostics_cant_be_collected_in_parallel():
+    with pytest.raises(ValueError):
+        deb_control.parse(
+            data=MESSY_DATA, workers=2,
+            diagnostics=parse_diagnostics.Diagnostics())
@@ -0,0 +1,208 @@
+# coding: utf-8
+
+import gzip
+import random
+import difflib
+import hashlib
+
+import pytest
+
+from debparse import deb_control
+from debparse.deb_control import diff, paragraphs
+
+from . import examples
+
+
+NEW_PACKAGES_FILE_DATA = """
+Package: mail-transport
+Version: 1.1
+Provides: mail-transport-agent, default-mta
+Depends: libc6 (>= 2.17)
+
+Package: mailer
+Version: 3.0
+Pre-Depends: libc6
+Depends: mail-transport-agent | other-mta, libc6 (>= 2.28), ${misc:Depends}
+
+Package: mailer
+Version: 3.1
+Depends: default-mta
+Homepage: https://example.com
+
+Package: webmail
+Version: 0.1
+"""
+
+
+def get_versions(packages):
+    return [
+        '%s=%s' % (package.id, package['Version'].text)
+        for package in packages
+    ]
+
+
+def check_diff(changes):
+    assert get_versions(changes.added) == ['webmail=0.1']
+    assert get_versions(changes.removed) == ['other-mta=2.0']
+    assert [
+        (get_versions([change.old, change.new]), change.fields)
+        for change in changes.changed
+    ] == [
+        (['mail-transport=1.0', 'mail-transport=1.1'], ['Version']),
+        (['mailer=3.1', 'mailer=3.1'], ['Homepage']),
+    ]
+    assert changes.unchanged == 1
+    assert changes
+
+
+def test_diff_control_data():
+    old = deb_control.parse(data=examples.PACKAGES_FILE_DATA)
+    new = deb_control.parse(data=NEW_PACKAGES_FILE_DATA)
+    changes = diff.diff(old, new)
+    check_diff(changes)
+    assert changes.changed[0].old is old.packages[0]
+    assert changes.changed[0].new is new.packages[0]
+    assert not diff.diff(old, old.packages)
+
+
+def test_diff_files_parses_only_changed_paragraphs(tmpdir, monkeypatch):
+    old_path = tmpdir.join('old')
+    old_path.write_text(examples.PACKAGES_FILE_DATA, encoding='utf-8')
+    new_path = tmpdir.join('new')
+    new_path.write_text(NEW_PACKAGES_FILE_DATA, encoding='utf-8')
+    parsed = []
+    parse_paragraph = paragraphs.parse_paragraph
+
+    def counting_parse_paragraph(data, *args, **kwargs):
+        parsed.append(data)
+        return parse_paragraph(data, *args, **kwargs)
+
+    monkeypatch.setattr(
+        paragraphs, 'parse_paragraph', counting_parse_paragraph)
+    check_diff(diff.diff_files(str(old_path), str(new_path)))
+    assert len(parsed) == 6
+
+
+def make_ed_script(old_data, new_data):
+    # the same as diff --ed gives: commands from the end of file
+    old_lines = old_data.splitlines()
+    new_lines = new_data.splitlines()
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, False)
+    commands = []
+    for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+        if tag == 'equal':
+            continue
+        if tag == 'insert':
+            command = '%da' % i1
+        else:
+            command = '%d,%d%s' % (
+                i1 + 1, i2, 'd' if tag == 'delete' else 'c')
+        commands.append(command)
+        if tag != 'delete':
+            commands.extend(new_lines[j1:j2])
+            commands.append('.')
+    return ''.join(command + '\n' for command in commands)
+
+
+def test_parse_ed_script():
+    assert diff.parse_ed_script('5,6c\nA\nB\n.\n3a\nC\n.\n1d\n') == [
+        (5, 6, ['A', 'B']), (4, 3, ['C']), (1, 1, []),
+    ]
+    with pytest.raises(diff.PDiffError):
+        diff.parse_ed_script('1,2w\n')
+    with pytest.raises(diff.PDiffError):
+        diff.parse_ed_script('1a\nA\n')
+
+
+def test_apply_pdiff_reparses_touched_paragraphs():
+    prefix = 'Package: untouched\nVersion: 1\n\n'
+    old = deb_control.parse(data=prefix + examples.PACKAGES_FILE_DATA)
+    script = make_ed_script(old._raw, prefix + NEW_PACKAGES_FILE_DATA)
+    new = diff.apply_pdiff(old, script)
+    assert new._raw == prefix + NEW_PACKAGES_FILE_DATA
+    assert get_versions(new.packages) == get_versions(
+        deb_control.parse(data=new._raw).packages)
+    assert new.packages[0] is old.packages[0]
+    assert new.packages[1] is not old.packages[1]
+
+    with pytest.raises(diff.PDiffError):
+        diff.apply_pdiff(old, '1d\n3d\n')
+    with pytest.raises(diff.PDiffError):
+        diff.apply_pdiff(old, '100d\n')
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_apply_pdiff_random_edits(seed):
+    rnd = random.Random(seed)
+    data = examples.CONTROL_FILE_WITH_COMMENTS + examples.PACKAGES_FILE_DATA
+    control_data = deb_control.parse(data=data)
+    lines = data.splitlines()
+    for _ in range(10):
+        new_lines = list(lines)
+        for _ in range(rnd.randint(1, 4)):
+            position = rnd.randint(0, len(new_lines))
+            action = rnd.choice(['insert', 'delete', 'change'])
+            line = rnd.choice([
+                '', '#comment', 'X-Field: value', ' continuation',
+                'Package: new',
+            ])
+            if action == 'insert':
+                new_lines.insert(position, line)
+            elif position < len(new_lines):
+                if action == 'delete':
+                    del new_lines[position]
+                else:
+                    new_lines[position] = line
+        new_data = ''.join(line + '\n' for line in new_lines)
+        try:
+            expected = deb_control.parse(data=new_data)
+        except ValueError:
+            continue
+        control_data = diff.apply_pdiff(
+            control_data, make_ed_script(data, new_data))
+        data, lines = new_data, new_lines
+        assert control_data._raw == data
+        assert [package._raw for package in control_data.packages] == [
+            package._raw for package in expected.packages]
+        assert control_data._spans == paragraphs.get_paragraph_spans(data)
+        assert deb_control.dumps(control_data) == \
+            deb_control.dumps(expected)
+
+
+def write_pdiff_index(directory, history, merged=False):
+    # history is list of data of files, the last one is current
+    def get_digest(data):
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    lines = ['SHA256-Current: %s %d' % (
+        get_digest(history[-1]), len(history[-1]))]
+    if merged:
+        lines.append('X-Patch-Precedence: merged')
+    lines.append('SHA256-History:')
+    for index, data in enumerate(history[:-1]):
+        lines.append(
+            ' %s %d patch-%d' % (get_digest(data), len(data), index))
+        target = history[-1] if merged else history[index + 1]
+        directory.join('patch-%d.gz' % index).write_binary(
+            gzip.compress(make_ed_script(data, target).encode('utf-8')))
+    index_path = directory.join('Index')
+    index_path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(index_path)
+
+
+@pytest.mark.parametrize('merged', [False, True])
+def test_apply_pdiff_index(tmpdir, merged):
+    history = [
+        examples.PACKAGES_FILE_DATA,
+        examples.PACKAGES_FILE_DATA.replace('Version: 2.0', 'Version: 2.1'),
+        NEW_PACKAGES_FILE_DATA,
+    ]
+    index_path = write_pdiff_index(tmpdir, history, merged=merged)
+    for data in history:
+        control_data = diff.apply_pdiff_index(
+            deb_control.parse(data=data), index_path)
+        assert control_data._raw == NEW_PACKAGES_FILE_DATA
+
+    with pytest.raises(diff.PDiffError):
+        diff.apply_pdiff_index(
+            deb_control.parse(data='Package: unknown\n'), index_path)
@@ -1,5 +1,7 @@
 # coding: utf-8
 
+import copy
+
 import pytest
 
 from debparse.deb_control import fields, classes
@@ -135,3 +137,123 @@ def test_parse_field_type_dependency(input, expected):
             assert_expectations(parsed_val, expected_val)
     else:
         assert_expectations(parsed, expected)
+
+
+def test_get_field_meta_is_shared():
+    meta = fields.get_field_meta('build-depends')
+    assert meta is fields.get_field_meta('Build-Depends')
+    assert meta.canonical_name == 'Build-Depends'
+    assert (meta.format, meta.type) == ('list', 'dependency')
+    assert meta.parser is fields.parse_field_type_dependency
+    with pytest.raises(AttributeError):
+        meta.type = 'simple'
+
+
+def test_get_field_meta_unknown():
+    meta = fields.get_field_meta('X-Something-Unknown')
+    assert meta is fields.UNKNOWN_FIELD_META
+    assert fields.lookup_field_spec('X-Something-Unknown') == (
+        'Unknown', 'simple')
+
+
+@pytest.fixture
+def field_registry(monkeypatch):
+    # registrations of test are undone after it
+    for name in (
+            '_field_metas', '_field_patterns', '_type_parsers',
+            '_lookup_cache'):
+        monkeypatch.setattr(fields, name, copy.copy(getattr(fields, name)))
+
+
+def test_register_field_pattern(field_registry):
+    fields.register_field('X-Test-Checksums-*', 'list/simple')
+    meta = fields.get_field_meta('x-test-checksums-sha256')
+    assert meta.canonical_name == 'X-Test-Checksums-sha256'
+    assert meta.format == 'list'
+    assert meta is fields.get_field_meta('X-Test-Checksums-Sha256')
+    key, value = fields.parse_field('X-Test-Checksums-Sha256: a, b')
+    assert [item.text for item in value] == ['a', 'b']
+
+
+def test_register_field_type(field_registry):
+    def parse_field_type_upper(raw_value, meta=None):
+        return classes.SimpleField(
+            _raw=raw_value, meta=meta, text=raw_value.upper())
+
+    fields.register_field_type('x-test-upper', parse_field_type_upper)
+    fields.register_field('X-Test-Upper', 'x-test-upper')
+    key, value = fields.parse_field('X-Test-Upper: wat')
+    assert value.text == 'WAT'
+
+
+def test_registrations_are_undone():
+    assert fields.get_field_meta('X-Test-Upper') is fields.UNKNOWN_FIELD_META
+    assert fields.get_field_meta('X-Test-Checksums-Sha256') is \
+        fields.UNKNOWN_FIELD_META
+
+
+def test_field_values_have_no_instance_dict():
+    key, value = fields.parse_field(
+        'Depends: aa (>= 1) [amd64], ${misc:Depends}')
+    dependency, placeholder = value
+    assert dependency.restriction.version == '1'
+    assert dependency.architecture == 'amd64'
+    for obj in (value, dependency, placeholder, dependency.restriction):
+        assert not hasattr(obj, '__dict__')
+
+
+def test_parse_dependency_full_syntax():
+    parsed = fields.parse_dependency(
+        'python3:any (>= 3.7~) [amd64 !i386] <!nocheck> <stage1 cross>')
+    assert parsed.name == 'python3'
+    assert parsed.arch_qualifier == 'any'
+    assert parsed.restriction.relation == '>='
+    assert parsed.restriction.version == '3.7~'
+    assert parsed.architecture == 'amd64 !i386'
+    assert parsed.profiles == ('!nocheck', 'stage1 cross')
+
+
+def test_parse_dependency_placeholder_in_version():
+    parsed = fields.parse_dependency('nginx-common (= ${binary:Version})')
+    assert parsed.type == 'simple'
+    assert parsed.restriction.version == '${binary:Version}'
+
+
+def test_parse_field_type_dependency_alternatives_raw():
+    parsed = fields.parse_field_type_dependency('aa (= 1) | ${foo:Bar}')
+    first, second = parsed.alternatives
+    assert first._raw == 'aa (= 1)'
+    assert second.type == 'placeholder'
+    assert second.name == '${foo:Bar}'
+
+
+@pytest.mark.parametrize('input', [
+    '',
+    '(= 1)',
+    'foo (= 1',
+    'foo (~ 1)',
+    'foo (>=)',
+    'foo []',
+    'foo <>',
+    'foo bar',
+    'foo (= 1) extra',
+])
+def test_parse_dependency_syntax_errors(input):
+    with pytest.raises(fields.DependencySyntaxError):
+        fields.parse_dependency(input)
+    assert fields.parse_field_type_dependency(input) is None
+
+
+@pytest.mark.parametrize('input', [
+    'a (' + '(' * 100000,
+    'a (>= ' + '1' * 100000,
+    'a [' + ' [' * 100000,
+    'a' + ' <x>' * 100000 + ' (',
+    'a' + ' ' * 100000 + 'b',
+    ' | '.join(['a ('] * 10000),
+], ids=lambda input: '%s...%d' % (input[:8], len(input)))
+def test_parse_field_type_dependency_adversarial(input):
+    # must finish in linear time and report syntax errors
+    parsed = fields.parse_field_type_dependency(input)
+    if parsed is not None:
+        assert parsed.alternatives == []
@@ -1,6 +1,11 @@
 # coding: utf-8
 
-from debparse.deb_control import paragraphs
+import pickle
+
+import pytest
+
+from debparse import utils
+from debparse.deb_control import paragraphs, classes
 
 from . import examples
 
@@ -48,3 +53,118 @@ def test_get_raw_fields_correct_content():
     assert '<cyril.lavier@davromaniak.eu>' in uploaders
     assert 'Build-Depends:' in build_deps
     assert 'dpkg-dev (>= 1.15.7),' in build_deps
+
+
+def test_iter_raw_paragraphs_same_as_get_raw_paragraphs():
+    data = examples.CONTROL_FILE_DATA
+    lines = iter(data.split('\n'))
+    raw_paragraphs = list(paragraphs.iter_raw_paragraphs(lines))
+    assert raw_paragraphs == paragraphs.get_raw_paragraphs(data)
+
+
+def test_parse_paragraph_lazy():
+    package = paragraphs.parse_paragraph(examples.PARAGRAPH, lazy=True)
+    raw_value = dict.__getitem__(package, 'Build-Depends')
+    assert isinstance(raw_value, classes.LazyFieldValue)
+
+    build_depends = package['build-depends']
+    assert [dep.name for dep in build_depends] == [
+        'autotools-dev', 'dpkg-dev', 'zlib1g-dev']
+    # parsed value is cached
+    assert package['Build-Depends'] is build_depends
+
+
+def test_parse_paragraph_lazy_items_are_parsed():
+    package = paragraphs.parse_paragraph(examples.PARAGRAPH, lazy=True)
+    for key, value in package.items():
+        assert not isinstance(value, classes.LazyFieldValue)
+    assert package['Source'].text == 'nginx'
+
+
+def test_package_case_insensitive_lookup():
+    package = paragraphs.parse_paragraph(examples.PARAGRAPH)
+    assert 'source' in package
+    assert 'STANDARDS-VERSION' in package
+    assert 'Package' not in package
+    assert package.get('build-depends') is package['Build-Depends']
+    assert package.get('Description') is None
+    assert list(package.keys()) == [
+        'Source', 'Uploaders', 'Build-Depends', 'Standards-Version']
+
+
+def test_package_dict_methods_keep_key_index():
+    package = paragraphs.parse_paragraph(examples.PARAGRAPH, lazy=True)
+    assert package.pop('standards-version').text == '3.9.3'
+    assert 'Standards-Version' not in package
+    assert package.pop('standards-version', None) is None
+    with pytest.raises(KeyError):
+        package.pop('Standards-Version')
+    key, value = package.popitem()
+    assert key == 'Build-Depends' and 'build-depends' not in package
+    assert package.setdefault('SOURCE', None).text == 'nginx'
+    assert package.setdefault('Section', 'web') == 'web'
+    package.update({'section': 'net'}, Priority='optional')
+    assert package['SECTION'] == 'net'
+    assert list(package.keys()) == [
+        'Source', 'Uploaders', 'Section', 'Priority']
+    assert package.modified == {
+        'standards-version', 'build-depends', 'section', 'priority'}
+    package.clear()
+    assert not package and 'source' not in package
+    assert 'uploaders' in package.modified
+
+
+def test_split_raw_data_keeps_paragraphs():
+    data = examples.CONTROL_FILE_DATA * 5
+    expected = paragraphs.get_raw_paragraphs(data)
+    for count in (1, 2, 3, 7, 100):
+        chunks = paragraphs.split_raw_data(data, count)
+        assert ''.join(chunks) == data
+        raw_paragraphs = []
+        for chunk in chunks:
+            raw_paragraphs.extend(paragraphs.get_raw_paragraphs(chunk))
+        assert raw_paragraphs == expected
+
+
+def test_package_pickle_keeps_lazy_values():
+    package = paragraphs.parse_paragraph(examples.PARAGRAPH, lazy=True)
+    unpickled = pickle.loads(pickle.dumps(package))
+    raw_value = dict.__getitem__(unpickled, 'Build-Depends')
+    assert isinstance(raw_value, classes.LazyFieldValue)
+    assert unpickled._raw == package._raw
+    assert unpickled['source'].text == 'nginx'
+
+
+def test_paragraph_spans_same_as_raw_paragraphs():
+    for data in (
+        examples.CONTROL_FILE_DATA,
+        examples.CONTROL_FILE_DATA.strip(),
+        examples.CONTROL_FILE_WITH_COMMENTS,
+    ):
+        expected = paragraphs.get_raw_paragraphs(data)
+        for buffer in (data, data.encode('utf-8')):
+            spans = paragraphs.get_paragraph_spans(buffer)
+            assert [
+                utils.get_span_text(buffer, start, end)
+                for start, end in spans
+            ] == expected
+
+
+def test_field_spans_same_as_raw_fields():
+    data = examples.CONTROL_FILE_WITH_COMMENTS.encode('utf-8')
+    for start, end in paragraphs.get_paragraph_spans(data):
+        expected = paragraphs.get_raw_fields(
+            utils.get_span_text(data, start, end))
+        field_spans = paragraphs.iter_field_spans(data, start, end)
+        assert [
+            utils.get_span_text(data, field_start, field_end, joiner=' ')
+            for field_start, _, field_end in field_spans
+        ] == expected
+
+
+def test_get_raw_fields_projection():
+    data = 'Package: a\nDescription: b\n c\nDepends: d,\n e\nSection: f'
+    raw_fields = paragraphs.get_raw_fields(
+        data, field_names={'package', 'depends'})
+    assert raw_fields == ['Package: a', 'Depends: d,  e']
+    assert paragraphs.get_raw_fields(data, field_names=set()) == []
@@ -0,0 +1,162 @@
+# coding: utf-8
+
+import pickle
+
+import pytest
+
+from debparse import deb_control
+from debparse.deb_control import classes, pool as parse_pool
+
+from . import examples
+
+
+def test_pool_shares_same_paragraphs():
+    pool = parse_pool.ParsePool()
+    first = deb_control.parse(data=examples.PACKAGES_FILE_DATA, pool=pool)
+    second = deb_control.parse(
+        data=examples.PACKAGES_FILE_DATA + '\nPackage: extra\n', pool=pool)
+    assert len(second.packages) == len(first.packages) + 1
+    for package, same in zip(first.packages, second.packages):
+        assert package is same
+    assert len(pool) == len(second.packages)
+    assert all(
+        isinstance(package, classes.FrozenPackage)
+        for package in second.packages)
+
+
+def test_pool_interns_dependency_names():
+    pool = parse_pool.ParsePool()
+    control_data = deb_control.parse(
+        data=examples.PACKAGES_FILE_DATA, pool=pool)
+    mail_transport, other_mta, mailer, _ = control_data.packages
+    # values differ, but names of dependencies are the same strings
+    assert mail_transport['Provides'] is not other_mta['Provides']
+    assert mail_transport['Provides'][0] is other_mta['Provides'][0]
+    libc6 = mailer['Pre-Depends'][0].name
+    assert mail_transport['Depends'][0].name is libc6
+    assert mailer['Depends'][1].name is libc6
+
+
+def test_pool_shares_values_between_paragraphs():
+    data = 'Package: a\nSection: net\n\nPackage: b\nSection: net\n'
+    pool = parse_pool.ParsePool()
+    first, second = deb_control.parse(data=data, pool=pool).packages
+    assert first['Section'] is second['Section']
+    lazy_first, lazy_second = deb_control.parse(
+        data=data + '\nPackage: c\nSection: net\n', lazy=True,
+        pool=pool).packages[1:]
+    assert lazy_first is second
+    assert lazy_second['Section'].text == 'net'
+
+
+def test_pool_parses_shared_lazy_values_once():
+    data = 'Package: a\nDepends: x, y\n\nPackage: b\nDepends: x, y\n'
+    pool = parse_pool.ParsePool()
+    first, second = deb_control.parse(
+        data=data, lazy=True, pool=pool).packages
+    shared = dict.__getitem__(first, 'Depends')
+    assert isinstance(shared, parse_pool.SharedLazyFieldValue)
+    assert dict.__getitem__(second, 'Depends') is shared
+    assert first['Depends'] is second['Depends']
+    eager = deb_control.parse(
+        data=data + '\nPackage: c\nDepends: x, y\n', pool=pool).packages
+    assert eager[2]['Depends'] is first['Depends']
+
+
+def test_pool_list_values_are_immutable():
+    pool = parse_pool.ParsePool()
+    package = deb_control.parse(
+        data=examples.PACKAGES_FILE_DATA, pool=pool).packages[2]
+    depends = package['Depends']
+    assert isinstance(depends, classes.ListField)
+    for change in (
+        lambda: depends.append(None),
+        lambda: depends.pop(),
+        lambda: depends.__setitem__(0, None),
+        lambda: depends.__delitem__(0),
+        lambda: depends.sort(),
+    ):
+        with pytest.raises(TypeError):
+            change()
+    restored = pickle.loads(pickle.dumps(depends))
+    assert isinstance(restored, classes.FrozenListField)
+    assert restored._raw == depends._raw
+    assert [item.name for item in restored] == [
+        item.name for item in depends]
+
+
+def test_pool_shared_values_are_immutable():
+    pool = parse_pool.ParsePool()
+    control_data = deb_control.parse(
+        data=examples.CONTROL_FILE_DATA, pool=pool)
+    source, nginx, nginx_doc = control_data.packages
+    alternative = nginx['Depends'][0]
+    lsb_base = nginx_doc['Depends'][0]
+    for change in (
+        lambda: setattr(source['Maintainer'], 'name', 'Other'),
+        lambda: setattr(source['Section'], 'text', 'web'),
+        lambda: setattr(alternative, 'alternatives', []),
+        lambda: setattr(alternative.alternatives[0], 'name', 'other'),
+        lambda: setattr(lsb_base.restriction, 'version', '4.0'),
+        lambda: delattr(lsb_base, 'restriction'),
+    ):
+        with pytest.raises(AttributeError):
+            change()
+    with pytest.raises(AttributeError):
+        alternative.alternatives.append(None)
+    # values of packages parsed without pool stay mutable
+    plain = deb_control.parse(data=examples.CONTROL_FILE_DATA).packages[0]
+    plain['Maintainer'].name = 'Other'
+    assert plain['Maintainer'].name == 'Other'
+
+    restored = pickle.loads(pickle.dumps(nginx_doc))
+    assert isinstance(restored['Depends'][0], classes.FrozenValue)
+    assert restored['Depends'][0].restriction.version == '3.2-14'
+    with pytest.raises(AttributeError):
+        restored['Depends'][0].name = 'other'
+
+
+def test_pool_keeps_projections_apart():
+    pool = parse_pool.ParsePool()
+    full = deb_control.parse(data=examples.PACKAGES_FILE_DATA, pool=pool)
+    projected = deb_control.parse(
+        data=examples.PACKAGES_FILE_DATA, fields=['Package'], pool=pool)
+    assert list(projected.packages[0].keys()) == ['Package']
+    assert projected.packages[0] is not full.packages[0]
+    assert 'Version' in full.packages[0]
+
+
+def test_pool_parse_equals_plain_parse():
+    pool = parse_pool.ParsePool()
+    plain = deb_control.parse(data=examples.CONTROL_FILE_DATA)
+    pooled = deb_control.parse(data=examples.CONTROL_FILE_DATA, pool=pool)
+    for package, pooled_package in zip(plain.packages, pooled.packages):
+        assert list(package.keys()) == list(pooled_package.keys())
+        assert [value._raw for value in package.values()] == \
+            [value._raw for value in pooled_package.values()]
+
+
+def test_frozen_package_is_immutable():
+    pool = parse_pool.ParsePool()
+    package = deb_control.parse(
+        data=examples.PACKAGES_FILE_DATA, lazy=True, pool=pool).packages[0]
+    with pytest.raises(TypeError):
+        package['Version'] = '2.0'
+    with pytest.raises(TypeError):
+        del package['Version']
+    with pytest.raises(TypeError):
+        package.pop('Version')
+    with pytest.raises(TypeError):
+        package.update({'Version': '2.0'})
+    # lazy values are still parsed on access
+    assert package['Version'].text == '1.0'
+    restored = pickle.loads(pickle.dumps(package))
+    assert isinstance(restored, classes.FrozenPackage)
+    assert restored['Package'].text == 'mail-transport'
+
+
+def test_pool_cant_be_used_with_workers():
+    with pytest.raises(ValueError):
+        deb_control.parse(
+            data=examples.PACKAGES_FILE_DATA, workers=2,
+            pool=parse_pool.ParsePool())
@@ -0,0 +1,87 @@
+# coding: utf-8
+
+import pytest
+
+from debparse import deb_control
+from debparse.deb_control import profiling, diagnostics as parse_diagnostics
+
+from . import examples
+from .test_debcontrol_api import assert_same_packages
+
+
+def test_parse_stats_counts():
+    stats = profiling.ParseStats()
+    deb_control.parse(data=examples.CONTROL_FILE_DATA, stats=stats)
+    assert stats.paragraphs == 3
+    assert stats.fields['Package'] == 2
+    assert stats.fields['Build-Depends'] == 1
+    assert stats.fields['XSBC-Original-Maintainer'] == 1
+    assert stats.dependencies == 8
+    assert stats.alternatives == 1
+    assert stats.placeholders == 2
+    assert stats.unparsed == 0
+    assert stats.bytes == len(examples.CONTROL_FILE_DATA.encode('utf-8'))
+
+
+def test_parse_stats_unparsed():
+    stats = profiling.ParseStats()
+    data = 'Package: a\nDepends: b (>= 1, c | d (, e\n'
+    deb_control.parse(data=data, stats=stats)
+    assert stats.unparsed == 2
+    collected = parse_diagnostics.Diagnostics()
+    stats = profiling.ParseStats()
+    deb_control.parse(data=data, stats=stats, diagnostics=collected)
+    assert stats.dependencies == 2
+    assert stats.alternatives == 1
+    assert stats.unparsed == 2
+    assert collected.counts == {'dependency': 2}
+    assert [(d.paragraph, d.line) for d in collected] == [(0, 2), (0, 2)]
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_parse_stats_skips_malformed_fields(lazy):
+    data = 'Package: a\nbroken\nVersion: 1\n\nPackage: b\nDepends: c (\n'
+    with pytest.raises(ValueError):
+        deb_control.parse(data=data, lazy=lazy, stats=profiling.ParseStats())
+    collected = parse_diagnostics.Diagnostics()
+    control_data = deb_control.parse(
+        data=data, lazy=lazy, stats=profiling.ParseStats(),
+        diagnostics=collected)
+    assert list(control_data.packages[0].keys()) == ['Package', 'Version']
+    expected = {'field': 1} if lazy else {'field': 1, 'dependency': 1}
+    assert collected.counts == expected
+    assert [(d.paragraph, d.line) for d in collected] == (
+        [(0, 2)] if lazy else [(0, 2), (1, 6)])
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_parse_stats_same_packages(lazy):
+    control_data = deb_control.parse(
+        data=examples.CONTROL_FILE_DATA, lazy=lazy,
+        stats=profiling.ParseStats())
+    expected = deb_control.parse(data=examples.CONTROL_FILE_DATA)
+    assert_same_packages(control_data.packages, expected.packages)
+    assert control_data.packages[1]['Depends'][0].alternatives[1].name == \
+        'nginx-light'
+
+
+def test_parse_stats_hook(tmpdir):
+    path = tmpdir.join('control')
+    path.write_text(examples.CONTROL_FILE_DATA, encoding='utf-8')
+    calls = []
+    stats = profiling.ParseStats(
+        hook=lambda stage, seconds, stats: calls.append(stage))
+    deb_control.parse(str(path), stats=stats)
+    assert calls == [
+        'read', 'paragraphs', 'fields', 'lookup', 'values', 'dependencies',
+        'construction', 'construction',
+    ]
+    assert stats.total_time == sum(stats.times.values())
+    assert stats.as_dict()['paragraphs'] == 3
+
+
+def test_parse_stats_with_workers():
+    with pytest.raises(ValueError):
+        deb_control.parse(
+            data=examples.CONTROL_FILE_DATA, workers=2,
+            stats=profiling.ParseStats())
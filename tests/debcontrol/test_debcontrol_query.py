@@ -0,0 +1,132 @@
+# coding: utf-8
+
+import io
+import pickle
+
+import pytest
+
+from debparse import deb_control
+from debparse.deb_control import classes, paragraphs, query
+
+from . import examples
+
+
+def get_ids(matching_query, data=examples.PACKAGES_FILE_DATA):
+    return [
+        '%s=%s' % (package.id, package['Version'].text)
+        for package in matching_query.search(io.StringIO(data))
+    ]
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ('Package = mailer', ['mailer=3.0', 'mailer=3.1']),
+    ('package = MAILER', []),
+    ('Package ~ ^mail', ['mail-transport=1.0', 'mailer=3.0', 'mailer=3.1']),
+    ('Depends has libc6', ['mail-transport=1.0', 'mailer=3.0']),
+    # alternatives are checked too
+    ('Depends has other-mta', ['mailer=3.0']),
+    # name is not a dependency, only part of one
+    ('Depends has mail', []),
+    ('Version >= 2.0', ['other-mta=2.0', 'mailer=3.0', 'mailer=3.1']),
+    ('Version << 2.0', ['mail-transport=1.0']),
+    ('Version == 3.1', ['mailer=3.1']),
+    ('Package = mailer and Depends has libc6', ['mailer=3.0']),
+    ('Package = mailer and not Depends has libc6', ['mailer=3.1']),
+    ('Version == 1.0 or Version == 2.0 and Provides has mail-transport-agent',
+     ['mail-transport=1.0', 'other-mta=2.0']),
+    ('(Version == 1.0 or Version == 2.0) and not Provides has default-mta',
+     ['other-mta=2.0']),
+    ('Pre-Depends has libc6 or Homepage ~ .', ['mailer=3.0']),
+    ('Provides = "mail-transport-agent, default-mta"',
+     ['mail-transport=1.0']),
+])
+def test_compile_and_search(expression, expected):
+    assert get_ids(query.compile(expression)) == expected
+
+
+def test_expression_api():
+    net_query = query.Equals('Package', 'mailer') & ~query.HasDependency(
+        'Depends', 'libc6')
+    assert get_ids(net_query) == ['mailer=3.1']
+    assert get_ids(
+        query.CompareVersion('Version', '<=', '1.0') |
+        query.Matches('Depends', 'default-mta')
+    ) == ['mail-transport=1.0', 'mailer=3.1']
+
+
+def test_dependency_conditions_are_checked_last():
+    compiled = query.compile(
+        'Depends has libc6 and Section = net and Package ~ x')
+    assert [type(condition) for condition in compiled.queries] == [
+        query.Equals, query.Matches, query.HasDependency]
+
+
+def test_str_compiles_back():
+    expression = (
+        'Section = "non free" and (Version >> 1:2.0~rc1 or not '
+        'Depends has libssl3)')
+    compiled = query.compile(expression)
+    assert str(compiled) == expression
+    assert str(query.compile(str(compiled))) == expression
+
+
+@pytest.mark.parametrize('expression', [
+    '',
+    'Package',
+    'Package = ',
+    'Package is mailer',
+    'Package = mailer and',
+    '(Package = mailer',
+    'Package = mailer)',
+    'Package = "mailer',
+    'Section has net',
+    'Package ~ (',
+    'and = mailer',
+])
+def test_compile_errors(expression):
+    with pytest.raises(query.QueryError):
+        query.compile(expression)
+
+
+def test_only_matching_paragraphs_are_parsed(monkeypatch):
+    parsed = []
+    parse_paragraph = paragraphs.parse_paragraph
+
+    def counting_parse_paragraph(data, *args, **kwargs):
+        parsed.append(data)
+        return parse_paragraph(data, *args, **kwargs)
+
+    monkeypatch.setattr(
+        paragraphs, 'parse_paragraph', counting_parse_paragraph)
+    assert get_ids(query.compile('Version == 2.0')) == ['other-mta=2.0']
+    assert len(parsed) == 1
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_query_as_where(workers):
+    control_data = deb_control.parse(
+        data=examples.PACKAGES_FILE_DATA, workers=workers,
+        where=query.compile('Provides has mail-transport-agent'))
+    assert [package.id for package in control_data.packages] == [
+        'mail-transport', 'other-mta']
+
+
+def test_query_is_picklable():
+    compiled = query.compile('Package ~ ^mail and Depends has libc6')
+    restored = pickle.loads(pickle.dumps(compiled))
+    assert str(restored) == str(compiled)
+    paragraph = classes.RawParagraph('Package: mailer\nDepends: libc6')
+    assert restored(paragraph)
+
+
+def test_query_base_is_abstract():
+    with pytest.raises(TypeError):
+        query.Query()
+
+
+def test_has_dependency_skips_malformed_dependencies():
+    matching_query = query.compile('Depends has libssl3')
+    assert matching_query(classes.RawParagraph(
+        'Package: a\nDepends: libc6 (>= , libssl3'))
+    assert not matching_query(classes.RawParagraph(
+        'Package: a\nDepends: libssl3 ('))
@@ -0,0 +1,143 @@
+# coding: utf-8
+
+import gzip
+
+import pytest
+
+from debparse import utils
+from debparse.deb_control import repository
+
+from . import examples
+
+
+SOURCES_DATA = """
+Package: mailer
+Binary: mailer
+Version: 3.1
+
+Package: other-mta
+Binary: other-mta
+Version: 2.0
+"""
+
+TRANSLATION_DATA = """
+Package: mailer
+Description-md5: 0123456789abcdef0123456789abcdef
+Description-en: mail user agent
+"""
+
+
+def write(path, data, compress=False):
+    path.dirpath().ensure(dir=True)
+    if compress:
+        path.write_binary(gzip.compress(data.encode('utf-8')))
+    else:
+        path.write_text(data, encoding='utf-8')
+
+
+@pytest.fixture
+def dists(tmpdir):
+    root = tmpdir.join('mirror', 'dists')
+    main = root.join('bookworm', 'main')
+    write(main.join('binary-amd64', 'Packages'), examples.PACKAGES_FILE_DATA)
+    # the same index compressed, only one of them is loaded
+    write(
+        main.join('binary-amd64', 'Packages.gz'),
+        examples.PACKAGES_FILE_DATA, compress=True)
+    write(
+        main.join('binary-arm64', 'Packages.gz'),
+        'Package: mailer\nVersion: 3.1\nArchitecture: all\n', compress=True)
+    write(main.join('source', 'Sources.gz'), SOURCES_DATA, compress=True)
+    write(main.join('i18n', 'Translation-en'), TRANSLATION_DATA)
+    write(
+        root.join('bookworm-security', 'updates', 'main', 'binary-amd64',
+                  'Packages'),
+        'Package: mailer\nVersion: 3.2\n')
+    write(root.join('bookworm', 'Release'), 'Suite: bookworm\n')
+    write(main.join('binary-amd64', 'by-hash', 'SHA256', 'Packages'), '')
+    return str(root)
+
+
+@pytest.fixture
+def lists(tmpdir):
+    root = tmpdir.join('lists')
+    prefix = 'deb.debian.org_debian_dists_bookworm_'
+    write(root.join(prefix + 'main_binary-amd64_Packages'),
+          examples.PACKAGES_FILE_DATA)
+    write(root.join(prefix + 'main_i18n_Translation-en'), TRANSLATION_DATA)
+    write(root.join(prefix + 'InRelease'), '')
+    write(root.join('lock'), '')
+    write(root.join('partial', prefix + 'main_binary-arm64_Packages'), '')
+    return str(root)
+
+
+def test_find_index_files_in_dists(dists):
+    index_files = repository.find_index_files(dists)
+    assert [
+        (index_file.kind, index_file.suite, index_file.component,
+         index_file.architecture, index_file.language)
+        for index_file in index_files
+    ] == [
+        ('Packages', 'bookworm-security', 'updates/main', 'amd64', None),
+        ('Packages', 'bookworm', 'main', 'amd64', None),
+        ('Packages', 'bookworm', 'main', 'arm64', None),
+        ('Translation', 'bookworm', 'main', None, 'en'),
+        ('Sources', 'bookworm', 'main', 'source', None),
+    ]
+    # uncompressed file is preferred
+    assert index_files[1].path.endswith('Packages')
+
+
+def test_find_index_files_in_lists(lists):
+    index_files = repository.find_index_files(lists, kinds=['Packages'])
+    assert len(index_files) == 1
+    assert (index_files[0].suite, index_files[0].component,
+            index_files[0].architecture) == ('bookworm', 'main', 'amd64')
+
+
+def test_parse_index_path_unescapes_apt_names():
+    index_file, suffix = repository.parse_index_path(
+        'example.com_a%5fb_dists_stable_non%5ffree_binary-amd64_Packages.xz')
+    assert suffix == '.xz'
+    assert (index_file.suite, index_file.component) == ('stable', 'non_free')
+    assert repository.parse_index_path('dists/stable/Release') is None
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_load(dists, workers):
+    loaded = repository.load(dists, workers=workers)
+    assert len(loaded.files) == 5
+    assert [p['Version'].text for p in loaded.get(
+        'bookworm', 'main', 'amd64', 'mailer')] == ['3.0', '3.1']
+    assert [p['Version'].text for p in loaded.get(
+        'bookworm-security', 'updates/main', 'amd64', 'mailer')] == ['3.2']
+    assert loaded.get('bookworm', 'main', 'arm64', 'mailer')
+    assert loaded.get('bookworm', 'main', 'arm64', 'other-mta') == []
+    sources = loaded.get('bookworm', 'main', 'source', 'other-mta')
+    assert [p['Version'].text for p in sources] == ['2.0']
+    translations = loaded.get_translations('bookworm', 'main', 'mailer')
+    assert translations[0]['Description-en'].text == 'mail user agent'
+    assert ('bookworm', 'main', 'amd64', 'mail-transport') in loaded
+    assert sorted(key[2] for key, _ in loaded.iter_packages(
+        suite='bookworm', architecture='amd64')) == ['amd64'] * 3
+
+    assert list(loaded.timings) == [
+        index_file.path for index_file in loaded.files]
+    timing = loaded.timings[loaded.files[1].path]
+    assert timing.packages == 4
+    assert timing.total >= timing.parse >= 0
+
+
+def test_load_reads_file_once(lists, monkeypatch):
+    read_paths = []
+    get_file_contents = utils.get_file_contents
+
+    def counting_get_file_contents(path):
+        read_paths.append(path)
+        return get_file_contents(path)
+
+    monkeypatch.setattr(
+        utils, 'get_file_contents', counting_get_file_contents)
+    loaded = repository.load(lists, workers=1)
+    assert sorted(read_paths) == sorted(loaded.timings)
+    assert len(read_paths) == 2
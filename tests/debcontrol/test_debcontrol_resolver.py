@@ -0,0 +1,159 @@
+# coding: utf-8
+
+import pytest
+
+from debparse import deb_control
+from debparse.deb_control import resolver
+
+
+UNIVERSE_DATA = """
+Package: a
+Version: 1
+Depends: b (>= 2) | c, mta
+
+Package: b
+Version: 1
+
+Package: b
+Version: 2
+Conflicts: d
+
+Package: c
+Version: 1
+Depends: missing
+
+Package: exim
+Version: 4
+Provides: mta
+Conflicts: mta
+
+Package: postfix
+Version: 3
+Provides: mta
+Conflicts: mta
+
+Package: d
+Version: 1
+Depends: a
+
+Package: e
+Version: 1
+Pre-Depends: c
+
+Package: f
+Version: 1
+Depends: x (>= 2)
+
+Package: g
+Version: 1
+Provides: x (= 2)
+
+Package: h
+Version: 1
+Depends: y (>= 1)
+
+Package: i
+Version: 1
+Provides: y
+
+Package: p
+Version: 1
+Depends: q | r, s
+
+Package: q
+Version: 1
+Breaks: s
+
+Package: r
+Version: 1
+
+Package: s
+Version: 1
+"""
+
+
+@pytest.fixture
+def control_data():
+    return deb_control.parse(data=UNIVERSE_DATA)
+
+
+@pytest.fixture
+def universe(control_data):
+    return resolver.Universe.from_control_data(control_data)
+
+
+def get_package(control_data, name, version='1'):
+    for package in control_data.get_packages(name):
+        if package['Version'].text == version:
+            return package
+
+
+def names(packages):
+    return sorted(
+        '%s=%s' % (package.id, package['Version'].text)
+        for package in packages
+    )
+
+
+def test_installation(control_data, universe):
+    installation = universe.get_installation(get_package(control_data, 'a'))
+    assert names(installation) == ['a=1', 'b=2', 'exim=4']
+
+
+def test_not_installable(control_data, universe):
+    # b 2 conflicts with d and c needs missing package
+    assert not universe.is_installable(get_package(control_data, 'd'))
+    assert not universe.is_installable(get_package(control_data, 'e'))
+    assert names(universe.get_uninstallable()) == [
+        'c=1', 'd=1', 'e=1', 'h=1']
+
+
+def test_versioned_provides(control_data, universe):
+    assert universe.is_installable(get_package(control_data, 'f'))
+    # unversioned Provides don't satisfy versioned relations
+    assert not universe.is_installable(get_package(control_data, 'h'))
+
+
+def test_backtracking(control_data, universe):
+    installation = universe.get_installation(get_package(control_data, 'p'))
+    assert names(installation) == ['p=1', 'r=1', 's=1']
+
+
+def test_what_breaks(control_data, universe):
+    b = get_package(control_data, 'b', '2')
+    assert names(universe.what_breaks(b)) == ['a=1']
+    exim = get_package(control_data, 'exim', '4')
+    assert universe.what_breaks(exim) == []
+    # universe is not changed
+    assert universe.is_installable(get_package(control_data, 'a'))
+
+
+def test_results_are_memoized(control_data, universe, monkeypatch):
+    a = get_package(control_data, 'a')
+    assert universe.is_installable(a)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('result is not memoized')
+
+    monkeypatch.setattr(universe, '_solve', fail)
+    assert universe.is_installable(a)
+
+
+def test_incremental_changes(control_data, universe):
+    d = get_package(control_data, 'd')
+    e = get_package(control_data, 'e')
+    a = get_package(control_data, 'a')
+    assert not universe.is_installable(e)
+    assert universe.is_installable(a)
+
+    missing = deb_control.parse(
+        data='Package: missing\nVersion: 1\n').packages[0]
+    universe.add(missing)
+    assert universe.is_installable(e)
+    assert names(universe.get_installation(d)) == [
+        'a=1', 'c=1', 'd=1', 'exim=4', 'missing=1']
+
+    universe.remove(get_package(control_data, 'exim', '4'))
+    universe.remove(get_package(control_data, 'postfix', '3'))
+    assert not universe.is_installable(a)
+    assert universe.is_installable(e)
@@ -0,0 +1,70 @@
+# coding: utf-8
+
+import pytest
+
+from debparse.deb_control import fields, versions
+
+
+@pytest.mark.parametrize('first,second,expected', [
+    ('1.0', '1.0', 0),
+    ('1.0', '1.0-0', 0),
+    ('0:1.0', '1.0', 0),
+    ('1.0', '1.00', 0),
+    ('1.0', '1.1', -1),
+    ('1.2', '1.10', -1),
+    ('1.0', '1.0.0', -1),
+    ('1.0~rc1', '1.0', -1),
+    ('1.0~~', '1.0~', -1),
+    ('1.0~', '1.0~a', -1),
+    ('1.0', '1.0+b1', -1),
+    ('1.0a', '1.0+', -1),
+    ('1.0', '1.0a', -1),
+    ('1:0.1', '2.0', 1),
+    ('1.0-1', '1.0-2', -1),
+    ('1.0-1', '1.0-1ubuntu1', -1),
+    ('1.0-1~bpo1', '1.0-1', -1),
+    ('2.30-1', '2.4-1', 1),
+    ('1.15.7', '1.15.7~', 1),
+    ('1.2-3-4', '1.2-3-5', -1),
+])
+def test_compare_versions(first, second, expected):
+    assert versions.compare_versions(first, second) == expected
+    assert versions.compare_versions(second, first) == -expected
+
+
+def test_version_object():
+    version = versions.Version('1:2.3-4')
+    assert (version.epoch, version.upstream, version.revision) == (
+        1, '2.3', '4')
+    assert version > '2.3-4'
+    assert version == versions.Version('01:2.3-4')
+    assert str(max(map(versions.Version, ['1.0', '1.10', '1.9']))) == '1.10'
+    assert sorted(
+        ['1.0', '1.0~rc1', '0.9', '1:0.1'], key=versions.get_sort_key
+    ) == ['0.9', '1.0~rc1', '1.0', '1:0.1']
+
+
+def test_invalid_version():
+    with pytest.raises(ValueError):
+        versions.Version('a:1.0')
+
+
+def test_restriction_satisfied_by():
+    dependency = fields.parse_dependency('dpkg-dev (>= 1.15.7)')
+    assert dependency.restriction.satisfied_by('1.15.7')
+    assert dependency.restriction.satisfied_by('1.16')
+    assert not dependency.restriction.satisfied_by('1.15.7~rc1')
+
+
+def test_check_restrictions():
+    restrictions = [
+        fields.parse_dependency(value).restriction
+        for value in ('a (<< 2)', 'a (= 2)', 'a (> 2)', 'a')
+    ]
+    candidates = ['1.9', '2', '2.1']
+    assert versions.check_restrictions(restrictions, candidates) == [
+        [True, False, False],
+        [False, True, False],
+        [False, True, True],
+        [True, True, True],
+    ]
@@ -0,0 +1,114 @@
+# coding: utf-8
+
+import io
+
+import pytest
+
+from debparse import deb_control
+from debparse.deb_control import writer
+
+from . import examples
+
+
+def test_dumps_unmodified_is_verbatim():
+    control_data = deb_control.parse(data=examples.CONTROL_FILE_DATA)
+    assert deb_control.dumps(control_data) == examples.CONTROL_FILE_DATA
+
+
+def test_dumps_keeps_comments():
+    data = examples.CONTROL_FILE_WITH_COMMENTS
+    control_data = deb_control.parse(data=data)
+    expected = data.replace('\n\n\n', '\n\n')
+    assert deb_control.dumps(control_data) == expected
+
+
+@pytest.mark.parametrize('data', [
+    '\n\nPackage: a\n\n\n',
+    'Package: a\n\nPackage: b',
+    'Package: a\n\n# trailing comment\n\n',
+    '# comment only\n\n# file\n',
+    '\n\n',
+])
+def test_dumps_keeps_edges_of_file(data):
+    control_data = deb_control.parse(data=data)
+    assert deb_control.dumps(control_data) == data
+    edited = deb_control.reparse(control_data, 0, 0, '')
+    assert deb_control.dumps(edited) == data
+
+
+def test_dumps_packages_without_edges():
+    control_data = deb_control.parse(data='\nPackage: a\n\n\nPackage: b')
+    assert deb_control.dumps(control_data.packages) == \
+        'Package: a\n\nPackage: b\n'
+
+
+def test_dump_filtered_packages():
+    control_data = deb_control.parse(data=examples.PACKAGES_FILE_DATA)
+    fileobj = io.StringIO()
+    deb_control.dump(
+        (p for p in control_data.packages if p.id == 'mailer'), fileobj)
+    dumped = deb_control.parse(data=fileobj.getvalue())
+    assert [p['Version'].text for p in dumped.packages] == ['3.0', '3.1']
+
+
+def test_dumps_renders_only_modified_fields():
+    control_data = deb_control.parse(
+        data=examples.CONTROL_FILE_WITH_COMMENTS)
+    source = control_data.packages[0]
+    source['homepage'] = 'https://nginx.org'
+    del source['Source']
+    source['Vcs-Git'] = 'https://example.com/nginx.git'
+    binary = control_data.packages[1]
+    binary['Description'] = 'web server\nlong description\n\nend'
+    assert binary.modified == {'description'}
+
+    assert deb_control.dumps(control_data) == (
+        '\n'
+        '# leading comment\n'
+        '\n'
+        '# comment inside of paragraph\n'
+        'Build-Depends: autotools-dev,\n'
+        '# comment inside of field\n'
+        '               zlib1g-dev\n'
+        'Homepage: https://nginx.org\n'
+        '# trailing comment\n'
+        'Vcs-Git: https://example.com/nginx.git\n'
+        '\n'
+        '# comment between paragraphs\n'
+        '\n'
+        'Package: nginx\n'
+        'Architecture: all\n'
+        'Depends: nginx-full | nginx-light, ${misc:Depends}\n'
+        'Description: web server\n'
+        ' long description\n'
+        ' .\n'
+        ' end\n'
+    )
+
+
+def test_dumps_keeps_lines_of_modified_multiline_field():
+    control_data = deb_control.parse(data=examples.CONTROL_FILE_DATA)
+    binary = control_data.packages[1]
+    binary['Description'] = binary['Description']
+    binary['Architecture'] = 'any'
+    assert binary.modified == {'description', 'architecture'}
+
+    dumped = deb_control.dumps(control_data)
+    assert dumped == examples.CONTROL_FILE_DATA.replace(
+        'Package: nginx\nArchitecture: all',
+        'Package: nginx\nArchitecture: any')
+    reparsed = deb_control.parse(data=dumped).packages[1]
+    assert reparsed['Description'].text == binary['Description'].text
+
+
+def test_render_package_without_source():
+    control_data = deb_control.parse(data=examples.PACKAGES_FILE_DATA)
+    package = deb_control.classes.Package([
+        ('Package', 'new'),
+        ('Depends', control_data.packages[2]['Depends']),
+    ])
+    assert writer.render_package(package) == (
+        'Package: new\n'
+        'Depends: mail-transport-agent | other-mta, libc6 (>= 2.28), '
+        '${misc:Depends}'
+    )